@@ -3,6 +3,12 @@ Module with functionality for keeping track of the parameters used for
 different runs of numerical calculations. The outside interface consists of the
 ``Parameters`` class and the ``catalogue_parameters`` function. The rest are
 intended only for use internal within this module.
+
+When a parameter is added to a subclass of ``Parameters``, its value for the
+samples already in the registries must be added to ``_added_parameters`` of
+the subclass. ``catalogue_parameters`` then adds the new column to an
+existing registry, with that value for the old samples, before the next
+sample is appended, see ``migrate_registry``.
 """
 
 from typing import Dict, Union
@@ -29,7 +35,15 @@ class Parameters(ABC):
     setable, and ``__init__`` can take no arguments. Thus, if the parameters
     are defined as @property's, there must be corresponding setters allowing
     the values to be set.
+
+    Parameters added after a registry was created are filled in for the
+    samples already in it with the values in ``_added_parameters``.
     """
+    # parameter name: the value, as saved to the registry, of the samples
+    # catalogued before the parameter was added, i.e. the value which
+    # reproduces how they were run
+    _added_parameters: Dict[str, str] = {}
+
     @abstractmethod
     def __str__(self) -> str:
         """Defines the name of the type of simulation.
@@ -75,6 +89,7 @@ def catalogue_parameters(parent_dir: Path, parameters: Parameters) -> Path:
     if not path.is_dir():
         path.mkdir()
         create_registry_files(path, parameters)
+    migrate_registry(path, parameters)
     verify_correct_directory(path, parameters)
     sample_dir = append_sample(path, parameters)
     full_path_to_sample_dir = path / sample_dir
@@ -118,6 +133,27 @@ def expand_registry(registry_file: Path, kw: str, val: str) -> None:
         f.write('\n'.join(lines) + '\n')
 
 
+def migrate_registry(path: Path, parameters: Parameters) -> None:
+    """Add the parameters in ``parameters._added_parameters`` which are
+    missing from an existing registry, using ``expand_registry``.
+
+    args:
+        path (Path): the directory of the registry
+        parameters (Parameters): the parameters of the new sample
+    """
+    file = path / 'registry.csv'
+    with file.open('r', encoding='UTF-8') as f:
+        fields = f.readline().strip().split(',')
+    missing = [
+        kw for kw in extract_parameters(parameters)
+        if kw not in fields and kw in parameters._added_parameters
+    ]
+    for kw in missing:
+        expand_registry(file, kw, parameters._added_parameters[kw])
+    if missing:
+        csv_to_html(file, path / 'registry.html')
+
+
 def extract_parameters(
     p: Parameters
 ) -> Dict[str, Union[str, int, float, bool]]:
@@ -1,3 +1,4 @@
+from typing import Optional
 import os
 import logging
 from pathlib import Path
@@ -65,6 +66,65 @@ def get_debug_flag() -> int:
     )
 
 
+def get_num_threads() -> int:
+    """Get the number of threads from environment variable 'POVM_NUM_THREADS'.
+
+    Environment variable should be a positive integer. It sets the number of
+    threads used by the parallel numba kernels in ``weyl_heisenberg``.
+
+    Default value is the number of CPUs on the machine.
+
+    returns:
+        (int): the number of threads
+    """
+    flag = os.getenv('POVM_NUM_THREADS', default=str(os.cpu_count() or 1))
+    if flag.isdigit() and int(flag) > 0:
+        return int(flag)
+    raise ValueError(
+        f'Unknown value \'{flag}\' for environment variable '
+        + '\'POVM_NUM_THREADS\''
+    )
+
+
+def get_numba_cache_dir() -> Optional[Path]:
+    """Get the numba cache directory from environment variable
+    'POVM_NUMBA_CACHE_DIR'.
+
+    The compiled numba kernels in ``weyl_heisenberg`` are cached in this
+    directory, which may be shared between processes and jobs. Must be set
+    before ``weyl_heisenberg`` is imported.
+
+    Default is None, in which case numba caches the kernels in the
+    ``__pycache__`` directories next to the source files.
+
+    returns:
+        (Path | None): the cache directory, or None if the variable is unset
+    """
+    flag = os.getenv('POVM_NUMBA_CACHE_DIR', default='')
+    if not flag:
+        return None
+    return Path(flag).expanduser()
+
+
+def get_autotune_file() -> Path:
+    """Get the autotuning table from environment variable
+    'POVM_AUTOTUNE_FILE'.
+
+    The JSON file stores the fastest loss kernel found by
+    ``weyl_heisenberg.autotune`` for each host and dimension, and may be
+    shared between processes and jobs.
+
+    Default is 'autotune.json' in the result directory.
+
+    returns:
+        (Path): the table file
+    """
+    flag = os.getenv('POVM_AUTOTUNE_FILE', default='')
+    if not flag:
+        return result_directory() / 'autotune.json'
+    return Path(flag).expanduser()
+
+
 def result_directory() -> Path:
     """Get the name of the result directory.
 
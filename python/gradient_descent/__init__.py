@@ -1,3 +1,6 @@
+from typing import Optional
+from pathlib import Path
+
 import numpy as np
 from scipy.optimize import (    # type: ignore
     LinearConstraint,
@@ -5,14 +8,65 @@ from scipy.optimize import (    # type: ignore
 )
 
 import catalogue
+from minimization_history import EvaluationTrace
 
 
 class BaseParameters(catalogue.Parameters):
     """Base class for storing parameters that are common for GD and DEVO.
     """
-    def __init__(self, target_name: str, n_dims: int):
+    _added_parameters = {
+        'symmetry': 'none',
+        'parameterization': 'ball',
+        'loss_kernel': 'loss+loss_and_grad+loss_batch',
+    }
+
+    def __init__(
+        self,
+        target_name: str,
+        n_dims: int,
+        symmetry: str = 'none',
+        parameterization: str = 'ball',
+        loss_kernel: str = 'loss+loss_and_grad+loss_batch'
+    ):
+        """
+        args:
+            target_name (str): the function to minimize
+            n_dims (int): the number of parameters of the function, 2d - 2 for
+                SIC-POVMs in dimension d
+            symmetry (str): restrict the SIC-POVM search to vectors with this
+                symmetry, see ``weyl_heisenberg.symmetry``, which reduces
+                ``n_dims`` accordingly
+            parameterization (str): map from the real parameters to the
+                SIC-POVM candidate vector, 'ball' for the penalized
+                ``real_to_complex`` or 'sphere' for the unconstrained
+                ``weyl_heisenberg.sphere.sphere_to_complex``
+            loss_kernel (str): the implementations of the target function,
+                see ``weyl_heisenberg.autotune.autotuned_kernels``,
+                catalogued so that the timings of runs with different
+                kernels are kept apart
+        """
         assert target_name in ['SICPOVM', 'dark_machines_2', 'dark_machines_4']
         self._target_name = target_name
+        # weyl_heisenberg is only imported for the options which need it, as
+        # importing it loads the numba kernels
+        if symmetry != 'none':
+            from weyl_heisenberg.symmetry import SYMMETRIES, reduced_dimension
+            assert symmetry in SYMMETRIES
+            assert target_name == 'SICPOVM'
+            assert symmetry != 'zauner' or n_dims >= 4, \
+                'The Zauner symmetry requires d >= 3, its largest ' \
+                'eigenspace is 1D in d = 2'
+            n_dims = reduced_dimension(n_dims//2 + 1, symmetry)
+        self._symmetry = symmetry
+        if parameterization != 'ball':
+            from weyl_heisenberg.sphere import PARAMETERIZATIONS
+            assert parameterization in PARAMETERIZATIONS
+            assert target_name == 'SICPOVM'
+        self._parameterization = parameterization
+        if loss_kernel != 'loss+loss_and_grad+loss_batch':
+            from weyl_heisenberg.autotune import kernel_names
+            kernel_names(loss_kernel)
+        self._loss_kernel = loss_kernel
         self._n_dims = n_dims
 
     @property
@@ -23,6 +77,21 @@ class BaseParameters(catalogue.Parameters):
     def n_dims(self) -> int:
         return self._n_dims
 
+    @property
+    def symmetry(self) -> str:
+        return self._symmetry
+
+    @property
+    def parameterization(self) -> str:
+        return self._parameterization
+
+    @property
+    def loss_kernel(self) -> str:
+        """The implementations of the target function used for the run, see
+        ``weyl_heisenberg.autotune.kernel_names``.
+        """
+        return self._loss_kernel
+
     @property
     def use_constraints(self):
         return False
@@ -57,11 +126,55 @@ class BaseParameters(catalogue.Parameters):
         """
         return int(5e7)
 
+    # The methods below concern how a run is executed and not the
+    # minimization itself. They are callable methods instead of properties
+    # to not be saved as parameters, so that the registries do not change
+    # when they do.
+
+    def get_cache_size(self) -> int:
+        """The number of points for which ``TargetWrapper`` caches the
+        results of the target function, zero to disable the cache.
+        """
+        return 0
+
+    def get_trace_every(self) -> int:
+        """Every ``trace_every``-th function evaluation is recorded in the
+        evaluation trace, see ``minimization_history.EvaluationTrace``, zero
+        disables the trace.
+        """
+        return 0
+
+    def get_trace_x(self) -> bool:
+        """Record the points in the evaluation trace, not only the values.
+        """
+        return False
+
+    def get_profile_phases(self) -> bool:
+        """Time the phases of the drivers separately, see
+        ``minimization_history.PhaseTimer``, and the bookkeeping of
+        ``TargetWrapper``. The time spent in the target function is always
+        recorded.
+        """
+        return False
+
+    def open_trace(self, path: Path) -> Optional[EvaluationTrace]:
+        """The evaluation trace in the sample directory ``path``, None if
+        disabled.
+        """
+        if self.get_trace_every() == 0:
+            return None
+        return EvaluationTrace(
+            path, self.n_dims, every=self.get_trace_every(),
+            record_x=self.get_trace_x()
+        )
+
     def get_constraints(self):
         """Get constraints on the input variables to the target function.
 
         Callable method instead of property to not be saved as a parameter.
         """
+        assert not self.use_constraints or self.parameterization == 'ball', \
+            'The sphere parameterization is unconstrained'
         if self.use_constraints and self.target_name == 'SICPOVM':
             return NonlinearConstraint(np.linalg.norm, 0.0, 1.0)
 
@@ -102,9 +215,109 @@ class BaseParameters(catalogue.Parameters):
 
 
 class Parameters(BaseParameters):
+    _added_parameters = {
+        **BaseParameters._added_parameters,
+        'polish_level': '0.0',
+        'polish_method': 'trust-krylov',
+        'minimization_method': 'L-BFGS-B',
+        'multistart': 'sequential',
+        'halving_starts': '16',
+        'halving_slice': '20',
+        'halving_eta': '2.0',
+    }
+
+    def __init__(
+        self,
+        target_name: str,
+        n_dims: int,
+        polish_level: float = 0.0,
+        polish_method: str = 'trust-krylov',
+        symmetry: str = 'none',
+        parameterization: str = 'ball',
+        loss_kernel: str = 'loss+loss_and_grad+loss_batch',
+        minimization_method: str = 'L-BFGS-B',
+        multistart: str = 'sequential'
+    ):
+        super().__init__(
+            target_name, n_dims, symmetry, parameterization, loss_kernel
+        )
+        assert polish_level >= 0.0
+        self._polish_level = polish_level
+        assert polish_method in ['trust-ncg', 'trust-krylov']
+        self._polish_method = polish_method
+        assert minimization_method in ['L-BFGS-B', 'exact-cg']
+        assert minimization_method == 'L-BFGS-B' or (
+            parameterization == 'sphere' and symmetry == 'none'
+        ), 'The exact line search requires the sphere parameterization'
+        self._minimization_method = minimization_method
+        assert multistart in ['sequential', 'halving']
+        self._multistart = multistart
+
     def __str__(self):
         return 'random-gd'
 
+    @property
+    def polish_level(self) -> float:
+        """Loss below which the minimization switches from L-BFGS-B to the
+        trust region Newton method ``polish_method``, using exact
+        Hessian-vector products. Zero disables the polishing.
+        """
+        return self._polish_level
+
+    @property
+    def polish_method(self) -> str:
+        return self._polish_method
+
+    @property
+    def minimization_method(self) -> str:
+        """'L-BFGS-B', or 'exact-cg' for the conjugate gradient method of
+        ``gradient_descent.conjugate_gradient`` with an exact line search.
+        """
+        return self._minimization_method
+
+    @property
+    def multistart(self) -> str:
+        """'sequential' to minimize from one random start at a time, or
+        'halving' for the successive halving of
+        ``gradient_descent.multistart``.
+        """
+        return self._multistart
+
+    @property
+    def halving_starts(self) -> int:
+        """The number of random starts in each bracket of successive
+        halving.
+        """
+        return 16
+
+    @property
+    def halving_slice(self) -> int:
+        """The number of iterations of each slice of successive halving.
+        """
+        return 20
+
+    @property
+    def halving_eta(self) -> float:
+        """The fraction ``1/halving_eta`` of the starts is kept after each
+        round of slices.
+        """
+        return 2.0
+
+    def get_options(self):
+        if self.minimization_method == 'exact-cg':
+            return {'gtol': self.minimization_gtol}
+        return super().get_options()
+
+    def get_polish_options(self):
+        """Options dictionary passed to ``scipy.optimize.minimize`` when
+        polishing.
+        """
+        return {
+            # the trust region methods only stop on the gradient norm
+            'gtol': self.minimization_gtol,
+            'disp': False,
+        }
+
     @property
     def n_trials(self) -> int:
         """The max number of different initial vectors will be tried before
@@ -0,0 +1,108 @@
+"""
+Nonlinear conjugate gradient method with an exact line search.
+
+L-BFGS-B spends up to ``maxls`` function evaluations on the line search of
+every iteration. When the minimum along a line can be computed directly, as
+with ``weyl_heisenberg.sphere.exact_line_search_sphere``, each iteration needs
+only one evaluation of the function and its gradient, and one line search,
+which is counted as a function evaluation in ``nfev``.
+
+``minimize_exact_cg`` has the signature of a custom method of
+``scipy.optimize.minimize``, with the line search passed in the options:
+    scipy.optimize.minimize(
+        fun, x0, jac=True, method=minimize_exact_cg,
+        options={'line_search': line_search, 'gtol': 1e-11}
+    )
+"""
+
+from typing import Callable, Optional
+
+import numpy as np
+from scipy.optimize import OptimizeResult   # type: ignore
+
+
+def minimize_exact_cg(
+    fun: Callable,
+    x0: np.ndarray,
+    args=(),
+    jac: Optional[Callable] = None,
+    callback: Optional[Callable] = None,
+    line_search: Optional[Callable] = None,
+    gtol: float = 1e-11,
+    maxiter: Optional[int] = None,
+    **unknown_options
+) -> OptimizeResult:
+    """Minimize with the Polak-Ribiere+ conjugate gradient method.
+
+    args:
+        fun (Callable): the function to minimize
+        x0 (np.ndarray): the starting point
+        args (tuple): extra arguments passed to ``fun`` and ``jac``
+        jac (Callable): the gradient of ``fun``, as set up by
+            ``scipy.optimize.minimize``
+        callback (Callable, optional): called with an ``OptimizeResult``
+            holding ``x`` and ``fun`` after each iteration, the minimization
+            stops if it raises ``StopIteration``
+        line_search (Callable): function taking ``x`` and a direction ``v``,
+            returning the step minimizing ``fun`` along ``x + t*v``
+        gtol (float): the minimization stops when the largest element of the
+            gradient drops below this value
+        maxiter (int, optional): the maximum number of iterations, 200 times
+            the number of parameters by default
+
+    returns:
+        (OptimizeResult): the result, as from ``scipy.optimize.minimize``,
+            where ``nit`` is the number of completed iterations and ``nfev``
+            includes the line searches
+    """
+    # options meant for the other methods, e.g. ftol, are ignored
+    del unknown_options
+    assert jac is not None and callable(jac), 'The gradient is required'
+    assert line_search is not None, 'The line search is required'
+    x = np.array(x0, dtype=np.float64)
+    if maxiter is None:
+        maxiter = 200 * x.size
+
+    f = fun(x, *args)
+    g = jac(x, *args)
+    direction = -g
+    n_evaluations = 1
+    n_line_searches = 0
+    nit = 0
+    message = 'Maximum number of iterations reached'
+    success = False
+    while True:
+        if np.max(np.abs(g)) < gtol:
+            message, success = 'Gradient below gtol', True
+            break
+        if nit >= maxiter:
+            break
+        t = line_search(x, direction)
+        n_line_searches += 1
+        if t == 0.0:
+            message = 'No decrease along the search direction'
+            break
+        x = x + t*direction
+        f = fun(x, *args)
+        g_new = jac(x, *args)
+        n_evaluations += 1
+
+        beta = max(0.0, g_new.dot(g_new - g) / g.dot(g))
+        direction = -g_new + beta*direction
+        if direction.dot(g_new) >= 0.0:
+            # not a descent direction, restart along the gradient
+            direction = -g_new
+        g = g_new
+        nit += 1
+
+        if callback is not None:
+            try:
+                callback(OptimizeResult(x=x, fun=f))
+            except StopIteration:
+                message = 'Stopped by the callback'
+                break
+
+    return OptimizeResult(
+        x=x, fun=f, jac=g, nit=nit, nfev=n_evaluations + n_line_searches,
+        njev=n_evaluations, success=success, message=message
+    )
@@ -2,23 +2,74 @@ import numpy as np
 
 from gradient_descent.random_BFGS import run
 from gradient_descent import Parameters
-from weyl_heisenberg import target_function
+from weyl_heisenberg import (
+    target_function_hessp,
+    target_function_sphere,
+    target_function_and_gradient_sphere,
+    target_function_hessp_sphere,
+    exact_line_search_sphere,
+    SubspaceTarget,
+    autotuned_kernels,
+    set_num_threads,
+)
 from catalogue import catalogue_parameters
-from environment_variables import result_directory
+from environment_variables import result_directory, get_num_threads
 
 
-def main():
+def main(
+    symmetry: str = 'none',
+    parameterization: str = 'ball',
+    minimization_method: str = 'L-BFGS-B',
+    multistart: str = 'sequential'
+):
     """Run the gradient descent algorithm on the SIC-POVM problem.
     """
+    # before the kernels are selected, which depends on the threads
+    set_num_threads(get_num_threads())
     # for complex_dimension in range(10, 31):
     for complex_dimension in [6]:
         print('\n' + '='*20)
         print(f'Gradient descent in d = {complex_dimension}')
+        # the kernel has to be known before the parameters are catalogued
+        loss_kernel, kernels = 'loss+loss_and_grad+loss_batch', None
+        if symmetry == 'none' and parameterization == 'ball':
+            loss_kernel, kernels = autotuned_kernels(complex_dimension)
         parameters = Parameters(
-            target_name='SICPOVM', n_dims=2*complex_dimension - 2
+            target_name='SICPOVM',
+            n_dims=2*complex_dimension - 2,
+            polish_level=1e-3,
+            symmetry=symmetry,
+            parameterization=parameterization,
+            loss_kernel=loss_kernel,
+            minimization_method=minimization_method,
+            multistart=multistart
         )
         path = catalogue_parameters(result_directory(), parameters)
-        run(target_function, (-1.0, 1.0), parameters, path)
+        targets = SubspaceTarget.for_symmetry(
+            complex_dimension, symmetry, parameterization
+        )
+        if targets is not None:
+            functions = (
+                targets.target_function,
+                targets.target_function_and_gradient,
+                targets.target_function_hessp,
+                None
+            )
+        elif parameterization == 'sphere':
+            functions = (
+                target_function_sphere,
+                target_function_and_gradient_sphere,
+                target_function_hessp_sphere,
+                exact_line_search_sphere
+            )
+        else:
+            functions = (
+                kernels['value'],
+                kernels['gradient'],
+                target_function_hessp,
+                None
+            )
+        run(functions[0], (-1.0, 1.0), parameters, path, *functions[1:])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+"""
+Successive halving over the random starts of ``random_BFGS.run``.
+
+Most random starts of the minimizer end in local minima which are not
+SIC-POVM fiducials, and the sequential schedule spends a full minimization
+on each of them. With ``Parameters(multistart='halving')``, a bracket of
+``halving_starts`` starts is instead advanced in slices of ``halving_slice``
+iterations each. After every round of slices, the starts which finished,
+i.e. converged to a local minimum before the end of their slice, are
+dropped, and of the rest only the best ``1/halving_eta`` are kept. The
+starts are ranked by the logarithm of the loss extrapolated one slice ahead
+from the decrease during their last slice, so that a start which is still
+decreasing fast can overtake one with a lower loss. The last start of a
+bracket runs until it finishes, and the next bracket begins, until
+``n_trials`` starts have been made or the threshold or the budget
+``f_evals_max`` is reached.
+
+The minimizer is restarted from the current point for every slice, which
+discards the curvature information of L-BFGS-B.
+"""
+
+from typing import Callable, List, Optional, Tuple
+from pathlib import Path
+import logging
+
+import numpy as np
+
+from minimization_history import TargetWrapper, StopMinimization
+from gradient_descent import Parameters
+
+
+class StartHistories:
+    """The loss of every start after each of its slices.
+
+    Saved as three arrays of equal length, one element per slice, sorted by
+    the total number of evaluations when the slice ended.
+    """
+    def __init__(self) -> None:
+        self._starts: List[int] = []
+        self._evaluations: List[int] = []
+        self._f: List[float] = []
+
+    def append(self, start: int, evaluations: int, f: float) -> None:
+        """Record the loss `f` of the start with index `start` after
+        `evaluations` evaluations in total.
+        """
+        self._starts.append(start)
+        self._evaluations.append(evaluations)
+        self._f.append(f)
+
+    @property
+    def starts(self) -> np.ndarray:
+        return np.array(self._starts, dtype=int)
+
+    @property
+    def evaluations(self) -> np.ndarray:
+        return np.array(self._evaluations, dtype=int)
+
+    @property
+    def f(self) -> np.ndarray:
+        return np.array(self._f, dtype=np.float64)
+
+    def of_start(self, start: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The evaluations and losses of one start."""
+        mask = self.starts == start
+        return self.evaluations[mask], self.f[mask]
+
+    def save_results(self, path: Path) -> None:
+        """Save the histories to file.
+
+        args:
+            path (Path): the directory in which the results should be saved.
+        """
+        np.save(path / 'start_ids.npy', self.starts)
+        np.save(path / 'start_evaluations.npy', self.evaluations)
+        np.save(path / 'start_f.npy', self.f)
+
+    @classmethod
+    def load_results(cls, path: Path) -> 'StartHistories':
+        """Factory method to create an object from saved files."""
+        result = cls()
+        result._starts = list(np.load(path / 'start_ids.npy'))
+        result._evaluations = list(np.load(path / 'start_evaluations.npy'))
+        result._f = list(np.load(path / 'start_f.npy'))
+        return result
+
+
+class _Start:
+    def __init__(self, index: int, x: np.ndarray) -> None:
+        self.index = index
+        self.x = x
+        self.f = np.inf
+        self.previous_f = np.inf
+
+    def score(self) -> float:
+        """The logarithm of the loss extrapolated one slice ahead, lower is
+        better.
+        """
+        log_f = np.log(max(self.f, 1e-300))
+        if not np.isfinite(self.previous_f):
+            return log_f
+        return 2.0*log_f - np.log(max(self.previous_f, 1e-300))
+
+
+def successive_halving(
+    target: TargetWrapper,
+    minimize_from: Callable,
+    initialize_vector: Callable[[], np.ndarray],
+    stop_after_minimization: Callable[[], bool],
+    parameters: Parameters,
+    logger: Optional[logging.Logger] = None
+) -> StartHistories:
+    """Run the random starts with successive halving, see the module
+    documentation.
+
+    args:
+        target (TargetWrapper): the target function, raising
+            ``StopMinimization`` at the threshold and the budget
+        minimize_from (Callable): function taking the index of the start, the
+            point to start from and the maximum number of iterations, and
+            returning the result of the minimization and whether it finished
+            before the limit
+        initialize_vector (Callable): function returning a random start
+        stop_after_minimization (Callable): function returning True if the
+            run should end, called after every slice
+        parameters (Parameters): the hyperparameters of the run
+        logger (Logger, optional): where to log the progress
+
+    returns:
+        (StartHistories): the loss of every start after each slice
+    """
+    if logger is None:
+        logger = logging.getLogger('multistart')
+    histories = StartHistories()
+    n_started = 0
+    while n_started < parameters.n_trials:
+        n = min(parameters.halving_starts, parameters.n_trials - n_started)
+        starts = [_Start(n_started + i, initialize_vector()) for i in range(n)]
+        n_started += n
+
+        while starts:
+            # the last start of the bracket runs until it finishes
+            maxiter = parameters.halving_slice if len(starts) > 1 else None
+            alive = []
+            for start in starts:
+                try:
+                    result, finished = minimize_from(
+                        start.index, start.x, maxiter
+                    )
+                except StopMinimization as stop:
+                    logger.debug('Start %d stopped: %s', start.index, stop)
+                    if stop.reason == 'threshold':
+                        # the last evaluation of this start is the best
+                        histories.append(
+                            start.index,
+                            target.number_of_evaluations,
+                            target.current_f_min
+                        )
+                    stop_after_minimization()
+                    return histories
+
+                start.x = result.x
+                start.previous_f, start.f = start.f, float(result.fun)
+                histories.append(
+                    start.index, target.number_of_evaluations, start.f
+                )
+                if stop_after_minimization():
+                    return histories
+                if not finished:
+                    alive.append(start)
+
+            alive.sort(key=lambda start: start.score())
+            n_keep = int(np.ceil(len(alive) / parameters.halving_eta))
+            starts = alive[:n_keep]
+            logger.info(
+                'starts %d-%d  |  slice %s  |  alive %d  |  kept %d  |  '
+                'f_evals %d  |  f_min %.6e',
+                n_started - n, n_started - 1, maxiter or 'final', len(alive),
+                len(starts), target.number_of_evaluations,
+                target.current_f_min
+            )
+    return histories
@@ -9,7 +9,8 @@ should be set to zero. Don't know how to elegantly do this without effecting
 the results of SIC-POVM minimization, so it has been left as-is so far.
 """
 
-from typing import Callable, Tuple
+from typing import Callable, List, Tuple, Optional
+import multiprocessing as mp
 import os
 from pathlib import Path
 
@@ -20,8 +21,16 @@ import matplotlib.pyplot as plt
 import target_functions as tf
 import formatting
 import plot
-from minimization_history import TargetWrapper, MinimizationHistory
+from minimization_history import (
+    TargetWrapper,
+    MinimizationHistory,
+    SharedState,
+    PhaseTimer,
+    StopMinimization,
+)
 from gradient_descent import Parameters
+from gradient_descent.conjugate_gradient import minimize_exact_cg
+from gradient_descent.multistart import successive_halving
 from catalogue import catalogue_parameters
 from log import get_logger
 
@@ -32,7 +41,12 @@ def run(
     target_function: Callable,
     bounds: Tuple[float, float],
     parameters: Parameters,
-    path: Path
+    path: Path,
+    target_and_gradient: Optional[Callable] = None,
+    target_hessp: Optional[Callable] = None,
+    target_line_search: Optional[Callable] = None,
+    shared: Optional[SharedState] = None,
+    worker: int = 0
 ) -> MinimizationHistory:
     """Run the gradient descent algorithm.
 
@@ -49,23 +63,81 @@ def run(
         parameters (Parameters): the hyperparameters used for the
             optimization
         path (Path): directory in which logs and results will be saved
+        target_and_gradient (Callable, optional): function returning both the
+            value and the gradient of the target function, if given it is
+            passed to the minimizer with ``jac=True`` instead of letting the
+            minimizer use finite differences
+        target_hessp (Callable, optional): function returning the product of
+            the Hessian of the target function with a vector, required if
+            ``parameters.polish_level`` is set
+        target_line_search (Callable, optional): function returning the step
+            minimizing the target function along a line, required if
+            ``parameters.minimization_method`` is 'exact-cg'
+        shared (SharedState, optional): state shared with the other workers
+            of a multistart pool, see ``run_in_parallel``, in which case the
+            budget ``parameters.f_evals_max`` is shared and all the workers
+            stop when one of them finds a solution
+        worker (int): the index of this worker in ``shared``, also added to
+            the random seed
 
     returns:
         (MinimizationHistory): the results obtained during the minimization
             process
     """
     logger = get_logger(path, name=f'random-gd-{path.name}')
+    logger.info('Loss kernel: %s', parameters.loss_kernel)
 
     if parameters.seed:
         logger.debug('Setting random seed %d', parameters.seed)
-        np.random.seed(parameters.seed)
-
-    target = TargetWrapper(target_function, parameters.n_dims)
+        np.random.seed(parameters.seed + worker)
+
+    trace = parameters.open_trace(path)
+    target = TargetWrapper(
+        target_function,
+        parameters.n_dims,
+        target_and_gradient,
+        target_hessp=target_hessp,
+        target_line_search=target_line_search,
+        cache_size=parameters.get_cache_size(),
+        shared=shared,
+        worker=worker,
+        trace=trace,
+        time_bookkeeping=parameters.get_profile_phases(),
+        stop_threshold=parameters.minimization_threshold,
+        stop_budget=parameters.f_evals_max
+    )
+    timer = PhaseTimer(target, parameters.get_profile_phases())
     target.history.start_timing()
     x_min, x_max = bounds
+    fun, jac = minimizer_function(target)
+
+    options = parameters.get_options()
+    if parameters.minimization_method == 'exact-cg':
+        assert target.has_gradient and target.has_line_search, \
+            'The exact line search requires target_and_gradient and ' \
+            + 'target_line_search'
+        method = minimize_exact_cg
+        options['line_search'] = target.line_search
+    elif parameters.use_constraints:
+        method = 'trust-constr'
+    else:
+        method = 'L-BFGS-B'
+
+    # the custom methods do not take bounds
+    minimizer_bounds = None if callable(method) \
+        else [bounds]*parameters.n_dims
+
+    polish = parameters.polish_level > 0.0
+    assert not polish or (target.has_gradient and target.has_hessp), \
+        'Polishing requires target_and_gradient and target_hessp'
+
+    def stop_for_polishing(intermediate_result):
+        if intermediate_result.fun < parameters.polish_level:
+            raise StopIteration
 
     def initialize_vector():
-        if parameters.target_name == 'SICPOVM':
+        if parameters.target_name == 'SICPOVM' \
+                and parameters.parameterization == 'ball':
             # create (N + 1)-dimensional normalized vector, and remove one
             # dimension to create an N-dimensional subnormalized vector
             x0 = x_min + (x_max - x_min) \
@@ -76,38 +148,196 @@ def run(
             x0 = x_min + (x_max - x_min) * np.random.random(parameters.n_dims)
         return x0
 
-    for trial_i in range(parameters.n_trials):
-        result_i = scipy.optimize.minimize(
-            target,
-            x0=initialize_vector(),
-            method='trust-constr' if parameters.use_constraints else 'L-BFGS-B',
-            bounds=[bounds]*parameters.n_dims,
-            constraints=parameters.get_constraints(),
-            options=parameters.get_options()
-        )
-
-        logger.info(info_line(trial_i, target, parameters))
-        logger.debug('Result of minimization %d:\n%s', trial_i, result_i)
-
+    def minimize_from(
+        trial_i: int, x0: np.ndarray, maxiter: Optional[int] = None
+    ) -> Tuple[scipy.optimize.OptimizeResult, bool]:
+        """Minimize from x0, at most maxiter iterations before polishing,
+        and whether the minimization finished before the limit.
+        """
+        if maxiter is not None:
+            trial_options = {**options, 'maxiter': maxiter}
+        else:
+            trial_options = options
+        with timer.phase('minimize'):
+            result = scipy.optimize.minimize(
+                fun,
+                x0=x0,
+                jac=jac,
+                method=method,
+                bounds=minimizer_bounds,
+                constraints=parameters.get_constraints(),
+                options=trial_options,
+                callback=stop_for_polishing if polish else None
+            )
+        finished = maxiter is None or result.nit < maxiter
+
+        if polish and result.fun < parameters.polish_level:
+            logger.debug(
+                'Polishing minimization %d from %.6e with %s',
+                trial_i, result.fun, parameters.polish_method
+            )
+            with timer.phase('polish'):
+                result = scipy.optimize.minimize(
+                    fun,
+                    x0=result.x,
+                    jac=jac,
+                    hessp=target.hessian_vector_product,
+                    method=parameters.polish_method,
+                    options=parameters.get_polish_options()
+                )
+            finished = True
+        return result, finished
+
+    def stop_after_minimization() -> bool:
+        """Check whether the run should end, after a minimization."""
         if target.current_f_min < parameters.minimization_threshold:
             logger.info("Converged due to current_f_min close to 0.0.")
             target.history.solution_found = True
-            break
+            target.request_stop(solution_found=True)
+            return True
+
+        if target.stop_requested:
+            logger.info('Stopped by another worker')
+            return True
 
-        stop = target.number_of_evaluations >= parameters.f_evals_max
+        stop = target.total_number_of_evaluations >= parameters.f_evals_max
         if stop:
             logger.info('Maximum number of function evaluations reached')
-            break
+            target.request_stop()
+            return True
+        return False
+
+    if parameters.multistart == 'halving':
+        starts = successive_halving(
+            target,
+            minimize_from,
+            initialize_vector,
+            stop_after_minimization,
+            parameters,
+            logger
+        )
+        starts.save_results(path)
+    else:
+        for trial_i in range(parameters.n_trials):
+            # the target raises StopMinimization once the threshold or the
+            # budget is reached, e.g. the trust region methods only stop on
+            # the gradient, and may break down at the clipped minimum of the
+            # loss
+            try:
+                result_i, _ = minimize_from(trial_i, initialize_vector())
+            except StopMinimization as stop:
+                logger.debug('Minimization %d stopped: %s', trial_i, stop)
+                result_i = None
+
+            logger.info(info_line(trial_i, target, parameters))
+            logger.debug('Result of minimization %d:\n%s', trial_i, result_i)
+
+            if stop_after_minimization():
+                break
 
     target.history.stop_timing()
+    target.record_profile(timer)
     target.append_best_evaluation()
     target.history.save_results(path)
+    if trace is not None:
+        trace.close()
 
     logger.info('Elapsed time: %.3f seconds', target.history.elapsed_time)
+    logger.info(
+        'Evaluations per second: %.1f  |  kernel fraction: %.3f  |  '
+        'CPU time: %.3f seconds',
+        target.history.profile['evaluations_per_second'],
+        target.history.profile['kernel_fraction'],
+        target.history.profile['cpu_time']
+    )
+    if target.startup_time is not None:
+        logger.info(
+            'Time to first evaluation: %.3f seconds', target.startup_time
+        )
+    if hasattr(target_function, 'number_of_clips'):
+        # e.g. weyl_heisenberg.CompiledTarget, which does not log each clip
+        logger.info(
+            'Losses clipped to 1e-15: %d', target_function.number_of_clips
+        )
     logger.info(target)
     return target.history
 
 
+def run_in_parallel(
+    target_function: Callable,
+    bounds: Tuple[float, float],
+    parameters: Parameters,
+    path: Path,
+    n_workers: int,
+    target_and_gradient: Optional[Callable] = None,
+    target_hessp: Optional[Callable] = None,
+    target_line_search: Optional[Callable] = None,
+    initializer: Optional[Callable] = None
+) -> List[MinimizationHistory]:
+    """Run the gradient descent algorithm in a pool of processes sharing one
+    evaluation budget.
+
+    Each worker runs ``run`` with its own random seed, and saves its logs and
+    results in the subdirectory 'worker-<i>' of ``path``. The workers share
+    the budget ``parameters.f_evals_max`` and a stop flag through a
+    ``SharedState``, and all of them stop after their current minimization
+    once one of them finds a solution.
+
+    args:
+        target_function, bounds, parameters, path, target_and_gradient,
+        target_hessp, target_line_search: see ``run``, the functions must be
+            picklable
+        n_workers (int): the number of processes
+        initializer (Callable, optional): called once in each worker process,
+            e.g. ``weyl_heisenberg.warmup``
+
+    returns:
+        (List[MinimizationHistory]): the results of each worker
+    """
+    shared = SharedState(parameters.n_dims, n_workers)
+    try:
+        arguments = []
+        for worker in range(n_workers):
+            worker_path = path / f'worker-{worker}'
+            worker_path.mkdir()
+            arguments.append([
+                target_function, bounds, parameters, worker_path,
+                target_and_gradient, target_hessp, target_line_search,
+                shared, worker
+            ])
+        with mp.Pool(n_workers, initializer=initializer) as pool:
+            result = pool.starmap(run, arguments)
+            # let the workers exit, which detaches them from the shared
+            # memory, instead of terminating them
+            pool.close()
+            pool.join()
+
+        logger = get_logger(path, name=f'random-gd-{path.name}')
+        logger.info(
+            'Workers: %d  |  f_evals: %d  |  f_min: %.6e  |  solution: %s',
+            n_workers, shared.number_of_evaluations, shared.current_f_min,
+            shared.solution_found
+        )
+        return result
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def minimizer_function(
+    target: TargetWrapper
+) -> Tuple[Callable, Optional[bool]]:
+    """The function and ``jac`` argument to pass to
+    ``scipy.optimize.minimize``.
+
+    Uses the exact gradient if the target has one, otherwise leaves it to
+    the minimizer to approximate the gradient with finite differences.
+    """
+    if target.has_gradient:
+        return target.value_and_gradient, True
+    return target, None
+
+
 def info_line(trial_i: int, target: TargetWrapper, p: Parameters):
     fields = [
         f'trial {trial_i:>6_d} / {p.n_trials:_}',
@@ -0,0 +1,199 @@
+"""
+Functionality for running ``scipy.optimize.least_squares`` with randomly
+initialized points in parameter space.
+
+The SIC-POVM loss is a sum of squared residuals, see
+``weyl_heisenberg._residuals``, which vanish at a fiducial. Gauss-Newton type
+methods such as Levenberg-Marquardt use only the Jacobian of the residuals,
+and converge quadratically to such zero-residual minima.
+"""
+
+from typing import Callable, Tuple
+from pathlib import Path
+
+import numpy as np
+import scipy    # type: ignore
+
+import formatting
+from minimization_history import (
+    TargetWrapper,
+    MinimizationHistory,
+    StopMinimization,
+)
+from gradient_descent import BaseParameters
+from gradient_descent.random_BFGS import info_line
+from log import get_logger
+
+formatting.set_numpy_print_options()
+
+
+class Parameters(BaseParameters):
+    def __init__(
+        self,
+        target_name: str,
+        n_dims: int,
+        method: str = 'lm',
+        parameterization: str = 'ball'
+    ):
+        """
+        args:
+            target_name (str): the function to minimize, only 'SICPOVM' has
+                residuals
+            n_dims (int): the number of parameters of the function
+            method (str): the ``method`` of ``scipy.optimize.least_squares``,
+                only 'trf' and 'dogbox' respect the bounds
+            parameterization (str): see ``BaseParameters``
+        """
+        assert target_name == 'SICPOVM', 'Only SICPOVM has residuals'
+        super().__init__(
+            target_name, n_dims, parameterization=parameterization
+        )
+        assert method in ['lm', 'trf', 'dogbox']
+        self._method = method
+
+    def __str__(self):
+        return 'least-squares'
+
+    @property
+    def method(self) -> str:
+        return self._method
+
+    @property
+    def n_trials(self) -> int:
+        """The max number of different initial vectors will be tried before
+        aborting.
+        """
+        return int(1e5)
+
+    def get_least_squares_options(self):
+        """Keyword arguments passed to ``scipy.optimize.least_squares``.
+        """
+        return {
+            # the relative changes of the loss and of x below which the
+            # minimization stops, 'lm' does not accept values below the
+            # machine precision
+            'ftol': 1e-15,
+            'xtol': 1e-15,
+            'gtol': self.minimization_gtol,
+        }
+
+
+def run(
+    target_function: Callable,
+    bounds: Tuple[float, float],
+    parameters: Parameters,
+    path: Path,
+    target_residuals: Callable,
+    target_jacobian: Callable
+) -> MinimizationHistory:
+    """Run the least squares algorithm.
+
+    Uses ``scipy.optimize.least_squares`` to minimize the sum of the squared
+    residuals for randomly initialized points in parameter space, stopping if
+    the function value drops below a certain threshold. The results obtained
+    during the minimization process are stored and returned.
+
+    args:
+        target_function (Callable): the function to be minimized, the sum of
+            the squared residuals
+        bounds (Tuple[float, float]): the bounds (min, max) of the elements in
+            the array passed as input to the target function, it is assumed
+            that all elements have the same bounds
+        parameters (Parameters): the hyperparameters used for the
+            optimization
+        path (Path): directory in which logs and results will be saved
+        target_residuals (Callable): function returning the residuals
+        target_jacobian (Callable): function returning the Jacobian of the
+            residuals
+
+    returns:
+        (MinimizationHistory): the results obtained during the minimization
+            process
+    """
+    logger = get_logger(path, name=f'least-squares-{path.name}')
+    logger.info('Loss kernel: %s', parameters.loss_kernel)
+
+    if parameters.seed:
+        logger.debug('Setting random seed %d', parameters.seed)
+        np.random.seed(parameters.seed)
+
+    trace = parameters.open_trace(path)
+    target = TargetWrapper(
+        target_function,
+        parameters.n_dims,
+        target_residuals=target_residuals,
+        target_jacobian=target_jacobian,
+        cache_size=parameters.get_cache_size(),
+        trace=trace,
+        stop_threshold=parameters.minimization_threshold,
+        stop_budget=parameters.f_evals_max
+    )
+    target.history.start_timing()
+    x_min, x_max = bounds
+    if parameters.method == 'lm':
+        least_squares_bounds = (-np.inf, np.inf)
+    else:
+        least_squares_bounds = bounds
+
+    def initialize_vector():
+        if parameters.parameterization == 'ball':
+            # create (N + 1)-dimensional normalized vector, and remove one
+            # dimension to create an N-dimensional subnormalized vector
+            x0 = x_min + (x_max - x_min) \
+                * np.random.random(parameters.n_dims + 1)
+            x0 /= np.linalg.norm(x0)
+            x0 = x0[:-1]
+        else:
+            x0 = x_min + (x_max - x_min) * np.random.random(parameters.n_dims)
+        return x0
+
+    for trial_i in range(parameters.n_trials):
+        # the target raises StopMinimization once the threshold or the
+        # budget is reached
+        try:
+            result_i = scipy.optimize.least_squares(
+                target.residuals,
+                x0=initialize_vector(),
+                jac=target.residuals_jacobian,
+                bounds=least_squares_bounds,
+                method=parameters.method,
+                **parameters.get_least_squares_options()
+            )
+        except StopMinimization as stop:
+            logger.debug('Minimization %d stopped: %s', trial_i, stop)
+            result_i = None
+
+        logger.info(info_line(trial_i, target, parameters))
+        logger.debug('Result of minimization %d:\n%s', trial_i, result_i)
+
+        if target.current_f_min < parameters.minimization_threshold:
+            logger.info("Converged due to current_f_min close to 0.0.")
+            target.history.solution_found = True
+            break
+
+        stop = target.number_of_evaluations >= parameters.f_evals_max
+        if stop:
+            logger.info('Maximum number of function evaluations reached')
+            break
+
+    target.history.stop_timing()
+    target.record_profile()
+    target.append_best_evaluation()
+    target.history.save_results(path)
+    if trace is not None:
+        trace.close()
+
+    logger.info('Elapsed time: %.3f seconds', target.history.elapsed_time)
+    logger.info(
+        'Evaluations per second: %.1f  |  kernel fraction: %.3f  |  '
+        'CPU time: %.3f seconds',
+        target.history.profile['evaluations_per_second'],
+        target.history.profile['kernel_fraction'],
+        target.history.profile['cpu_time']
+    )
+    if target.startup_time is not None:
+        logger.info(
+            'Time to first evaluation: %.3f seconds', target.startup_time
+        )
+    logger.info(target)
+    return target.history
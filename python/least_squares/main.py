@@ -0,0 +1,41 @@
+import least_squares
+from weyl_heisenberg import (
+    target_function,
+    target_function_sphere,
+    residuals,
+    residuals_jacobian,
+    residuals_sphere,
+    residuals_jacobian_sphere,
+)
+from catalogue import catalogue_parameters
+from environment_variables import result_directory
+
+
+def main(parameterization: str = 'sphere'):
+    """Run the Levenberg-Marquardt algorithm on the SIC-POVM problem.
+    """
+    # for complex_dimension in range(10, 31):
+    for complex_dimension in [6]:
+        print('\n' + '='*20)
+        print(f'Least squares in d = {complex_dimension}')
+        parameters = least_squares.Parameters(
+            target_name='SICPOVM',
+            n_dims=2*complex_dimension - 2,
+            parameterization=parameterization
+        )
+        path = catalogue_parameters(result_directory(), parameters)
+        if parameterization == 'sphere':
+            functions = (
+                target_function_sphere,
+                residuals_sphere,
+                residuals_jacobian_sphere
+            )
+        else:
+            functions = (target_function, residuals, residuals_jacobian)
+        least_squares.run(
+            functions[0], (-1.0, 1.0), parameters, path, *functions[1:]
+        )
+
+
+if __name__ == "__main__":
+    main()
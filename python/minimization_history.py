@@ -3,7 +3,12 @@ Module with wrappers for target functions to save the results obtained
 throughout the entire minimization process.
 """
 
-from typing import Callable
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import shared_memory, util
+import json
 import time
 from pathlib import Path
 import logging
@@ -13,6 +18,259 @@ import numpy as np
 
 logger = logging.getLogger('minimization_history')
 
+# the number of evaluations of each worker between the checks of the shared
+# budget, as the sum over the workers is too slow to take after every
+# evaluation. Each worker stops within this many evaluations after the total
+# reaches the budget, so the total overshoots it by less than the number of
+# workers times this interval. The stop flag is read after every evaluation.
+SHARED_CHECK_INTERVAL = 64
+
+
+class StopMinimization(Exception):
+    """Raised by ``TargetWrapper`` from inside the minimizer once the
+    minimization should stop, see the `stop_threshold` and `stop_budget`
+    arguments. The drivers catch it and finalize the history as if the
+    minimizer had returned.
+    """
+    def __init__(self, reason: str) -> None:
+        """
+        args:
+            reason (str): 'threshold', 'budget' or 'stop requested'
+        """
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SharedState:
+    """The evaluation count, the best value and point, and a stop flag shared
+    by the workers of a process pool minimizing the same function.
+
+    The state lives in ``multiprocessing.shared_memory``, and is attached to
+    by name when the instance is pickled to a worker. Each worker owns a slot
+    with its own count and best point, which only it writes, so no locks are
+    needed. The totals are taken over the slots when read. The stop flag is
+    only ever set, never cleared.
+
+    While the workers run, ``x_best`` may be read in the middle of an update,
+    and should only be used for monitoring. It is exact after the workers
+    have finished.
+    """
+    def __init__(
+        self, dim: int, n_workers: int, name: Optional[str] = None
+    ) -> None:
+        """
+        args:
+            dim (int): the number of elements in the points
+            n_workers (int): the number of workers, each with one slot
+            name (str, optional): the name of existing shared memory to attach
+                to, new shared memory is created if None
+        """
+        assert n_workers > 0
+        self._dim = dim
+        self._n_workers = n_workers
+        size = 8 * (2 + n_workers * (2 + dim))
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # the workers of a pool share the resource tracker of the
+            # creator, which unlinks the memory
+            self._memory = shared_memory.SharedMemory(name=name)
+            # detach when the worker exits, which requires the pool to be
+            # closed and joined rather than terminated
+            util.Finalize(self, self.close, exitpriority=0)
+        buffer = self._memory.buf
+        # [stop, solution_found]
+        self._flags = np.ndarray((2,), dtype=np.int64, buffer=buffer)
+        self._counts = np.ndarray(
+            (n_workers,), dtype=np.int64, buffer=buffer, offset=16
+        )
+        self._f_mins = np.ndarray(
+            (n_workers,), dtype=np.float64, buffer=buffer,
+            offset=16 + 8*n_workers
+        )
+        self._x_bests = np.ndarray(
+            (n_workers, dim), dtype=np.float64, buffer=buffer,
+            offset=16 + 16*n_workers
+        )
+        if name is None:
+            self._flags[:] = 0
+            self._counts[:] = 0
+            self._f_mins[:] = np.inf
+            self._x_bests[:] = np.nan
+
+    def __reduce__(self):
+        return (SharedState, (self._dim, self._n_workers, self._memory.name))
+
+    def close(self) -> None:
+        """Detach from the shared memory, in every process using it."""
+        if not hasattr(self, '_flags'):
+            return
+        del self._flags, self._counts, self._f_mins, self._x_bests
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory, once, after all processes are done."""
+        self._memory.unlink()
+
+    def update(
+        self,
+        worker: int,
+        number_of_evaluations: int,
+        f_min: float,
+        x_best: Optional[np.ndarray] = None
+    ) -> None:
+        """Publish the count and, if given, the best point of a worker."""
+        self._counts[worker] = number_of_evaluations
+        if x_best is not None:
+            # the point first, so that f_min never refers to an older point
+            self._x_bests[worker] = x_best
+            self._f_mins[worker] = f_min
+
+    def request_stop(self, solution_found: bool = False) -> None:
+        """Ask all the workers to stop."""
+        if solution_found:
+            self._flags[1] = 1
+        self._flags[0] = 1
+
+    @property
+    def stop(self) -> bool:
+        return bool(self._flags[0])
+
+    @property
+    def solution_found(self) -> bool:
+        return bool(self._flags[1])
+
+    @property
+    def number_of_evaluations(self) -> int:
+        return int(self._counts.sum())
+
+    @property
+    def current_f_min(self) -> float:
+        return float(self._f_mins.min())
+
+    @property
+    def x_best(self) -> np.ndarray:
+        return self._x_bests[np.argmin(self._f_mins)].copy()
+
+
+class EvaluationTrace:
+    """Record of every evaluation of the target function, also those which
+    did not improve the best value.
+
+    The evaluation number, the function value and optionally the point of
+    every ``every``-th evaluation are written to ``np.memmap`` files in the
+    sample directory, 'trace_evaluations.npy', 'trace_f.npy' and
+    'trace_x.npy'. The files are preallocated to hold ``capacity`` records,
+    after which the oldest records are overwritten, so recording allocates
+    nothing per evaluation. Use ``load`` to read the records in order.
+    """
+    def __init__(
+        self,
+        path: Path,
+        dim: int,
+        every: int = 1,
+        capacity: int = 2**20,
+        record_x: bool = False
+    ) -> None:
+        """
+        args:
+            path (Path): the directory in which the trace is saved
+            dim (int): the number of elements in the points
+            every (int): record only every ``every``-th evaluation
+            capacity (int): the maximum number of records kept
+            record_x (bool): also record the points, which takes ``dim``
+                times as much space
+        """
+        assert every > 0 and capacity > 0
+        self._path = path
+        self._every = every
+        self._capacity = capacity
+        self._length = 0
+        self._memmaps = [
+            np.lib.format.open_memmap(
+                path / 'trace_evaluations.npy', mode='w+', dtype=np.int64,
+                shape=(capacity,)
+            ),
+            np.lib.format.open_memmap(
+                path / 'trace_f.npy', mode='w+', dtype=np.float64,
+                shape=(capacity,)
+            ),
+        ]
+        if record_x:
+            self._memmaps.append(np.lib.format.open_memmap(
+                path / 'trace_x.npy', mode='w+', dtype=np.float64,
+                shape=(capacity, dim)
+            ))
+        else:
+            (path / 'trace_x.npy').unlink(missing_ok=True)
+        # plain views, indexing the np.memmap subclass is several times
+        # slower
+        self._evaluations = self._memmaps[0].view(np.ndarray)
+        self._f = self._memmaps[1].view(np.ndarray)
+        self._x = self._memmaps[2].view(np.ndarray) if record_x else None
+        # touch the pages up front, the page faults on the first pass
+        # through a fresh file would double the cost of recording
+        self._evaluations[:] = -1
+        self._f[:] = np.nan
+
+    def record(self, evaluation: int, f: float, x) -> None:
+        """Record one evaluation, if it is sampled."""
+        if evaluation % self._every:
+            return
+        i = self._length % self._capacity
+        self._length += 1
+        self._evaluations[i] = evaluation
+        self._f[i] = f
+        if self._x is not None:
+            self._x[i] = x
+
+    def record_batch(
+        self, evaluations: np.ndarray, f: np.ndarray, x: np.ndarray
+    ) -> None:
+        """Record the sampled evaluations among consecutive evaluations."""
+        sampled = evaluations % self._every == 0
+        n = int(np.count_nonzero(sampled))
+        if n == 0:
+            return
+        i = (self._length + np.arange(n)) % self._capacity
+        self._evaluations[i] = evaluations[sampled]
+        self._f[i] = f[sampled]
+        if self._x is not None:
+            self._x[i] = x[sampled]
+        self._length += n
+
+    def close(self) -> None:
+        """Flush the records to disk, and save the number of records."""
+        for memmap in self._memmaps:
+            memmap.flush()
+        file = self._path / 'trace_length.txt'
+        with file.open('w', encoding='UTF-8') as f:
+            f.write(str(self._length))
+
+    @staticmethod
+    def load(
+        path: Path
+    ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """Read a closed trace, oldest record first.
+
+        returns:
+            (np.ndarray of int): the evaluation numbers
+            (np.ndarray of float): the function values
+            (np.ndarray of float or None): the points, if they were recorded
+        """
+        with (path / 'trace_length.txt').open('r', encoding='UTF-8') as f:
+            length = int(f.read())
+        evaluations = np.load(path / 'trace_evaluations.npy')
+        capacity = len(evaluations)
+        # the index of the oldest record
+        start = length % capacity if length > capacity else 0
+        order = (start + np.arange(min(length, capacity))) % capacity
+        f_values = np.load(path / 'trace_f.npy')
+        x = None
+        if (path / 'trace_x.npy').is_file():
+            x = np.load(path / 'trace_x.npy')[order]
+        return evaluations[order], f_values[order], x
+
 
 class TargetWrapper:
     """
@@ -27,6 +285,16 @@ class TargetWrapper:
     function evaluations will no longer work as intended. If this warning
     arises as a result of purposefully creating several instances of the class,
     then the warning can of course be ignored.
+
+    Optionally, the results of the most recent evaluations are cached, keyed
+    on the exact bytes of `x`. Minimizers often evaluate the same point more
+    than once, e.g. the starting point of a local minimization that was the
+    best point of the previous one, and a cache hit returns the stored value
+    (and gradient) without calling the target function. Hits are counted
+    separately from the function evaluations.
+
+    In a process pool, the workers can share one evaluation budget and stop
+    flag through a ``SharedState``, each with its own instance.
     """
     _number_of_instances: int = 0
 
@@ -43,7 +311,26 @@ class TargetWrapper:
             )
         return super(TargetWrapper, cls).__new__(cls)
 
-    def __init__(self, target_function: Callable, dim: int) -> None:
+    def __init__(
+        self,
+        target_function: Callable,
+        dim: int,
+        target_and_gradient: Optional[Callable] = None,
+        target_batch: Optional[Callable] = None,
+        target_screening: Optional[Callable] = None,
+        target_hessp: Optional[Callable] = None,
+        target_bounded: Optional[Callable] = None,
+        target_residuals: Optional[Callable] = None,
+        target_jacobian: Optional[Callable] = None,
+        target_line_search: Optional[Callable] = None,
+        cache_size: int = 0,
+        shared: Optional[SharedState] = None,
+        worker: int = 0,
+        trace: Optional[EvaluationTrace] = None,
+        time_bookkeeping: bool = False,
+        stop_threshold: Optional[float] = None,
+        stop_budget: Optional[int] = None
+    ) -> None:
         """
         args:
             target_function (Callable): the function to minimize, should take
@@ -51,37 +338,599 @@ class TargetWrapper:
                 elements
             dim (int): the number of elements in `x`, the input argument to
                 the function to be minimized
+            target_and_gradient (Callable, optional): function returning the
+                tuple (value, gradient) of the function to minimize, used by
+                `value_and_gradient`
+            target_batch (Callable, optional): vectorized version of the
+                function to minimize, taking an array of shape (P, dim) and
+                returning the P function values, used by `evaluate_batch`
+            target_screening (Callable, optional): cheap approximation of the
+                function to minimize, scalar or vectorized, used by
+                `evaluate_screening`
+            target_hessp (Callable, optional): function returning the product
+                of the Hessian of the function to minimize at `x` with a
+                vector `v`, used by `hessian_vector_product`
+            target_bounded (Callable, optional): function taking `x` and a
+                bound, returning the value of the function to minimize if it
+                is at most the bound and otherwise possibly infinity without
+                computing it exactly, used by `evaluate_bounded`
+            target_residuals (Callable, optional): function returning the
+                residuals whose squares sum to the function to minimize, used
+                by `residuals`
+            target_jacobian (Callable, optional): function returning the
+                Jacobian of `target_residuals`, used by `residuals_jacobian`
+            target_line_search (Callable, optional): function taking `x` and
+                a direction `v`, returning the step minimizing the function
+                along the line, used by `line_search`
+            cache_size (int): the maximum number of points for which the
+                results are cached, the least recently used is discarded
+                first, zero disables the cache
+            shared (SharedState, optional): state shared with the other
+                workers of a process pool, to which the count and the best
+                point are published after every evaluation
+            worker (int): the slot of this instance in `shared`
+            trace (EvaluationTrace, optional): record of every evaluation,
+                including those answered by `evaluate_bounded` with infinity
+            time_bookkeeping (bool): time the bookkeeping after each
+                evaluation, see `wrapper_time`, at the cost of one more call
+                to the clock per evaluation
+            stop_threshold (float, optional): raise `StopMinimization` after
+                an evaluation below this value
+            stop_budget (int, optional): raise `StopMinimization` once the
+                number of evaluations reaches this value, the total of all
+                the workers with `shared`
+        With `shared`, `StopMinimization` is also raised once another worker
+        has asked all to stop. The stop flag is read after every evaluation,
+        the shared count only every `SHARED_CHECK_INTERVAL` evaluations, see
+        there for the resulting overshoot of the budget.
         """
         self._target_function = target_function
+        self._target_and_gradient = target_and_gradient
+        self._target_batch = target_batch
+        self._target_screening = target_screening
+        self._target_hessp = target_hessp
+        self._target_bounded = target_bounded
+        self._target_residuals = target_residuals
+        self._target_jacobian = target_jacobian
+        self._target_line_search = target_line_search
+        assert cache_size >= 0
+        self._cache_size = cache_size
+        self._shared = shared
+        self._worker = worker
+        self._trace = trace
+        self._time_bookkeeping = time_bookkeeping
+        self._stop_threshold = -np.inf if stop_threshold is None \
+            else stop_threshold
+        self._stop_budget = sys.maxsize if stop_budget is None \
+            else stop_budget
+        # the number of evaluations at which to call `_check_stop`
+        self._next_stop_check = self._stop_budget if shared is None \
+            else SHARED_CHECK_INTERVAL
+        # maps x.tobytes() to the tuple (value, gradient or None)
+        self._cache: OrderedDict = OrderedDict()
+        self._number_of_cache_hits = 0
         self._number_of_evaluations = 0
+        self._number_of_screening_evaluations = 0
+        self._number_of_hessp_evaluations = 0
+        self._number_of_rejections = 0
+        self._number_of_jacobian_evaluations = 0
+        self._number_of_line_searches = 0
+        # cumulative time in the target functions, and in the bookkeeping
+        # after they return, see `kernel_time` and `wrapper_time`, in ns
+        self._kernel_time_ns = 0
+        self._wrapper_time_ns = 0
         self._current_f_min = float('inf')
         self._x_best = None
         self._history = MinimizationHistory(dim)
+        self._creation_time = time.perf_counter()
+        self._startup_time: Optional[float] = None
 
     def __call__(self, x):
         """Evaluate the target function, and save the results.
 
+        A two-dimensional `x` is treated as a batch of points, see
+        `evaluate_batch`.
+
         args:
             x (array_like): argument to be passed on to the target function,
-                should be of length dim (see `__init__`)
+                should be of length dim (see `__init__`), or of shape
+                (P, dim) for a batch
 
         returns:
-            the result from evaluating the target function
+            the result from evaluating the target function, an array of P
+            results for a batch
         """
+        if np.ndim(x) == 2:
+            return self.evaluate_batch(x)
+        key = self._cache_key(x)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return cached[0]
+        t0 = time.perf_counter_ns()
         result = self._target_function(x)
+        t1 = time.perf_counter_ns()
+        self._kernel_time_ns += t1 - t0
+        self._cache_store(key, result, None)
+        self._register_evaluation(x, result)
+        if self._time_bookkeeping:
+            self._wrapper_time_ns += time.perf_counter_ns() - t1
+        return result
+
+    def value_and_gradient(self, x) -> Tuple[float, np.ndarray]:
+        """Evaluate the target function and its gradient, and save the results.
+
+        Intended to be passed to minimizers together with ``jac=True``. Counts
+        as one function evaluation.
+
+        args:
+            x (array_like): argument to be passed on to the target function,
+                should be of length dim (see `__init__`)
+
+        returns:
+            the result from evaluating the target function, and its gradient
+        """
+        assert self._target_and_gradient is not None, \
+            'No function for the gradient was given'
+        key = self._cache_key(x)
+        cached = self._cache_lookup(key, need_gradient=True)
+        if cached is not None:
+            return cached[0], cached[1].copy()
+        t0 = time.perf_counter_ns()
+        result, gradient = self._target_and_gradient(x)
+        t1 = time.perf_counter_ns()
+        self._kernel_time_ns += t1 - t0
+        self._cache_store(key, result, gradient)
+        self._register_evaluation(x, result)
+        if self._time_bookkeeping:
+            self._wrapper_time_ns += time.perf_counter_ns() - t1
+        return result, gradient
+
+    def evaluate_bounded(self, x, bound: float) -> float:
+        """Evaluate the target function, unless its value exceeds `bound`.
+
+        Counts as one function evaluation, also if the evaluation is stopped
+        early. Such rejections return infinity, and are counted in
+        `number_of_rejections`.
+
+        args:
+            x (array_like): argument to be passed on to the target function,
+                should be of length dim (see `__init__`)
+            bound (float): the largest value of interest
+
+        returns:
+            the result from evaluating the target function, or infinity
+        """
+        assert self._target_bounded is not None, \
+            'No bounded target function was given'
+        key = self._cache_key(x)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return cached[0]
+        t0 = time.perf_counter_ns()
+        result = self._target_bounded(x, bound)
+        t1 = time.perf_counter_ns()
+        self._kernel_time_ns += t1 - t0
+        if np.isinf(result):
+            self._number_of_rejections += 1
+        else:
+            self._cache_store(key, result, None)
+        self._register_evaluation(x, result)
+        if self._time_bookkeeping:
+            self._wrapper_time_ns += time.perf_counter_ns() - t1
+        return result
+
+    def residuals(self, x) -> np.ndarray:
+        """Evaluate the residuals, and save the sum of their squares as the
+        value of the target function.
+
+        Intended to be passed to least squares minimizers. Counts as one
+        function evaluation. The residuals are not cached.
+
+        args:
+            x (array_like): argument to be passed on to the residual
+                function, should be of length dim (see `__init__`)
+
+        returns:
+            (np.ndarray): the residuals
+        """
+        assert self._target_residuals is not None, \
+            'No residual function was given'
+        t0 = time.perf_counter_ns()
+        result = self._target_residuals(x)
+        t1 = time.perf_counter_ns()
+        self._kernel_time_ns += t1 - t0
+        self._register_evaluation(x, float(result.dot(result)))
+        if self._time_bookkeeping:
+            self._wrapper_time_ns += time.perf_counter_ns() - t1
+        return result
+
+    def residuals_jacobian(self, x) -> np.ndarray:
+        """Evaluate the Jacobian of the residuals at `x`.
+
+        Intended to be passed to least squares minimizers as ``jac``. The
+        Jacobians are counted separately from the function evaluations.
+        """
+        assert self._target_jacobian is not None, \
+            'No function for the Jacobian was given'
+        self._number_of_jacobian_evaluations += 1
+        t0 = time.perf_counter_ns()
+        result = self._target_jacobian(x)
+        self._kernel_time_ns += time.perf_counter_ns() - t0
+        return result
+
+    def evaluate_batch(self, x: np.ndarray) -> np.ndarray:
+        """Evaluate the vectorized target function, and save the results.
+
+        Without a vectorized target function, the rows are passed to the
+        target function one by one, with the same bookkeeping. Counts as one
+        function evaluation per row of `x` which is not found in the cache,
+        and only those rows are passed to the target function. With the
+        cache enabled, a row repeated within `x` is evaluated once, and the
+        repetitions count as cache hits.
+        Only the best row is copied into the history, and it is recorded at
+        the evaluation number it would have had if the rows had been
+        evaluated one by one.
+
+        args:
+            x (np.ndarray): the arguments to be passed on to the target
+                function, of shape (P, dim)
+
+        returns:
+            (np.ndarray): the P results from evaluating the target function
+        """
+        if self._cache_size == 0:
+            results = self._evaluate_rows(x)
+            new = np.arange(len(results))
+        else:
+            keys = [self._cache_key(row) for row in x]
+            results = np.empty(len(keys), dtype=np.float64)
+            new_rows: Dict[bytes, int] = {}
+            repeated = []
+            for j, key in enumerate(keys):
+                if key in new_rows:
+                    repeated.append((j, new_rows[key]))
+                    continue
+                cached = self._cache_lookup(key)
+                if cached is None:
+                    new_rows[key] = j
+                else:
+                    results[j] = cached[0]
+            new = np.array(list(new_rows.values()), dtype=np.int64)
+            if new.size > 0:
+                results[new] = self._evaluate_rows(np.asarray(x)[new])
+            for j in new:
+                self._cache_store(keys[j], results[j], None)
+            for j, first in repeated:
+                results[j] = results[first]
+            self._number_of_cache_hits += len(repeated)
+        if new.size == 0:
+            return results
+        t1 = time.perf_counter_ns()
+        self._record_startup()
+        # points found in the cache have been registered before
+        i = int(new[np.argmin(results[new])])
+        evaluations_before = self._number_of_evaluations
+        self._number_of_evaluations += new.size
+        if self._trace is not None:
+            self._trace.record_batch(
+                evaluations_before + 1 + np.arange(new.size),
+                results[new],
+                np.asarray(x)[new]
+            )
+
+        improved = results[i] < self._current_f_min
+        if improved:
+            self._current_f_min = results[i]
+            self._x_best = np.array(x[i], copy=True)
+            self._history.append_evaluation(
+                evaluations_before + int(np.searchsorted(new, i)) + 1,
+                self._current_f_min,
+                self._x_best
+            )
+        self._publish(improved)
+        if self._time_bookkeeping:
+            self._wrapper_time_ns += time.perf_counter_ns() - t1
+        if improved and self._current_f_min < self._stop_threshold:
+            raise StopMinimization('threshold')
+        if self._number_of_evaluations >= self._next_stop_check \
+                or self.stop_requested:
+            self._check_stop()
+        return results
+
+    def _evaluate_rows(self, x) -> np.ndarray:
+        t0 = time.perf_counter_ns()
+        if self._target_batch is not None:
+            results = np.asarray(self._target_batch(x), dtype=np.float64)
+        else:
+            results = np.array(
+                [self._target_function(row) for row in x], dtype=np.float64
+            )
+        self._kernel_time_ns += time.perf_counter_ns() - t0
+        return results
+
+    def evaluate_screening(self, x):
+        """Evaluate the cheap approximation of the target function.
+
+        The results are approximate, so they are counted separately from the
+        exact evaluations and are not saved to the history.
+
+        args:
+            x (array_like): argument to be passed on to the screening
+                function, a single point or a batch if the screening function
+                is vectorized
+
+        returns:
+            the result(s) from evaluating the screening function
+        """
+        assert self._target_screening is not None, \
+            'No screening function was given'
+        t0 = time.perf_counter_ns()
+        result = self._target_screening(x)
+        self._kernel_time_ns += time.perf_counter_ns() - t0
+        self._record_startup()
+        self._number_of_screening_evaluations += np.size(result)
+        return result
+
+    def gradient(self, x) -> np.ndarray:
+        """Evaluate the gradient of the target function, and save the results.
+
+        For minimizers which take the gradient as a separate callable. Counts
+        as one function evaluation, as the function value is computed along
+        with the gradient.
+        """
+        return self.value_and_gradient(x)[1]
+
+    def hessian_vector_product(self, x, v) -> np.ndarray:
+        """Evaluate the product of the Hessian of the target function at `x`
+        with the vector `v`.
+
+        Intended to be passed to minimizers as ``hessp``. The products are
+        counted separately from the function evaluations.
+        """
+        assert self._target_hessp is not None, \
+            'No function for the Hessian-vector product was given'
+        self._number_of_hessp_evaluations += 1
+        t0 = time.perf_counter_ns()
+        result = self._target_hessp(x, v)
+        self._kernel_time_ns += time.perf_counter_ns() - t0
+        return result
+
+    def line_search(self, x, v) -> float:
+        """The step `t` minimizing the target function along `x + t*v`.
+
+        The line searches are counted separately, but each also counts as one
+        function evaluation, towards ``stop_budget`` as well, as it costs
+        about as much.
+        """
+        assert self._target_line_search is not None, \
+            'No line search function was given'
+        self._number_of_line_searches += 1
+        t0 = time.perf_counter_ns()
+        result = self._target_line_search(x, v)
+        self._kernel_time_ns += time.perf_counter_ns() - t0
+        self._record_startup()
+        self._number_of_evaluations += 1
+        self._publish(False)
+        if self._number_of_evaluations >= self._next_stop_check \
+                or self.stop_requested:
+            self._check_stop()
+        return result
+
+    @property
+    def has_gradient(self) -> bool:
+        return self._target_and_gradient is not None
+
+    @property
+    def has_batch(self) -> bool:
+        return self._target_batch is not None
+
+    @property
+    def has_hessp(self) -> bool:
+        return self._target_hessp is not None
+
+    @property
+    def has_bounded(self) -> bool:
+        return self._target_bounded is not None
+
+    @property
+    def has_residuals(self) -> bool:
+        return self._target_residuals is not None \
+            and self._target_jacobian is not None
+
+    @property
+    def has_line_search(self) -> bool:
+        return self._target_line_search is not None
+
+    @staticmethod
+    def _cache_key(x) -> bytes:
+        return np.ascontiguousarray(x, dtype=np.float64).tobytes()
+
+    def _cache_lookup(
+        self, key: bytes, need_gradient: bool = False
+    ) -> Optional[Tuple[float, Optional[np.ndarray]]]:
+        """The cached (value, gradient) for `key`, None on a miss. An entry
+        without the gradient is a miss if `need_gradient` is set.
+        """
+        if self._cache_size == 0:
+            return None
+        cached = self._cache.get(key)
+        if cached is None or (need_gradient and cached[1] is None):
+            return None
+        self._cache.move_to_end(key)
+        self._number_of_cache_hits += 1
+        return cached
+
+    def _cache_store(
+        self, key: bytes, result: float, gradient: Optional[np.ndarray]
+    ) -> None:
+        if self._cache_size == 0:
+            return
+        self._cache[key] = (
+            result, None if gradient is None else np.array(gradient, copy=True)
+        )
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _record_startup(self) -> None:
+        if self._startup_time is None:
+            self._startup_time = time.perf_counter() - self._creation_time
+
+    def _register_evaluation(self, x, result) -> None:
+        self._record_startup()
         self._number_of_evaluations += 1
+        if self._trace is not None:
+            self._trace.record(self._number_of_evaluations, result, x)
 
-        if result < self._current_f_min:
+        improved = result < self._current_f_min
+        if improved:
             self._current_f_min = result
-            self._x_best = x
+            # the minimizer may update x in place later
+            self._x_best = np.array(x, copy=True)
             self.append_best_evaluation()
+        self._publish(improved)
+        if improved and result < self._stop_threshold:
+            raise StopMinimization('threshold')
+        if self._number_of_evaluations >= self._next_stop_check \
+                or self.stop_requested:
+            self._check_stop()
 
-        return result
+    def _check_stop(self) -> None:
+        if self._shared is None:
+            raise StopMinimization('budget')
+        self._next_stop_check = \
+            self._number_of_evaluations + SHARED_CHECK_INTERVAL
+        if self._shared.stop:
+            raise StopMinimization('stop requested')
+        if self._shared.number_of_evaluations >= self._stop_budget:
+            raise StopMinimization('budget')
+
+    def _publish(self, improved: bool) -> None:
+        if self._shared is not None:
+            self._shared.update(
+                self._worker,
+                self._number_of_evaluations,
+                self._current_f_min,
+                self._x_best if improved else None
+            )
+
+    def request_stop(self, solution_found: bool = False) -> None:
+        """Ask the other workers sharing the state to stop, a no-op without
+        shared state.
+        """
+        if self._shared is not None:
+            self._shared.request_stop(solution_found)
+
+    @property
+    def stop_requested(self) -> bool:
+        """True if a worker sharing the state has asked all to stop."""
+        return self._shared is not None and self._shared.stop
+
+    @property
+    def total_number_of_evaluations(self) -> int:
+        """The number of evaluations by all the workers sharing the state,
+        the budget of `f_evals_max` applies to this number.
+        """
+        if self._shared is None:
+            return self._number_of_evaluations
+        return self._shared.number_of_evaluations
 
     @property
     def number_of_evaluations(self):
         return self._number_of_evaluations
 
+    @property
+    def number_of_screening_evaluations(self):
+        return self._number_of_screening_evaluations
+
+    @property
+    def number_of_hessp_evaluations(self):
+        return self._number_of_hessp_evaluations
+
+    @property
+    def number_of_jacobian_evaluations(self):
+        return self._number_of_jacobian_evaluations
+
+    @property
+    def number_of_line_searches(self):
+        return self._number_of_line_searches
+
+    @property
+    def number_of_rejections(self):
+        """The number of evaluations by `evaluate_bounded` which were
+        stopped early because the value exceeded the bound.
+        """
+        return self._number_of_rejections
+
+    @property
+    def number_of_cache_hits(self):
+        """The number of evaluations answered from the cache, which are not
+        included in `number_of_evaluations`.
+        """
+        return self._number_of_cache_hits
+
+    @property
+    def startup_time(self) -> Optional[float]:
+        """The time from the creation of the instance until the first
+        evaluation finished, in seconds, which includes the compilation or
+        loading of jit compiled target functions. None before the first
+        evaluation.
+        """
+        return self._startup_time
+
+    @property
+    def kernel_time(self) -> float:
+        """The time spent in the target functions, in seconds.
+        """
+        return 1e-9 * self._kernel_time_ns
+
+    @property
+    def wrapper_time(self) -> float:
+        """The time spent on the bookkeeping after the target functions
+        return, in seconds, zero unless `time_bookkeeping` is set. The cache
+        lookups before the evaluations are not timed.
+        """
+        return 1e-9 * self._wrapper_time_ns
+
+    def record_profile(
+        self, timer: Optional['PhaseTimer'] = None
+    ) -> Dict[str, float]:
+        """Summarize where the time of the run went, in the profile of the
+        history, which is saved with it. Call after `stop_timing`.
+
+        The optimizer time is the wall time not spent in the target
+        functions or the bookkeeping, i.e. in the minimizer, e.g. the
+        L-BFGS-B internals or the Python code of differential evolution.
+        Without `time_bookkeeping`, the bookkeeping is included in the
+        optimizer time, and the wrapper time is not in the profile.
+
+        args:
+            timer (PhaseTimer, optional): the phases of the run, whose times
+                are added to the profile
+
+        returns:
+            (dict): the profile, also found in `history.profile`
+        """
+        wall = self._history.elapsed_time
+        optimizer = wall - self.kernel_time - self.wrapper_time
+        profile = {
+            'wall_time': wall,
+            'cpu_time': self._history.cpu_time,
+            'cpu_utilization': self._history.cpu_time / wall,
+            'evaluations_per_second': self._number_of_evaluations / wall,
+            'kernel_time': self.kernel_time,
+            'kernel_fraction': self.kernel_time / wall,
+            'optimizer_time': optimizer,
+            'optimizer_fraction': optimizer / wall,
+        }
+        if self._time_bookkeeping:
+            profile['wrapper_time'] = self.wrapper_time
+            profile['wrapper_fraction'] = self.wrapper_time / wall
+        if timer is not None:
+            profile.update(timer.profile())
+        self._history.profile = profile
+        return profile
+
     def append_best_evaluation(self):
         """Append the current values of the properties to the history.
         """
@@ -105,6 +954,12 @@ class TargetWrapper:
         lines = [
             '{',
             f'Function evaluations: {self._number_of_evaluations}',
+            f'Screening evaluations: {self._number_of_screening_evaluations}',
+            f'Hessian-vector products: {self._number_of_hessp_evaluations}',
+            f'Jacobians: {self._number_of_jacobian_evaluations}',
+            f'Line searches: {self._number_of_line_searches}',
+            f'Cache hits: {self._number_of_cache_hits}',
+            f'Bounded rejections: {self._number_of_rejections}',
             f'Minimum value: {self._current_f_min}',
             f'Minimum x: {self._x_best}',
             f'History: {self._history.content(indent=4)}',
@@ -115,6 +970,62 @@ class TargetWrapper:
         return 'Content of TargetWrapper: ' + self.content()
 
 
+class PhaseTimer:
+    """Timing of the phases of a driver, e.g. differential evolution and
+    the local minimizations.
+
+    For each named phase, the wall time, and the time the target spent in
+    the target functions and in the bookkeeping, are accumulated over all the
+    times the phase is entered:
+        timer = PhaseTimer(target)
+        with timer.phase('minimize'):
+            scipy.optimize.minimize(target, ...)
+    A disabled timer does nothing, so the phases can be left in place.
+    """
+    def __init__(self, target: TargetWrapper, enabled: bool = True) -> None:
+        """
+        args:
+            target (TargetWrapper): the target function used in the phases
+            enabled (bool): if False, nothing is timed
+        """
+        self._target = target
+        self._enabled = enabled
+        # name: [wall time, kernel time, wrapper time], in seconds
+        self._phases: Dict[str, list] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the code in the ``with`` block as the phase `name`."""
+        if not self._enabled:
+            yield
+            return
+        start = (
+            time.perf_counter(),
+            self._target.kernel_time,
+            self._target.wrapper_time
+        )
+        try:
+            yield
+        finally:
+            times = self._phases.setdefault(name, [0.0, 0.0, 0.0])
+            times[0] += time.perf_counter() - start[0]
+            times[1] += self._target.kernel_time - start[1]
+            times[2] += self._target.wrapper_time - start[2]
+
+    def profile(self) -> Dict[str, float]:
+        """The wall time, kernel fraction and optimizer time of each phase,
+        see `TargetWrapper.record_profile`, keyed by '<phase>_time',
+        '<phase>_kernel_fraction' and '<phase>_optimizer_time'.
+        """
+        result = {}
+        for name, (wall, kernel, wrapper) in self._phases.items():
+            result[f'{name}_time'] = wall
+            result[f'{name}_kernel_fraction'] = \
+                kernel / wall if wall > 0.0 else 0.0
+            result[f'{name}_optimizer_time'] = wall - kernel - wrapper
+        return result
+
+
 class MinimizationHistory:
     def __init__(self, dim: int):
         self._capacity: int = int(1e3)
@@ -125,7 +1036,11 @@ class MinimizationHistory:
         self._x_bests: np.ndarray = np.zeros((self._capacity, dim))
         self._start_time: float | None = None
         self._elapsed_time: float | None = None
+        self._start_cpu_time: float | None = None
+        self._cpu_time: float | None = None
         self.solution_found: bool = False
+        # see TargetWrapper.record_profile
+        self.profile: Dict[str, float] = {}
 
     @property
     def dim(self) -> int:
@@ -134,17 +1049,27 @@ class MinimizationHistory:
     def start_timing(self) -> None:
         assert self._start_time is None, 'Time already started'
         self._start_time = time.perf_counter()
+        self._start_cpu_time = time.process_time()
 
     def stop_timing(self) -> None:
         assert self._start_time is not None, 'Time not started'
         assert self._elapsed_time is None, 'Time already stopped'
         self._elapsed_time = time.perf_counter() - self._start_time
+        self._cpu_time = time.process_time() - self._start_cpu_time
 
     @property
     def elapsed_time(self) -> float:
         assert self._elapsed_time is not None, 'Time not stopped'
         return self._elapsed_time
 
+    @property
+    def cpu_time(self) -> float:
+        """The CPU time of the process, all threads included, between
+        `start_timing` and `stop_timing`.
+        """
+        assert self._cpu_time is not None, 'Time not stopped'
+        return self._cpu_time
+
     def append_evaluation(
         self, number_of_evaluations: int, f_min: float, x_best: np.ndarray
     ) -> None:
@@ -205,6 +1130,10 @@ class MinimizationHistory:
                 f.write(str(self.elapsed_time))
         except AssertionError:
             pass
+        if self.profile:
+            file = path / 'profile.json'
+            with file.open('w', encoding='UTF-8') as f:
+                json.dump(self.profile, f, indent=2)
 
         file = path / 'solution_found.txt'
         with file.open('w', encoding='UTF-8') as f:
@@ -235,6 +1164,10 @@ class MinimizationHistory:
         result._x_bests = x_bests
         result._elapsed_time = MinimizationHistory._read_elapsed_time(path)
         result.solution_found = MinimizationHistory._read_success_file(path)
+        file = path / 'profile.json'
+        if file.is_file():
+            with file.open('r', encoding='UTF-8') as f:
+                result.profile = json.load(f)
         return result
 
     @staticmethod
@@ -2,17 +2,56 @@ from gradient_descent import BaseParameters
 
 
 class Parameters(BaseParameters):
+    _added_parameters = {
+        **BaseParameters._added_parameters,
+        # missing from the first registries
+        'use_constraints': 'False',
+        'de_vectorized': 'False',
+        'de_updating': 'immediate',
+        'de_screening': 'False',
+        'de_screening_fraction': '1.0',
+        'de_screening_tolerance': '0.0001',
+        'de_incremental': 'False',
+        'de_bounded': 'False',
+    }
+
     def __init__(
         self,
         target_name: str,
         n_dims: int,
         use_minimizer: bool,
-        pop_thinning_factor: float = 0.8
+        pop_thinning_factor: float = 0.8,
+        de_vectorized: bool = False,
+        de_screening: bool = False,
+        de_screening_fraction: float = 1.0,
+        de_incremental: bool = False,
+        de_bounded: bool = False,
+        symmetry: str = 'none',
+        parameterization: str = 'ball',
+        loss_kernel: str = 'loss+loss_and_grad+loss_batch'
     ):
-        super().__init__(target_name, n_dims)
+        super().__init__(
+            target_name, n_dims, symmetry, parameterization, loss_kernel
+        )
         self._use_minimizer = use_minimizer
         assert pop_thinning_factor <= 1.0
         self._pop_thinning_factor = pop_thinning_factor
+        self._de_vectorized = de_vectorized
+        self._de_screening = de_screening
+        assert 0.0 < de_screening_fraction <= 1.0
+        self._de_screening_fraction = de_screening_fraction
+        assert not (de_incremental and de_vectorized), \
+            'incremental evaluation requires immediate updating'
+        assert not (de_incremental and parameterization == 'sphere'), \
+            'incremental evaluation requires the ball parameterization'
+        assert not (de_incremental and symmetry != 'none'), \
+            'incremental evaluation requires the full vector'
+        self._de_incremental = de_incremental
+        assert not (de_bounded and de_vectorized), \
+            'bounded evaluation requires immediate updating'
+        assert not (de_bounded and de_incremental), \
+            'bounded and incremental evaluation can not be combined'
+        self._de_bounded = de_bounded
 
     def __str__(self):
         return 'devo'
@@ -33,6 +72,57 @@ class Parameters(BaseParameters):
     def de_maxiter(self) -> int:
         return 2  # int(1 * n_dims)
 
+    @property
+    def de_vectorized(self) -> bool:
+        """Evaluate the whole DE population in one call to a vectorized
+        target function.
+        """
+        return self._de_vectorized
+
+    @property
+    def de_updating(self) -> str:
+        """Vectorized evaluation requires the population to be updated once
+        per generation.
+        """
+        return 'deferred' if self.de_vectorized else 'immediate'
+
+    @property
+    def de_screening(self) -> bool:
+        """Use a cheap approximation of the target function in DE until the
+        population energies drop below ``de_screening_tolerance``.
+        """
+        return self._de_screening
+
+    @property
+    def de_screening_fraction(self) -> float:
+        """The fraction of the terms of the loss included in the screening
+        estimate.
+        """
+        return self._de_screening_fraction
+
+    @property
+    def de_screening_tolerance(self) -> float:
+        """Energy level below which DE switches to the exact target function.
+
+        Well above the accuracy of the single precision screening loss.
+        """
+        return 1e-4
+
+    @property
+    def de_incremental(self) -> bool:
+        """Evaluate DE trials incrementally from the G-matrix of the
+        population member they were created from. Only faster for d above
+        about 40, see ``weyl_heisenberg.incremental``.
+        """
+        return self._de_incremental
+
+    @property
+    def de_bounded(self) -> bool:
+        """Stop the evaluation of DE trials as soon as their loss is known to
+        exceed the energy of the population member they compete with.
+        """
+        return self._de_bounded
+
     @property
     def de_strategy(self) -> str:
         return 'best1exp'  # 'best1exp', 'best1bin', 'rand1bin'
@@ -1,6 +1,6 @@
 from pathlib import Path
 import multiprocessing as mp
-from typing import Callable, Tuple, List
+from typing import Callable, Tuple, List, Optional
 
 import numpy as np
 from scipy.spatial.distance import pdist    # type: ignore
@@ -12,7 +12,14 @@ from modified_devo.my_scipy_diffevo import DifferentialEvolutionSolver
 from modified_devo import Parameters
 import formatting
 import plot
-from minimization_history import TargetWrapper, MinimizationHistory
+from minimization_history import (
+    TargetWrapper,
+    MinimizationHistory,
+    SharedState,
+    PhaseTimer,
+    StopMinimization,
+)
+from gradient_descent.random_BFGS import minimizer_function
 from catalogue import catalogue_parameters
 from log import get_logger
 from environment_variables import result_directory
@@ -38,20 +45,107 @@ def run(
     function: Callable,
     bounds: Tuple[float, float],
     parameters: Parameters,
-    path: Path
+    path: Path,
+    target_and_gradient: Optional[Callable] = None,
+    target_batch: Optional[Callable] = None,
+    target_screening: Optional[Callable] = None,
+    target_bounded: Optional[Callable] = None,
+    shared: Optional[SharedState] = None,
+    worker: int = 0
 ) -> MinimizationHistory:
+    """Run differential evolution, occasionally polishing the best point with
+    a local minimizer.
+
+    args:
+        function (Callable): the function to be minimized, must provide
+            ``set_reference`` and ``accept`` (see
+            ``weyl_heisenberg.IncrementalTarget``) if
+            ``parameters.de_incremental``
+        bounds (Tuple[float, float]): the bounds (min, max) of the elements in
+            the array passed as input to the function, it is assumed that all
+            elements have the same bounds
+        parameters (Parameters): the hyperparameters used for the
+            optimization
+        path (Path): directory in which logs and results will be saved
+        target_and_gradient (Callable, optional): function returning both the
+            value and the gradient of the function, passed to the local
+            minimizer with ``jac=True``
+        target_batch (Callable, optional): vectorized version of the function,
+            taking an array of shape (P, n_dims), required if
+            ``parameters.de_vectorized``
+        target_screening (Callable, optional): cheap approximation of the
+            function, vectorized if ``parameters.de_vectorized``, required if
+            ``parameters.de_screening``
+        target_bounded (Callable, optional): the function with a bound as
+            the second argument, see
+            ``weyl_heisenberg.target_function_bounded``, required if
+            ``parameters.de_bounded``
+        shared (SharedState, optional): state shared with the other workers
+            of a pool, see ``run_in_parallel``, in which case the budget
+            ``parameters.f_evals_max`` is shared and all the workers stop
+            when one of them finds a solution
+        worker (int): the index of this worker in ``shared``, also added to
+            the random seed
+
+    returns:
+        (MinimizationHistory): the results obtained during the minimization
+            process
+    """
     logger = get_logger(path, name=f'devo-{path.name}')
+    logger.info('Loss kernel: %s', parameters.loss_kernel)
 
     if parameters.seed:
         logger.debug('Setting random seed %d', parameters.seed)
-        np.random.seed(parameters.seed)
-
-    target = TargetWrapper(function, parameters.n_dims)
+        np.random.seed(parameters.seed + worker)
+
+    trace = parameters.open_trace(path)
+    target = TargetWrapper(
+        function,
+        parameters.n_dims,
+        target_and_gradient,
+        target_batch,
+        target_screening,
+        target_bounded=target_bounded,
+        cache_size=parameters.get_cache_size(),
+        shared=shared,
+        worker=worker,
+        trace=trace,
+        time_bookkeeping=parameters.get_profile_phases(),
+        stop_threshold=parameters.minimization_threshold,
+        stop_budget=parameters.f_evals_max
+    )
+    timer = PhaseTimer(target, parameters.get_profile_phases())
     target.history.start_timing()
     x_min, x_max = bounds
+    fun, jac = minimizer_function(target)
+
+    if parameters.de_vectorized:
+        assert target.has_batch, 'Vectorized DE requires target_batch'
+
+        # the solver passes the candidates as columns, shape (n_dims, P)
+        def de_function(x):
+            return target.evaluate_batch(x.T)
+
+        def de_screening_function(x):
+            return target.evaluate_screening(x.T)
+    else:
+        de_function = target
+        de_screening_function = target.evaluate_screening
+
+    screening = parameters.de_screening
+    assert not screening or target_screening is not None, \
+        'DE screening requires target_screening'
+
+    assert not parameters.de_incremental \
+        or hasattr(function, 'set_reference'), \
+        'Incremental DE requires a function with set_reference and accept'
+
+    assert not parameters.de_bounded or target.has_bounded, \
+        'Bounded DE requires target_bounded'
 
     # Create the initial population
-    if parameters.target_name == 'SICPOVM':
+    if parameters.target_name == 'SICPOVM' \
+            and parameters.parameterization == 'ball':
         # create a population of (N + 1)-dimensional normalized vectors, and
         # remove one dimension to create a population of N-dimensional
         # subnormalized vector
@@ -66,7 +160,7 @@ def run(
 
     for trial_i in range(parameters.n_trials):
         solver = DifferentialEvolutionSolver(
-            target,
+            de_function,
             bounds=[(x_min, x_max)]*parameters.n_dims,
             strategy=parameters.de_strategy,
             init=current_pop,
@@ -82,33 +176,65 @@ def run(
             disp=False,
             polish=False,
             atol=0,
-            updating='immediate',  # 'deferred'
+            updating=parameters.de_updating,
             workers=1,
-            constraints=parameters.get_constraints(),
+            constraints=parameters.get_constraints() or (),
             integrality=None,
-            vectorized=False
+            vectorized=parameters.de_vectorized,
+            screening_func=de_screening_function if screening else None,
+            screening_tol=parameters.de_screening_tolerance,
+            incremental=function if parameters.de_incremental else None,
+            bounded=target.evaluate_bounded if parameters.de_bounded else None
         )
-        solver.solve()
-        current_pop, current_f_vals = sorted_results(solver, x_min, x_max)
-
-        # Run minimizer on current best point?
-        # if parameters.use_minimizer and (trial_i % parameters.n_dims == 0):
-        if parameters.use_minimizer and (trial_i % parameters.n_dims == 0):
-            res = minimize(
-                target,
-                target.x_best,
-                bounds=[(x_min, x_max)]*parameters.n_dims,
-                method='trust-constr' if parameters.use_constraints else 'L-BFGS-B',
-                constraints=parameters.get_constraints(),
-                options=parameters.get_options(),
+        # the target raises StopMinimization once the threshold or the budget
+        # is reached, the checks below then end the trials
+        try:
+            with timer.phase('de'):
+                solver.solve()
+            current_pop, current_f_vals = sorted_results(
+                solver, x_min, x_max
             )
-            current_pop[0] = res.x
-            current_f_vals[0] = res.fun
+            if screening and not solver.screening:
+                logger.info(
+                    'Switched from screening to exact target function'
+                )
+                screening = False
+
+            # Run minimizer on current best point?
+            # if parameters.use_minimizer and (trial_i % parameters.n_dims == 0):
+            if parameters.use_minimizer and trial_i % parameters.n_dims == 0:
+                # with screening, the exact target may not have been evaluated
+                # yet, and the DE energies are only approximate
+                with timer.phase('minimize'):
+                    res = minimize(
+                        fun,
+                        current_pop[0] if screening else target.x_best,
+                        jac=jac,
+                        bounds=[(x_min, x_max)]*parameters.n_dims,
+                        method='trust-constr' if parameters.use_constraints
+                        else 'L-BFGS-B',
+                        constraints=parameters.get_constraints(),
+                        options=parameters.get_options(),
+                    )
+                current_pop[0] = res.x
+                if screening:
+                    # the other energies are screened, so the polished
+                    # point has to be compared by its screened value too
+                    screened = target.evaluate_screening(
+                        res.x[np.newaxis] if parameters.de_vectorized
+                        else res.x
+                    )
+                    current_f_vals[0] = np.ravel(screened)[0]
+                else:
+                    current_f_vals[0] = res.fun
+        except StopMinimization as stop:
+            logger.debug('Trial %d stopped: %s', trial_i, stop)
 
         # Check if current smallest function value is very close to the
         # theoretical f_min = 0
         if np.isclose(target.current_f_min, 0.0, atol=parameters.minimization_threshold):
             target.history.solution_found = True
+            target.request_stop(solution_found=True)
             logger.info("Converged due to current_f_min close to 0.0.")
             logger.info("Final population from DE:")
             logger.info(current_pop)
@@ -117,7 +243,10 @@ def run(
 
         # Check if entire DE population has collapsed into the current x_best
         max_rel_dist = max_relative_distance(
-            solver.population, target.x_best, x_min, x_max
+            solver.population,
+            current_pop[0] if target.x_best is None else target.x_best,
+            x_min,
+            x_max
         )
         if max_rel_dist < parameters.max_rel_dist_threshold:
             logger.info(info_line(trial_i, target, parameters, max_rel_dist))
@@ -130,8 +259,13 @@ def run(
             # Break out of trials loop
             break
 
-        if target.number_of_evaluations >= parameters.f_evals_max:
+        if target.stop_requested:
+            logger.info('Stopped by another worker')
+            break
+
+        if target.total_number_of_evaluations >= parameters.f_evals_max:
             logger.info('Maximum number of function evaluations reached')
+            target.request_stop()
             break
 
         # Thin the population?
@@ -144,10 +278,27 @@ def run(
         logger.info(info_line(trial_i, target, parameters, max_rel_dist))
 
     target.history.stop_timing()
+    target.record_profile(timer)
     target.append_best_evaluation()
     target.history.save_results(path)
+    if trace is not None:
+        trace.close()
 
     logger.info('Elapsed time: %.3f seconds', target.history.elapsed_time)
+    logger.info(
+        'Evaluations per second: %.1f  |  kernel fraction: %.3f  |  '
+        'CPU time: %.3f seconds',
+        target.history.profile['evaluations_per_second'],
+        target.history.profile['kernel_fraction'],
+        target.history.profile['cpu_time']
+    )
+    if target.startup_time is not None:
+        logger.info(
+            'Time to first evaluation: %.3f seconds', target.startup_time
+        )
+    if hasattr(function, 'number_of_clips'):
+        # e.g. weyl_heisenberg.CompiledTarget, which does not log each clip
+        logger.info('Losses clipped to 1e-15: %d', function.number_of_clips)
     logger.info(target)
     return target.history
 
@@ -156,6 +307,7 @@ def info_line(trial_i: int, target: TargetWrapper, p: Parameters, d: float) -> s
     fields = [
         f'trial: {trial_i:>6_d} / {p.n_trials:_}',
         f'f_evals: {target.number_of_evaluations:>11_d} / {p.f_evals_max:_}',
+        f'screening: {target.number_of_screening_evaluations:>11_d}',
         f'f_min: {target.current_f_min:.6e}',
         f'max_rel_dist: {d:.2e}',
     ]
@@ -173,7 +325,9 @@ def run_in_parallel(
     f: Callable,
     b: Tuple[float, float],
     params: List[Parameters],
-    paths: List[Path]
+    paths: List[Path],
+    initializer: Optional[Callable] = None,
+    share_budget: bool = False
 ) -> List[MinimizationHistory]:
     """Run a set of simulations in parallel using the multiprocessing module.
 
@@ -186,6 +340,13 @@ def run_in_parallel(
         paths (List[Path]): a list of paths to the directories in which the
             logs for each run will be saved, should be of the same length as
             `params`
+        initializer (Callable, optional): called once in each worker process
+            before the simulations, e.g. ``weyl_heisenberg.warmup`` to load
+            the compiled kernels up front
+        share_budget (bool): share the budget ``f_evals_max`` and a stop flag
+            between the simulations through a ``SharedState``, so that all
+            stop when one finds a solution, e.g. for several DE runs of the
+            same problem with different seeds
 
     returns:
         (List[MinimizationHistory]): a list of the results of each simulation
@@ -193,9 +354,26 @@ def run_in_parallel(
     mp_parameters = [[f, b, p, path] for p, path in zip(params, paths)]
 
     num_processes = 4
-    with mp.Pool(num_processes) as pool:
-        result = pool.starmap(run, mp_parameters)
-    return result
+    if not share_budget:
+        with mp.Pool(num_processes, initializer=initializer) as pool:
+            return pool.starmap(run, mp_parameters)
+
+    assert len({p.n_dims for p in params}) == 1, \
+        'The simulations sharing a budget must minimize the same function'
+    shared = SharedState(params[0].n_dims, len(params))
+    try:
+        for worker, arguments in enumerate(mp_parameters):
+            arguments.extend([None, None, None, None, shared, worker])
+        with mp.Pool(num_processes, initializer=initializer) as pool:
+            result = pool.starmap(run, mp_parameters)
+            # let the workers exit, which detaches them from the shared
+            # memory, instead of terminating them
+            pool.close()
+            pool.join()
+        return result
+    finally:
+        shared.close()
+        shared.unlink()
 
 
 def plot_results(
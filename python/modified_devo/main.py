@@ -1,28 +1,104 @@
+from functools import partial
+
 from modified_devo import Parameters
 from modified_devo.devo_BFGS import run
-from weyl_heisenberg import target_function
+from weyl_heisenberg import (
+    target_function_screening_batch,
+    target_function_bounded,
+    target_function_sphere,
+    target_function_and_gradient_sphere,
+    target_function_batch_sphere,
+    target_function_screening_batch_sphere,
+    target_function_bounded_sphere,
+    IncrementalTarget,
+    warmup,
+    set_num_threads,
+    SubspaceTarget,
+    autotuned_kernels,
+)
 from catalogue import catalogue_parameters
-from environment_variables import result_directory
+from environment_variables import result_directory, get_num_threads
 
 
-def run_one_dimension(complex_dimension: int, pop_thinning_factor: float):
+def run_one_dimension(
+    complex_dimension: int,
+    pop_thinning_factor: float,
+    symmetry: str = 'none',
+    parameterization: str = 'ball',
+    de_incremental: bool = False,
+    de_bounded: bool = False
+):
     msg = f'Modified devo in d = {complex_dimension} ' \
         + f'with pop-thinning {pop_thinning_factor}'
     print('\n' + '='*len(msg))
     print(msg)
 
+    # the kernel has to be known before the parameters are catalogued
+    loss_kernel, kernels = 'loss+loss_and_grad+loss_batch', None
+    if symmetry == 'none' and parameterization == 'ball':
+        loss_kernel, kernels = autotuned_kernels(complex_dimension)
+
     # always use minimizer, as it will not focus to a solution otherwise
     p = Parameters(
         target_name='SICPOVM',
         n_dims=2*complex_dimension - 2,
         use_minimizer=True,
-        pop_thinning_factor=pop_thinning_factor
+        pop_thinning_factor=pop_thinning_factor,
+        # incremental and bounded evaluation update the population
+        # immediately, one trial at a time
+        de_vectorized=not (de_incremental or de_bounded),
+        de_incremental=de_incremental,
+        de_bounded=de_bounded,
+        symmetry=symmetry,
+        parameterization=parameterization,
+        loss_kernel=loss_kernel
     )
     path = catalogue_parameters(result_directory(), p)
-    run(target_function, (-1.0, 1.0), p, path)
+    targets = SubspaceTarget.for_symmetry(
+        complex_dimension, symmetry, parameterization
+    )
+    if targets is not None:
+        functions = (
+            targets.target_function,
+            targets.target_function_and_gradient,
+            targets.target_function_batch,
+            targets.target_function_screening_batch,
+            targets.target_function_bounded
+        )
+    elif parameterization == 'sphere':
+        functions = (
+            target_function_sphere,
+            target_function_and_gradient_sphere,
+            target_function_batch_sphere,
+            target_function_screening_batch_sphere,
+            target_function_bounded_sphere
+        )
+    else:
+        functions = (
+            IncrementalTarget() if de_incremental else kernels['value'],
+            kernels['gradient'],
+            kernels['batch'],
+            target_function_screening_batch,
+            target_function_bounded
+        )
+    function, target_and_gradient, target_batch, target_screening, \
+        target_bounded = functions
+    run(
+        function,
+        (-1.0, 1.0),
+        p,
+        path,
+        target_and_gradient,
+        target_batch,
+        partial(target_screening, fraction=p.de_screening_fraction),
+        target_bounded
+    )
 
 
 def main():
+    # before the kernels are selected, which depends on the threads
+    set_num_threads(get_num_threads())
+    print(f'Compiled the loss kernels in {warmup():.2f} seconds')
     # for pt in [1.0, 0.9, 0.8, 0.7, 0.6]:
     for pt in [0.6]:
         # for d in range(10, 21):
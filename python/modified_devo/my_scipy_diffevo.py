@@ -581,6 +581,29 @@ class DifferentialEvolutionSolver:
         ignored if ``workers != 1``.
         This option will override the `updating` keyword to
         ``updating='deferred'``.
+    screening_func : callable, optional
+        A cheap approximation of `func` with the same call signature (and the
+        same vectorization). While set, it is used instead of `func` for all
+        energies. Once the lowest energy or the standard deviation of the
+        energies drops below `screening_tol`, the solver switches to `func`
+        for the rest of the run and re-evaluates the whole population with
+        it, so that all energies compared afterwards are exact.
+    screening_tol : float, optional
+        The energy level at which to switch from `screening_func` to `func`.
+    incremental : object, optional
+        An object with methods ``set_reference(x)`` and ``accept()``, usually
+        `func` itself, for objectives that evaluate a trial faster when they
+        know the population member it was created from. Before each trial is
+        evaluated with `func`, ``set_reference`` is called with the parameters
+        of that population member, and ``accept()`` is called if the trial
+        replaces it. Only used with ``updating='immediate'``.
+    bounded : callable, optional
+        A function ``bounded(x, bound)`` returning ``func(x)`` if it is at
+        most `bound`, and otherwise a larger value, usually infinity, which
+        may be found without computing ``func(x)`` exactly. Each trial is then
+        evaluated with the energy of its population member as the bound, as
+        only trials with lower energies are accepted. Only used with
+        ``updating='immediate'``, and not while `screening_func` is used.
     """
 
     # Dispatch of mutation strategy method (binomial or exponential).
@@ -609,7 +632,8 @@ class DifferentialEvolutionSolver:
                  init_f_vals=None, 
                  atol=0, updating='immediate',
                  workers=1, constraints=(), x0=None, *, integrality=None,
-                 vectorized=False):
+                 vectorized=False, screening_func=None, screening_tol=0.0,
+                 incremental=None, bounded=None):
 
         if strategy in self._binomial:
             self.mutation_func = getattr(self, self._binomial[strategy])
@@ -682,6 +706,27 @@ class DifferentialEvolutionSolver:
         self.func = _FunctionWrapper(func, args)
         self.args = args
 
+        # cheap approximation of func, used until the energies get small
+        self.screening = screening_func is not None
+        self._screening_func = (
+            _FunctionWrapper(screening_func, args) if self.screening else None
+        )
+        self.screening_tol = screening_tol
+
+        if incremental is not None and self._updating != 'immediate':
+            warnings.warn("differential_evolution: the 'incremental' keyword"
+                          " is ignored with updating='deferred'",
+                          UserWarning, stacklevel=2)
+            incremental = None
+        self._incremental = incremental
+
+        if bounded is not None and self._updating != 'immediate':
+            warnings.warn("differential_evolution: the 'bounded' keyword"
+                          " is ignored with updating='deferred'",
+                          UserWarning, stacklevel=2)
+            bounded = None
+        self._bounded = bounded
+
         # convert tuple of lower and upper bounds to limits
         # [(low_0, high_0), ..., (low_n, high_n]
         #     -> [[low_0, ..., low_n], [high_0, ..., high_n]]
@@ -942,6 +987,32 @@ class DifferentialEvolutionSolver:
         """
         return self._scale_parameters(self.population[0])
 
+    @property
+    def _objective(self):
+        """
+        The function currently used for the energies, see `screening_func`
+        """
+        return self._screening_func if self.screening else self.func
+
+    def _update_screening(self):
+        """
+        Switch from `screening_func` to `func` once the energies are small,
+        and re-evaluate the population with `func`.
+        """
+        if not self.screening:
+            return
+        energies = self.population_energies[self.feasible]
+        if energies.size and (np.min(energies) >= self.screening_tol and
+                              np.std(energies) >= self.screening_tol):
+            return
+        self.screening = False
+        self.population_energies = np.full(self.num_population_members,
+                                           np.inf)
+        self.population_energies[self.feasible] = (
+            self._calculate_population_energies(
+                self.population[self.feasible]))
+        self._promote_lowest_energy()
+
     @property
     def convergence(self):
         """
@@ -1004,6 +1075,7 @@ class DifferentialEvolutionSolver:
             self.population_energies = self.init_f_vals
             self.init_f_vals = None
             self._promote_lowest_energy()
+        self._update_screening()
 
         # do the optimization.
         for nit in range(1, self.maxiter + 1):
@@ -1019,6 +1091,8 @@ class DifferentialEvolutionSolver:
                                       ' has been reached.')
                 break
 
+            self._update_screening()
+
             if self.disp:
                 print("differential_evolution step %d: f(x)= %g"
                       % (nit,
@@ -1134,7 +1208,7 @@ class DifferentialEvolutionSolver:
         parameters_pop = self._scale_parameters(population)
         try:
             calc_energies = list(
-                self._mapwrapper(self.func, parameters_pop[0:S])
+                self._mapwrapper(self._objective, parameters_pop[0:S])
             )
             calc_energies = np.squeeze(calc_energies)
         except (TypeError, ValueError) as e:
@@ -1383,6 +1457,14 @@ class DifferentialEvolutionSolver:
                 # scale from [0, 1) to the actual parameter value
                 parameters = self._scale_parameters(trial)
 
+                # the trial only differs from its population member in the
+                # crossed over parameters
+                incremental = (None if self.screening
+                               else self._incremental)
+                if incremental is not None:
+                    incremental.set_reference(
+                        self._scale_parameters(self.population[candidate]))
+
                 # determine the energy of the objective function
                 if self._wrapped_constraints:
                     cv = self._constraint_violation_fn(parameters)
@@ -1391,12 +1473,17 @@ class DifferentialEvolutionSolver:
                     if not np.sum(cv) > 0:
                         # solution is feasible
                         feasible = True
-                        energy = self.func(parameters)
+                        energy = self._objective(parameters)
                         self._nfev += 1
                 else:
                     feasible = True
                     cv = np.atleast_2d([0.])
-                    energy = self.func(parameters)
+                    if self._bounded is not None and not self.screening:
+                        # only trials below the member's energy are accepted
+                        energy = self._bounded(
+                            parameters, self.population_energies[candidate])
+                    else:
+                        energy = self._objective(parameters)
                     self._nfev += 1
 
                 # compare trial and population member
@@ -1404,6 +1491,8 @@ class DifferentialEvolutionSolver:
                                       self.population_energies[candidate],
                                       self.feasible[candidate],
                                       self.constraint_violation[candidate]):
+                    if incremental is not None:
+                        incremental.accept()
                     self.population[candidate] = trial
                     self.population_energies[candidate] = np.squeeze(energy)
                     self.feasible[candidate] = feasible
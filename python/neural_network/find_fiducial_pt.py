@@ -9,6 +9,7 @@ from torch import nn
 from torch.optim import SGD, lr_scheduler
 
 import utils
+from weyl_heisenberg._parallel import _orbit_weight
 
 
 input_vector_path = 'vectors_input'
@@ -39,7 +40,7 @@ class SICPOVM(nn.Module):
 class GMatrixLoss:
     def __init__(self, dim: int):
         self.dim = dim
-        # self.indices = self.optimal_index_order()
+        self.indices = self.generate_fundamental_domain_indices()
 
     def optimal_index_order(self):
         indices = self.generate_indices()
@@ -60,6 +61,21 @@ class GMatrixLoss:
         assert i == num_indices
         return indices
 
+    def generate_fundamental_domain_indices(self):
+        """Indices [factor, l, k, (l + k) % d] like ``generate_indices``, but
+        only for one element of each orbit of the symmetries of the G-matrix,
+        with the size of the orbit as the factor, see
+        ``weyl_heisenberg._parallel._orbit_weight``. G_00 is not included.
+        """
+        d = self.dim
+        rows = []
+        for k in range(1, d):
+            for l in range(k + 1):
+                weight = _orbit_weight(d, k, l)
+                if weight > 0:
+                    rows.append([weight, l, k, (l+k) % d])
+        return torch.tensor(rows, dtype=torch.int).reshape(-1, 4)
+
     def sort_indices(self, indices):
         sortd = torch.zeros_like(indices)
         sorted_list = sorted(indices, key=lambda x: (x[1], x[2], x[3]))
@@ -70,7 +86,7 @@ class GMatrixLoss:
     def __call__(self, a: torch.Tensor):
         loss = 0.0
         for vector in a:
-            loss += self.calculate_loss_one_vector_for_loop(vector)
+            loss += self.calculate_loss_one_vector_precomputed_indices(vector)
         return loss
 
     def calculate_loss_one_vector_for_loop(self, a):
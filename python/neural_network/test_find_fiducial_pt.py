@@ -30,6 +30,29 @@ class TestGMatrixLoss:
         loss = GMatrixLoss(d)
         assert torch.equal(loss.generate_indices(), sol)
 
+    def test_generate_fundamental_domain_indices(self):
+        d = 4
+        sol = torch.tensor([
+            [2, 0, 2, 2],
+            [1, 2, 2, 0],
+            [4, 0, 3, 3],
+            [2, 1, 3, 0],
+            [4, 2, 3, 1],
+            [2, 3, 3, 2],
+        ], dtype=torch.int)
+        loss = GMatrixLoss(d)
+        assert torch.equal(loss.generate_fundamental_domain_indices(), sol)
+
+    def test_fundamental_domain_matches_for_loop(self):
+        for d in [2, 3, 4, 7, 8]:
+            torch.manual_seed(d)
+            a = torch.randn(d, dtype=torch.complex128)
+            a /= torch.linalg.vector_norm(a)
+            loss = GMatrixLoss(d)
+            expected = loss.calculate_loss_one_vector_for_loop(a)
+            result = loss.calculate_loss_one_vector_precomputed_indices(a)
+            assert abs(result - expected) < 1E-14
+
     def test_sort_indices(self):
         unsorted = torch.tensor([
             [1, 2, 1, 4],
@@ -246,15 +246,35 @@ def plot_history_of_individual_samples():
             print('Skipping final phase')
 
 
+# columns from MinimizationHistory.profile, empty for runs without a profile
+PROFILE_COLUMNS = {
+    'Evaluations/s': 'evaluations_per_second',
+    'Kernel fraction': 'kernel_fraction',
+    'Wrapper fraction': 'wrapper_fraction',
+    'Optimizer fraction': 'optimizer_fraction',
+    'CPU time': 'cpu_time',
+    'CPU utilization': 'cpu_utilization',
+}
+
+
 def generate_registry_of_histories(directory: Path):
     sub_dirs = sorted([e for e in directory.iterdir() if e.is_dir()])
-    lines = ['Sample,Success,Time']
+    lines = [','.join(['Sample', 'Success', 'Time', *PROFILE_COLUMNS])]
     for p in sub_dirs:
         try:
             h = MinimizationHistory.load_results(p)
-            lines.append(f'{p.name},{h.solution_found},{h.elapsed_time}')
+            profile = [
+                f'{h.profile[key]:.4g}' if key in h.profile else ''
+                for key in PROFILE_COLUMNS.values()
+            ]
+            lines.append(','.join(
+                [p.name, str(h.solution_found), str(h.elapsed_time), *profile]
+            ))
         except FileNotFoundError:
-            lines.append(f'{p.name},No record (stopped/killed),No record (stopped/killed)')
+            no_record = 'No record (stopped/killed)'
+            lines.append(
+                f'{p.name},{no_record},{no_record}' + ','*len(PROFILE_COLUMNS)
+            )
 
     # write to csv file
     csv_file = directory / 'results.csv'
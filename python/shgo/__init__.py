@@ -2,16 +2,22 @@
 Functionality for running ``scipy.optimize.shgo``.
 """
 
-from typing import Callable, Tuple
+from typing import Callable, Tuple, Optional
 from pathlib import Path
 
 import scipy    # type: ignore
 import numpy as np
 
 import formatting
-from minimization_history import TargetWrapper, MinimizationHistory
+from minimization_history import (
+    TargetWrapper,
+    MinimizationHistory,
+    PhaseTimer,
+    StopMinimization,
+)
 from log import get_logger
 from gradient_descent import BaseParameters
+from gradient_descent.random_BFGS import minimizer_function
 
 formatting.set_numpy_print_options()
 
@@ -52,7 +58,8 @@ def run(
     target_function: Callable,
     bounds: Tuple[float, float],
     p: Parameters,
-    path: Path
+    path: Path,
+    target_and_gradient: Optional[Callable] = None
 ) -> MinimizationHistory:
     """Run the simplicial homology global optimization algorithm.
 
@@ -67,6 +74,9 @@ def run(
         p (GDParameters): the hyperparameters used for the
             optimization
         path (Path): directory in which logs and results will be saved
+        target_and_gradient (Callable, optional): function returning both the
+            value and the gradient of the target function, if given the local
+            minimizer uses the exact gradient
 
     returns:
         (MinimizationHistory): the results obtained during the minimization
@@ -78,40 +88,79 @@ def run(
         logger.debug('Setting random seed %d', p.seed)
         np.random.seed(p.seed)
 
-    target = TargetWrapper(target_function, p.n_dims)
+    trace = p.open_trace(path)
+    target = TargetWrapper(
+        target_function,
+        p.n_dims,
+        target_and_gradient,
+        cache_size=p.get_cache_size(),
+        trace=trace,
+        time_bookkeeping=p.get_profile_phases(),
+        stop_threshold=p.minimization_threshold,
+        stop_budget=p.f_evals_max
+    )
+    timer = PhaseTimer(target, p.get_profile_phases())
     target.history.start_timing()
 
     constraints = p.get_constraints() if p.use_constraints else None
-
-    result = scipy.optimize.shgo(
-        func=target,
-        bounds=[bounds]*p.n_dims,
-        workers=1,
-        sampling_method=p.sampling_method,
-        # iters=6,
-        constraints=constraints,
-        options={
-            'f_min': 0.0,
-            'f_tol': p.minimization_threshold,
-            'minimize_every_iter': p.minimize_every_iter,
-            'maxfev': p.f_evals_max,   # passed on to local minimizer
-            'disp': True,
-        },
-        minimizer_kwargs={
-            'method': 'trust-constr' if p.use_constraints else 'L-BFGS-B',
-            'options': p.get_options()
-        }
-    )
+    # with jac=True, shgo splits the value and the gradient of fun itself, so
+    # that each point is evaluated and counted once
+    fun, jac = minimizer_function(target)
+
+    options = {
+        'f_min': 0.0,
+        'f_tol': p.minimization_threshold,
+        'minimize_every_iter': p.minimize_every_iter,
+        'maxfev': p.f_evals_max,   # passed on to local minimizer
+        'disp': True,
+    }
+    minimizer_kwargs = {
+        'method': 'trust-constr' if p.use_constraints else 'L-BFGS-B',
+        'jac': jac,
+        'options': p.get_options()
+    }
+
+    # the target raises StopMinimization once the threshold or the budget is
+    # reached, shgo itself only checks them after its iterations
+    try:
+        with timer.phase('shgo'):
+            result = scipy.optimize.shgo(
+                func=fun,
+                bounds=[bounds]*p.n_dims,
+                workers=1,
+                sampling_method=p.sampling_method,
+                # iters=6,
+                constraints=constraints,
+                options=options,
+                minimizer_kwargs=minimizer_kwargs
+            )
+    except StopMinimization as stop:
+        logger.info('Stopped: %s', stop)
+        result = None
 
     if target.current_f_min < p.minimization_threshold:
         logger.info('Converged due to current_f_min close to 0.0.')
         target.history.solution_found = True
 
     target.history.stop_timing()
+    target.record_profile(timer)
     target.append_best_evaluation()
     target.history.save_results(path)
+    if trace is not None:
+        trace.close()
 
     logger.info('Elapsed time: %.3f seconds', target.history.elapsed_time)
+    logger.info(
+        'Evaluations per second: %.1f  |  kernel fraction: %.3f  |  '
+        'CPU time: %.3f seconds',
+        target.history.profile['evaluations_per_second'],
+        target.history.profile['kernel_fraction'],
+        target.history.profile['cpu_time']
+    )
+    if target.startup_time is not None:
+        logger.info(
+            'Time to first evaluation: %.3f seconds', target.startup_time
+        )
     logger.info('Return value of SHGO:\n%s', result)
     logger.info(target)
     return target.history
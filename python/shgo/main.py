@@ -1,7 +1,7 @@
 import logging
 
 import shgo
-from weyl_heisenberg import target_function
+from weyl_heisenberg import target_function, target_function_and_gradient
 from catalogue import catalogue_parameters
 from environment_variables import result_directory
 
@@ -45,7 +45,13 @@ def run_all() -> None:
                 handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
                 min_logger.addHandler(handler)
 
-                shgo.run(target_function, (-1.0, 1.0), parameters, path)
+                shgo.run(
+                    target_function,
+                    (-1.0, 1.0),
+                    parameters,
+                    path,
+                    target_function_and_gradient
+                )
 
 
 def run_one() -> None:
@@ -75,7 +81,13 @@ def run_one() -> None:
     handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
     logger.addHandler(handler)
 
-    shgo.run(target_function, (-1.0, 1.0), parameters, path)
+    shgo.run(
+        target_function,
+        (-1.0, 1.0),
+        parameters,
+        path,
+        target_function_and_gradient
+    )
 
 
 if __name__ == "__main__":
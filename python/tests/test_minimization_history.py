@@ -0,0 +1,98 @@
+import multiprocessing
+
+import pytest
+import numpy as np
+
+from minimization_history import (
+    EvaluationTrace,
+    SharedState,
+    StopMinimization,
+    TargetWrapper,
+)
+
+
+def first_element(x) -> float:
+    return float(x[0])
+
+
+def test_batch_counts_repeated_rows_as_cache_hits():
+    target = TargetWrapper(first_element, 2, cache_size=10)
+    x = np.array([[3.0, 0.0], [1.0, 0.0], [1.0, 0.0], [2.0, 0.0]])
+    assert np.array_equal(target.evaluate_batch(x), [3.0, 1.0, 1.0, 2.0])
+    assert target.number_of_evaluations == 3
+    assert target.number_of_cache_hits == 1
+    # the best row is the second one evaluated
+    assert target.history.evaluations.tolist() == [2]
+    assert target.history.f_mins.tolist() == [1.0]
+    assert np.array_equal(target.x_best, [1.0, 0.0])
+
+
+def test_trace_keeps_the_latest_records(tmp_path):
+    trace = EvaluationTrace(tmp_path, 1, capacity=3, record_x=True)
+    for evaluation in range(1, 8):
+        trace.record(evaluation, 10.0*evaluation, [evaluation])
+    trace.close()
+    evaluations, f, x = EvaluationTrace.load(tmp_path)
+    assert evaluations.tolist() == [5, 6, 7]
+    assert f.tolist() == [50.0, 60.0, 70.0]
+    assert x.ravel().tolist() == [5.0, 6.0, 7.0]
+
+
+def test_stop_at_budget():
+    target = TargetWrapper(first_element, 1, stop_budget=3)
+    target([3.0])
+    target([2.0])
+    with pytest.raises(StopMinimization) as info:
+        target([1.0])
+    assert info.value.reason == 'budget'
+    assert target.number_of_evaluations == 3
+
+
+def test_stop_at_threshold():
+    target = TargetWrapper(first_element, 1, stop_threshold=0.5)
+    target([1.0])
+    with pytest.raises(StopMinimization) as info:
+        target([0.1])
+    assert info.value.reason == 'threshold'
+    assert target.current_f_min == 0.1
+
+
+def evaluate_in_worker(shared: SharedState, worker: int) -> int:
+    target = TargetWrapper(first_element, 2, shared=shared, worker=worker)
+    for value in (5.0, 1.0 + worker, 7.0):
+        target(np.array([value, float(worker)]))
+    return target.number_of_evaluations
+
+
+def stop_in_worker(shared: SharedState, worker: int) -> str:
+    target = TargetWrapper(first_element, 2, shared=shared, worker=worker)
+    try:
+        target(np.zeros(2))
+    except StopMinimization as stop:
+        return stop.reason
+    return ''
+
+
+def test_shared_state_across_pool():
+    shared = SharedState(2, 2)
+    try:
+        with multiprocessing.Pool(2) as pool:
+            counts = pool.starmap(
+                evaluate_in_worker, [(shared, 0), (shared, 1)]
+            )
+            assert counts == [3, 3]
+            assert shared.number_of_evaluations == 6
+            assert shared.current_f_min == 1.0
+            assert np.array_equal(shared.x_best, [1.0, 0.0])
+
+            shared.request_stop(solution_found=True)
+            reasons = pool.starmap(
+                stop_in_worker, [(shared, 0), (shared, 1)]
+            )
+            assert reasons == ['stop requested']*2
+            pool.close()
+            pool.join()
+        assert shared.solution_found
+    finally:
+        shared.close()
+        shared.unlink()
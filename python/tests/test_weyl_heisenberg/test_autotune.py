@@ -0,0 +1,77 @@
+import json
+
+import pytest
+import numpy as np
+
+from weyl_heisenberg._loss import (
+    target_function,
+    target_function_and_gradient,
+    target_function_batch,
+)
+from weyl_heisenberg.autotune import (
+    KERNELS,
+    ROLES,
+    host_key,
+    kernel_names,
+    select_kernel,
+    autotuned_kernels,
+)
+
+
+@pytest.mark.parametrize('d', [2, 5, 8])
+def test_kernels_match_target_function(d):
+    rng = np.random.default_rng(d)
+    for scale in (0.9, 1.5):
+        x = rng.normal(size=(3, 2*d - 2))
+        x *= scale / np.linalg.norm(x, axis=1).reshape(-1, 1)
+        expected = target_function(x[0])
+        for name, factory in KERNELS['value'].items():
+            assert abs(factory(d)(x[0]) - expected) < 1e-12, name
+        expected, expected_gradient = target_function_and_gradient(x[0])
+        for name, factory in KERNELS['gradient'].items():
+            value, gradient = factory(d)(x[0])
+            assert abs(value - expected) < 1e-12, name
+            assert np.allclose(gradient, expected_gradient, atol=1e-12), name
+        expected = target_function_batch(x)
+        for name, factory in KERNELS['batch'].items():
+            assert np.allclose(factory(d)(x), expected, atol=1e-12), name
+
+
+def test_select_kernel_uses_table(tmp_path):
+    table_file = tmp_path / 'tables' / 'autotune.json'
+    for role in ROLES:
+        kernel = select_kernel(4, role, table_file, budget=0.01)
+        assert kernel in KERNELS[role]
+    with table_file.open('r', encoding='UTF-8') as f:
+        table = json.load(f)
+    for role in ROLES:
+        entry = table[host_key()]['4'][role]
+        assert entry['kernel'] in KERNELS[role]
+        assert set(entry['times']) == set(KERNELS[role])
+
+    # the stored choice is used without timing the kernels again
+    table[host_key()]['4']['value']['kernel'] = 'loss_fft'
+    table[host_key()]['4']['gradient']['kernel'] = 'loss_and_grad_parallel'
+    table[host_key()]['4']['batch']['kernel'] = 'loss_parallel_rows'
+    with table_file.open('w', encoding='UTF-8') as f:
+        json.dump(table, f)
+    name, kernels = autotuned_kernels(4, table_file)
+    assert name == 'loss_fft+loss_and_grad_parallel+loss_parallel_rows'
+    assert kernel_names(name) == {
+        'value': 'loss_fft',
+        'gradient': 'loss_and_grad_parallel',
+        'batch': 'loss_parallel_rows',
+    }
+    x = np.full((2, 6), 0.2)
+    assert abs(kernels['value'](x[0]) - target_function(x[0])) < 1e-12
+    assert abs(
+        kernels['gradient'](x[0])[0] - target_function(x[0])
+    ) < 1e-12
+    assert np.allclose(kernels['batch'](x), target_function_batch(x))
+
+
+def test_kernel_names_rejects_unknown():
+    with pytest.raises(AssertionError):
+        kernel_names('loss')
+    with pytest.raises(AssertionError):
+        kernel_names('loss+loss+loss_batch')
@@ -1,6 +1,37 @@
+import pytest
 import numpy as np
+import numba    # type: ignore
 
-from weyl_heisenberg.loss import loss
+from weyl_heisenberg._loss import (
+    loss,
+    loss_fft,
+    loss_coefficients,
+    g_matrix,
+    g_matrix_fft,
+    real_to_complex,
+    loss_and_grad,
+    loss_bounded,
+    loss_batch,
+    loss_float32,
+    screening_pairs,
+    target_function,
+    target_function_batch,
+    target_function_bounded,
+    target_function_and_gradient,
+    target_function_hessp,
+    _orbit_weight,
+)
+from weyl_heisenberg._parallel import (
+    loss_parallel,
+    loss_and_grad_parallel,
+    set_num_threads,
+)
+from weyl_heisenberg.incremental import (
+    IncrementalTarget,
+    _updated_g_matrix,
+)
+from weyl_heisenberg.fused import LossWorkspace
+from weyl_heisenberg.compiled import CompiledTarget
 
 
 tol = 1e-15
@@ -24,3 +55,262 @@ def test_loss_3d():
     v = np.array([0.1 + 0.0j, 0.0 + 0.2j, 0.3 + 0.0j])
     expected = -0.49977912
     assert abs(loss(v) - expected) < tol
+
+
+def random_real_vector(d: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=2*d - 2)
+    return 0.8 * x / np.linalg.norm(x)
+
+
+def reference_g_matrix(a: np.ndarray) -> np.ndarray:
+    d = a.size
+    m, k, l = np.meshgrid(*(3*[np.arange(d)]), indexing='ij')
+    terms = a[m] * a[(m + k) % d].conj() * a[(m + l) % d].conj() \
+        * a[(m + k + l) % d]
+    return terms.sum(axis=0)
+
+
+@pytest.mark.parametrize('d', range(1, 20))
+def test_orbit_weights_cover_g_matrix(d):
+    weights = [_orbit_weight(d, k, l) for k in range(d) for l in range(k + 1)]
+    assert sum(weights) == d**2
+    # about a quarter of the elements are computed
+    assert sum(w > 0 for w in weights) <= (d + 1)*(d + 2)//4 + 1
+
+
+@pytest.mark.parametrize('d', [2, 3, 4, 5, 6, 7, 8, 16, 31])
+def test_fundamental_domain_matches_full_g_matrix(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    G = reference_g_matrix(a)
+    assert np.max(np.abs(g_matrix(a) - G)) < 1e-15
+    expected = (np.abs(G)**2).sum() - 2.0/(d + 1)
+    assert abs(loss(a) - expected) < 1e-14
+
+
+def finite_difference_gradient(f, x: np.ndarray, eps: float = 1e-6):
+    grad = np.zeros_like(x)
+    for i in range(x.size):
+        e = np.zeros_like(x)
+        e[i] = eps
+        grad[i] = (f(x + e) - f(x - e))/(2*eps)
+    return grad
+
+
+@pytest.mark.parametrize('d', [2, 3, 5, 8])
+def test_loss_and_grad_loss_matches_loss(d):
+    rng = np.random.default_rng(d)
+    a = rng.normal(size=d) + 1j*rng.normal(size=d)
+    result, _ = loss_and_grad(a)
+    assert abs(result - loss(a)) < 1e-12 * max(1.0, abs(loss(a)))
+
+
+@pytest.mark.parametrize('d', [2, 3, 5, 8])
+def test_loss_and_grad_gradient_of_complex_vector(d):
+    rng = np.random.default_rng(d)
+    a = rng.normal(size=d) + 1j*rng.normal(size=d)
+    _, grad = loss_and_grad(a)
+
+    def f(x):
+        return loss(x[:d] + 1j*x[d:])
+
+    expected = finite_difference_gradient(f, np.concatenate((a.real, a.imag)))
+    assert np.allclose(grad.real, expected[:d], rtol=1e-6, atol=1e-6)
+    assert np.allclose(grad.imag, expected[d:], rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize('d', [2, 3, 5, 8])
+def test_target_function_and_gradient(d):
+    x = random_real_vector(d, seed=d)
+    result, grad = target_function_and_gradient(x)
+    assert abs(result - target_function(x)) < 1e-12
+    expected = finite_difference_gradient(target_function, x)
+    assert np.allclose(grad, expected, rtol=1e-6, atol=1e-8)
+
+
+def test_target_function_and_gradient_outside_unit_ball():
+    x = np.array([1.0, 1.0, 0.0, 0.5])
+    result, grad = target_function_and_gradient(x)
+    assert result == target_function(x)
+    assert np.allclose(grad, 0.2*x)
+
+
+@pytest.mark.parametrize('d', [2, 3, 7, 12])
+def test_target_function_hessp(d):
+    x = random_real_vector(d, d)
+    v = np.random.default_rng(d).normal(size=x.size)
+    eps = 1e-6
+    expected = (
+        target_function_and_gradient(x + eps*v)[1]
+        - target_function_and_gradient(x - eps*v)[1]
+    ) / (2*eps)
+    hvp = target_function_hessp(x, v)
+    assert np.allclose(hvp, expected, rtol=1e-6, atol=1e-7)
+
+
+@pytest.mark.parametrize('d', [2, 3, 4, 7, 16, 31])
+def test_loss_bounded(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    expected = loss(a)
+    assert abs(loss_bounded(a, expected + 1e-12) - expected) < 1e-14
+    assert abs(loss_bounded(a, np.inf) - expected) < 1e-14
+    assert abs(loss_bounded(2*a, np.inf) - loss(2*a)) < 1e-11
+    assert loss_bounded(a, expected - 1e-12) == np.inf
+    assert loss_bounded(a, -1.0) == np.inf
+
+    x = random_real_vector(d, seed=d)
+    assert abs(target_function_bounded(x, 1.0) - target_function(x)) < 1e-14
+    assert target_function_bounded(x, -1.0) == np.inf
+    # the penalty outside the unit ball is not bounded
+    assert target_function_bounded(2*x, -1.0) == target_function(2*x)
+
+
+@pytest.mark.parametrize('d', [2, 3, 4, 7, 16, 31, 100])
+def test_loss_fft_matches_loss(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    assert abs(loss_fft(a) - loss(a)) < 1e-14
+
+
+@pytest.mark.parametrize('d', [1, 2, 3, 4, 5, 7, 16, 31, 100])
+def test_loss_fused_matches_loss(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    workspace = LossWorkspace(d)
+    assert abs(workspace.loss(a) - loss(a)) < 1e-14
+    # the workspace can be reused
+    b = real_to_complex(random_real_vector(d, seed=d + 1))
+    assert abs(workspace.loss(b) - loss(b)) < 1e-14
+
+
+@pytest.mark.parametrize('d', [2, 3, 4, 5, 7, 16, 31])
+def test_compiled_target_matches_target_function(d):
+    x = random_real_vector(d, seed=d)
+    target = CompiledTarget(d)
+    assert abs(target(x) - target_function(x)) < 1e-14
+    assert abs(target(2*x) - target_function(2*x)) < 1e-14
+    assert target.number_of_clips == 0
+
+
+def test_compiled_target_counts_clips():
+    # a fiducial vector in d = 2
+    r = 1/np.sqrt(3)
+    x = np.sqrt((1 - r)/2) * np.array([np.cos(np.pi/4), np.sin(np.pi/4)])
+    target = CompiledTarget(2)
+    assert target(x) == 1e-15
+    assert target(x) == 1e-15
+    assert target.number_of_clips == 2
+
+
+def test_compiled_target_rejects_other_dimensions():
+    target = CompiledTarget(4)
+    with pytest.raises(AssertionError):
+        target(random_real_vector(5, seed=0))
+
+
+@pytest.mark.parametrize('d', [2, 3, 4, 7, 16])
+def test_g_matrix_fft_matches_g_matrix(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    assert np.max(np.abs(g_matrix_fft(a) - g_matrix(a))) < 1e-14
+
+
+def test_loss_batch_matches_loss():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(20, 6)) + 1j*rng.normal(size=(20, 6))
+    expected = np.array([loss(row) for row in a])
+    assert np.array_equal(loss_batch(a), expected)
+
+
+def test_target_function_batch_matches_target_function():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-1.0, 1.0, size=(40, 10))
+    # half of the candidates inside the unit ball, half with penalty
+    x[:20] /= 1.1*np.linalg.norm(x[:20], axis=1).reshape(-1, 1)
+    expected = np.array([target_function(row) for row in x])
+    assert np.allclose(target_function_batch(x), expected, rtol=1e-14, atol=0)
+
+
+@pytest.mark.parametrize('d', [2, 3, 5, 30])
+def test_loss_parallel_matches_loss(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    assert abs(loss_parallel(a) - loss(a)) < 1e-14
+    result, grad = loss_and_grad_parallel(a)
+    expected_result, expected_grad = loss_and_grad(a)
+    assert abs(result - expected_result) < 1e-14
+    assert np.allclose(grad, expected_grad, rtol=1e-13, atol=1e-14)
+
+
+def test_loss_parallel_independent_of_number_of_threads():
+    a = real_to_complex(random_real_vector(40, seed=0))
+    results = []
+    previous = numba.get_num_threads()
+    for num_threads in range(1, numba.config.NUMBA_NUM_THREADS + 1):
+        set_num_threads(num_threads)
+        results.append((loss_parallel(a), *loss_and_grad_parallel(a)))
+    set_num_threads(previous)
+    for r in results[1:]:
+        assert r[0] == results[0][0]
+        assert r[1] == results[0][1]
+        assert np.array_equal(r[2], results[0][2])
+
+
+@pytest.mark.parametrize('d', [2, 3, 10, 30])
+def test_loss_float32_with_all_pairs_matches_loss(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    assert abs(loss_float32(a, screening_pairs(d, 1.0)) - loss(a)) < 1e-6
+
+
+@pytest.mark.parametrize('d', [3, 7])
+def test_loss_float32_single_pair_estimate_is_unbiased(d):
+    a = real_to_complex(random_real_vector(d, seed=d))
+    estimates = [
+        loss_float32(a, np.array([p])) for p in screening_pairs(d, 1.0)
+    ]
+    assert abs(np.mean(estimates) - loss(a)) < 1e-6
+
+
+@pytest.mark.parametrize('d', [2, 5, 17, 32])
+def test_updated_g_matrix_matches_g_matrix(d):
+    rng = np.random.default_rng(d)
+    a = real_to_complex(random_real_vector(d, d))
+    G = g_matrix(a)
+    for changed in ([0], [0, d - 1], [0, 1, d//2], np.arange(d)):
+        changed = np.unique(np.array(changed, dtype=np.int64))
+        b = a.copy()
+        b[changed] += rng.normal(size=changed.size) * (0.1 + 0.1j)
+        assert np.allclose(
+            _updated_g_matrix(a, b, G, changed), g_matrix(b), atol=1e-14
+        )
+
+
+@pytest.mark.parametrize('d', [24, 40])
+def test_incremental_target_matches_target_function(d):
+    rng = np.random.default_rng(d)
+    target = IncrementalTarget(refresh_interval=5)
+    x = random_real_vector(d, d)
+    for _ in range(20):
+        y = x.copy()
+        y[rng.integers(x.size)] += 0.01 * rng.normal()
+        target.set_reference(x)
+        assert abs(target(y) - target_function(y)) < 1e-13
+        target.accept()
+        x = y
+    assert target.number_of_incremental_evaluations == 20
+
+
+@pytest.mark.parametrize('d', [4, 30])
+def test_incremental_finite_difference_gradient(d):
+    x = random_real_vector(d, d)
+    grad = IncrementalTarget().finite_difference_gradient(x, eps=1e-7)
+    _, expected = target_function_and_gradient(x)
+    assert np.allclose(grad, expected, atol=1e-5)
+
+
+@pytest.mark.parametrize('d', [2, 3, 7, 16])
+def test_loss_coefficients(d):
+    rng = np.random.default_rng(d)
+    a = rng.normal(size=d) + 1j*rng.normal(size=d)
+    p = rng.normal(size=d) + 1j*rng.normal(size=d)
+    c = loss_coefficients(a, p)
+    for t in [0.0, 0.3, -1.7]:
+        expected = loss(a + t*p)
+        polynomial = np.polynomial.polynomial.polyval(t, c)
+        assert abs(polynomial - expected) < 1e-12 * max(1.0, abs(expected))
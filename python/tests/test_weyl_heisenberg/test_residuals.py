@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+
+from weyl_heisenberg._loss import loss, target_function, real_to_complex
+from weyl_heisenberg.sphere import sphere_to_complex
+from weyl_heisenberg import (
+    residuals,
+    residuals_jacobian,
+    residuals_sphere,
+    residuals_jacobian_sphere,
+)
+
+
+def finite_difference_jacobian(f, x, h=1e-6):
+    columns = [(f(x + h*e) - f(x - h*e)) / (2*h) for e in np.eye(x.size)]
+    return np.array(columns).T
+
+
+@pytest.mark.parametrize('d', [2, 3, 6])
+def test_residuals(d):
+    x = np.random.default_rng(d).normal(size=2*d - 2)
+    x *= 0.8 / np.linalg.norm(x)
+    r = residuals(x)
+    assert r.shape == (d*d - 1,)
+    assert abs(r.dot(r) - loss(real_to_complex(x))) < 1e-12
+    J = residuals_jacobian(x)
+    assert np.allclose(J, finite_difference_jacobian(residuals, x), atol=1e-8)
+
+    # the same penalty as the target function outside the unit ball
+    r = residuals(2.0*x)
+    assert abs(r.dot(r) - target_function(2.0*x)) < 1e-12
+
+
+@pytest.mark.parametrize('d', [2, 3, 6])
+def test_residuals_sphere(d):
+    x = 2.0 * np.random.default_rng(d).normal(size=2*d - 2)
+    r = residuals_sphere(x)
+    assert abs(r.dot(r) - loss(sphere_to_complex(x)[0])) < 1e-12
+    J = residuals_jacobian_sphere(x)
+    expected = finite_difference_jacobian(residuals_sphere, x)
+    assert np.allclose(J, expected, atol=1e-8)
+
+
+def test_residuals_vanish_for_fiducial():
+    # a fiducial vector in d = 2
+    r = 1/np.sqrt(3)
+    x = np.sqrt((1 - r)/2) * np.array([np.cos(np.pi/4), np.sin(np.pi/4)])
+    assert np.abs(residuals(x)).max() < 1e-15
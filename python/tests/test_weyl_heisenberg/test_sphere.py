@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+
+from weyl_heisenberg._loss import loss
+from weyl_heisenberg.sphere import (
+    sphere_to_complex,
+    sphere_to_complex_batch,
+    complex_to_sphere,
+    target_function_sphere,
+    target_function_and_gradient_sphere,
+    target_function_hessp_sphere,
+    target_function_batch_sphere,
+    target_function_screening_batch_sphere,
+    exact_line_search_sphere,
+)
+
+
+tol = 1e-12
+
+
+def random_parameters(d: int, seed: int) -> np.ndarray:
+    # deliberately far outside the unit ball
+    return 2.0 * np.random.default_rng(seed).normal(size=2*d - 2)
+
+
+@pytest.mark.parametrize('d', [2, 3, 7])
+def test_sphere_to_complex(d):
+    x = random_parameters(d, d)
+    a, norm = sphere_to_complex(x)
+    assert abs(np.linalg.norm(a) - 1.0) < tol
+    assert a[0].imag == 0.0 and a[0].real > 0.0
+    assert abs(norm * a[0] - 1.0) < tol
+    assert np.allclose(sphere_to_complex_batch(x[np.newaxis])[0], a, atol=tol)
+    # the inverse ignores the global phase
+    assert np.allclose(complex_to_sphere(np.exp(0.7j) * a), x, atol=tol)
+
+
+@pytest.mark.parametrize('d', [2, 3, 7])
+def test_target_function_sphere(d):
+    x = random_parameters(d, d)
+    expected = loss(sphere_to_complex(x)[0])
+    assert abs(target_function_sphere(x) - expected) < tol
+    value, _ = target_function_and_gradient_sphere(x)
+    assert abs(value - expected) < tol
+    assert np.allclose(
+        target_function_batch_sphere(np.stack([x, 2*x])),
+        [expected, target_function_sphere(2*x)],
+        atol=tol
+    )
+    assert np.allclose(
+        target_function_screening_batch_sphere(x[np.newaxis]),
+        expected,
+        atol=1e-5
+    )
+
+
+@pytest.mark.parametrize('d', [2, 3, 7])
+def test_target_function_sphere_gradient_and_hessp(d):
+    x = random_parameters(d, d)
+    v = np.random.default_rng(d + 1).normal(size=x.size)
+    eps = 1e-6
+
+    _, grad = target_function_and_gradient_sphere(x)
+    expected = np.array([
+        (target_function_sphere(x + eps*e) - target_function_sphere(x - eps*e))
+        / (2*eps)
+        for e in np.eye(x.size)
+    ])
+    assert np.allclose(grad, expected, atol=1e-8)
+
+    expected = (
+        target_function_and_gradient_sphere(x + eps*v)[1]
+        - target_function_and_gradient_sphere(x - eps*v)[1]
+    ) / (2*eps)
+    assert np.allclose(target_function_hessp_sphere(x, v), expected, atol=1e-7)
+
+
+@pytest.mark.parametrize('d', [2, 3, 7])
+def test_exact_line_search_sphere(d):
+    rng = np.random.default_rng(d)
+    x = random_parameters(d, d)
+    v = rng.normal(size=2*d - 2)
+    t = exact_line_search_sphere(x, v)
+    best = target_function_sphere(x + t*v)
+    steps = np.linspace(-10.0, 10.0, 2001)
+    assert best <= min(target_function_sphere(x + s*v) for s in steps) + tol
+    assert exact_line_search_sphere(x, np.zeros_like(v)) == 0.0
@@ -0,0 +1,120 @@
+import pytest
+import numpy as np
+
+from gradient_descent import Parameters
+from weyl_heisenberg.symmetry import (
+    zauner_unitary,
+    zauner_eigenspaces,
+    SubspaceTarget,
+)
+
+
+tol = 1e-12
+
+
+@pytest.mark.parametrize('d', range(2, 13))
+def test_zauner_unitary_has_order_3(d):
+    U = zauner_unitary(d)
+    assert np.allclose(U @ U.conj().T, np.eye(d), atol=tol)
+    assert np.allclose(np.linalg.matrix_power(U, 3), np.eye(d), atol=tol)
+
+
+@pytest.mark.parametrize('d', range(2, 13))
+def test_zauner_eigenspaces(d):
+    U = zauner_unitary(d)
+    bases = zauner_eigenspaces(d)
+    assert sum(basis.shape[1] for basis in bases) == d
+    for k, basis in enumerate(bases):
+        r = basis.shape[1]
+        assert np.allclose(basis.conj().T @ basis, np.eye(r), atol=tol)
+        eigenvalue = np.exp(2j*np.pi*k/3)
+        assert np.allclose(U @ basis, eigenvalue*basis, atol=tol)
+
+
+def random_reduced_vector(target: SubspaceTarget, seed: int) -> np.ndarray:
+    y = np.random.default_rng(seed).normal(size=target.n_dims)
+    return 0.8 * y / np.linalg.norm(y)
+
+
+@pytest.mark.parametrize('d', [4, 7, 12])
+def test_subspace_target_matches_full_loss(d):
+    target = SubspaceTarget.for_symmetry(d, 'zauner')
+    y = random_reduced_vector(target, d)
+    a = target.to_complex(y)
+    assert abs(np.linalg.norm(a) - 1.0) < tol
+    Ua = zauner_unitary(d) @ a
+    assert np.allclose(Ua, np.vdot(a, Ua)*a, atol=tol)
+
+    value, _ = target.target_function_and_gradient(y)
+    assert abs(value - target.target_function(y)) < tol
+    assert np.allclose(
+        target.target_function_batch(np.stack([y, 2*y])),
+        [target.target_function(y), target.target_function(2*y)]
+    )
+    assert np.allclose(
+        target.target_function_screening_batch(y[np.newaxis]),
+        target.target_function(y),
+        atol=1e-5
+    )
+
+
+@pytest.mark.parametrize('d', [4, 7, 12])
+def test_subspace_target_gradient_and_hessp(d):
+    target = SubspaceTarget.for_symmetry(d, 'zauner')
+    y = random_reduced_vector(target, d)
+    v = np.random.default_rng(d + 1).normal(size=y.size)
+    eps = 1e-6
+
+    _, grad = target.target_function_and_gradient(y)
+    expected = np.array([
+        (target.target_function(y + eps*e) - target.target_function(y - eps*e))
+        / (2*eps)
+        for e in np.eye(y.size)
+    ])
+    assert np.allclose(grad, expected, atol=1e-7)
+
+    expected = (
+        target.target_function_and_gradient(y + eps*v)[1]
+        - target.target_function_and_gradient(y - eps*v)[1]
+    ) / (2*eps)
+    assert np.allclose(target.target_function_hessp(y, v), expected, atol=1e-6)
+
+
+@pytest.mark.parametrize('d', [4, 7])
+def test_subspace_target_sphere(d):
+    target = SubspaceTarget.for_symmetry(d, 'zauner', 'sphere')
+    y = 2.0 * np.random.default_rng(d).normal(size=target.n_dims)
+    a = target.to_complex(y)
+    assert abs(np.linalg.norm(a) - 1.0) < tol
+    Ua = zauner_unitary(d) @ a
+    assert np.allclose(Ua, np.vdot(a, Ua)*a, atol=tol)
+
+    value, grad = target.target_function_and_gradient(y)
+    assert abs(value - target.target_function(y)) < tol
+    assert np.allclose(
+        target.target_function_batch(np.stack([y, 2*y])),
+        [target.target_function(y), target.target_function(2*y)]
+    )
+    eps = 1e-6
+    expected = np.array([
+        (target.target_function(y + eps*e) - target.target_function(y - eps*e))
+        / (2*eps)
+        for e in np.eye(y.size)
+    ])
+    assert np.allclose(grad, expected, atol=1e-7)
+    v = np.random.default_rng(d + 1).normal(size=y.size)
+    expected = (
+        target.target_function_and_gradient(y + eps*v)[1]
+        - target.target_function_and_gradient(y - eps*v)[1]
+    ) / (2*eps)
+    assert np.allclose(target.target_function_hessp(y, v), expected, atol=1e-6)
+
+
+def test_no_symmetry():
+    assert SubspaceTarget.for_symmetry(5, 'none') is None
+
+
+def test_zauner_requires_dimension_3():
+    with pytest.raises(AssertionError, match='requires d >= 3'):
+        Parameters('SICPOVM', 2, symmetry='zauner')
+    assert Parameters('SICPOVM', 4, symmetry='zauner').n_dims == 2
@@ -1 +1,32 @@
-from ._loss import target_function
+# configures the numba cache, so it must be imported before the kernels
+from ._compilation import warmup
+from ._loss import (
+    target_function,
+    target_function_fft,
+    target_function_parallel,
+    target_function_bounded,
+    target_function_batch,
+    target_function_screening,
+    target_function_screening_batch,
+    target_function_and_gradient,
+    target_function_and_gradient_parallel,
+    target_function_hessp,
+)
+from ._parallel import set_num_threads
+from ._residuals import residuals, residuals_jacobian
+from .incremental import IncrementalTarget
+from .fused import LossWorkspace
+from .compiled import CompiledTarget
+from .sphere import (
+    target_function_sphere,
+    target_function_bounded_sphere,
+    target_function_and_gradient_sphere,
+    target_function_hessp_sphere,
+    exact_line_search_sphere,
+    target_function_batch_sphere,
+    target_function_screening_batch_sphere,
+    residuals_sphere,
+    residuals_jacobian_sphere,
+)
+from .symmetry import SubspaceTarget
+from .autotune import autotuned_kernels
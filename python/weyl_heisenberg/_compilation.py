@@ -0,0 +1,68 @@
+"""
+Compilation of the numba kernels.
+
+The kernels are compiled with ``cache=True``, so that the machine code is
+stored on disk and loaded by later processes instead of being recompiled. The
+cache directory is read from the 'POVM_NUMBA_CACHE_DIR' environment variable,
+which can point to a directory shared by several jobs. It has to be set before
+the kernels are defined, so this module is imported first in
+``weyl_heisenberg/__init__.py``.
+"""
+
+import time
+
+import numpy as np
+import numba     # type: ignore
+
+from environment_variables import get_numba_cache_dir
+
+
+_cache_dir = get_numba_cache_dir()
+if _cache_dir is not None:
+    _cache_dir.mkdir(parents=True, exist_ok=True)
+    numba.config.CACHE_DIR = str(_cache_dir)
+
+
+def warmup() -> float:
+    """Compile, or load from the cache, all the numba kernels.
+
+    Intended to be called once per process before the minimization starts,
+    e.g. as the initializer of a ``multiprocessing.Pool``, so that the
+    compilation time is not attributed to the first function evaluations.
+
+    returns:
+        (float): the time spent, in seconds
+    """
+    from ._loss import (
+        target_function,
+        target_function_parallel,
+        target_function_bounded,
+        target_function_batch,
+        target_function_screening,
+        target_function_screening_batch,
+        target_function_and_gradient,
+        target_function_and_gradient_parallel,
+        target_function_hessp,
+    )
+    from .incremental import IncrementalTarget
+    from .fused import LossWorkspace
+    from .compiled import CompiledTarget
+
+    start = time.perf_counter()
+    x = np.full(4, 0.3)
+    x_batch = np.stack([x, 2*x])
+    target_function(x)
+    target_function_parallel(x)
+    target_function_bounded(x, 1.0)
+    target_function_batch(x_batch)
+    target_function_screening(x)
+    target_function_screening_batch(x_batch)
+    target_function_and_gradient(x)
+    target_function_and_gradient_parallel(x)
+    target_function_hessp(x, x)
+    incremental = IncrementalTarget()
+    incremental.set_reference(x)
+    incremental(0.9*x)
+    LossWorkspace(3).target_function(x)
+    CompiledTarget(3)(x)
+    return time.perf_counter() - start
@@ -1,11 +1,22 @@
-import time
+from typing import Tuple, Callable, Optional
+from functools import lru_cache
 import logging
 
 import numpy as np
-from numba import jit   # type: ignore
+from numba import jit, prange    # type: ignore
 
+from ._parallel import (
+    loss_parallel,
+    loss_and_grad_parallel,
+    _pair_from_index,
+    _orbit_weight,
+    _representatives,
+)
 
-def target_function(x: np.ndarray) -> float:
+
+def target_function(
+    x: np.ndarray, kernel: Optional[Callable] = None
+) -> float:
     """Wrapper for G-matrix loss to define target function.
 
     Does not enforce norm <= 1, but penalizes this with a large value of the
@@ -16,6 +27,8 @@ def target_function(x: np.ndarray) -> float:
     args:
         x (np.ndarray of float): the candidate array, should be of length
             ``2*d - 2`` where ``d`` is the dimensionality of the Hilbert space
+        kernel (Callable, optional): the function computing the loss of the
+            complex vector, ``loss`` by default
 
     returns:
         (float): the loss
@@ -24,7 +37,9 @@ def target_function(x: np.ndarray) -> float:
     if n > 1.0:
         return 0.1 * n**2
 
-    result = loss(real_to_complex(x))
+    if kernel is None:
+        kernel = loss
+    result = kernel(real_to_complex(x))
 
     if result < 1e-15:
         logging.getLogger('weyl-heisenberg.loss').warning(
@@ -34,6 +49,255 @@ def target_function(x: np.ndarray) -> float:
     return result
 
 
+def target_function_fft(x: np.ndarray) -> float:
+    """Target function using the FFT based ``loss_fft``.
+
+    Same as ``target_function``, but scales as O(d^2 log d) instead of O(d^3)
+    with the dimension d of the Hilbert space.
+    """
+    return target_function(x, kernel=loss_fft)
+
+
+def target_function_parallel(x: np.ndarray) -> float:
+    """Target function using the multithreaded ``loss_parallel``.
+
+    Same as ``target_function``, intended for large dimensions where a single
+    evaluation is expensive enough to be split between threads.
+    """
+    return target_function(x, kernel=loss_parallel)
+
+
+def target_function_batch(x: np.ndarray) -> np.ndarray:
+    """Batched version of ``target_function``.
+
+    Evaluates the target function for every row of ``x`` in one call to a
+    parallel numba kernel, including the penalty for rows outside the unit
+    ball. Rows with a loss below 1e-15 are clipped as in
+    ``target_function``, with one warning per call.
+
+    args:
+        x (np.ndarray of float): the candidate arrays, of shape
+            ``(P, 2*d - 2)`` where ``P`` is the number of candidates and
+            ``d`` is the dimensionality of the Hilbert space
+
+    returns:
+        (np.ndarray of float): the ``P`` losses
+    """
+    return clip_batch(_target_batch(np.ascontiguousarray(x, dtype=np.float64)))
+
+
+def clip_batch(result: np.ndarray) -> np.ndarray:
+    """Clip losses below 1e-15 as in ``target_function``, with one warning
+    for the whole batch.
+    """
+    clipped = result < 1e-15
+    if clipped.any():
+        logging.getLogger('weyl-heisenberg.loss').warning(
+            'Loss clipped to 1e-15 for %d of %d candidates, smallest %f',
+            clipped.sum(), result.size, result.min()
+        )
+        result[clipped] = 1e-15
+    return result
+
+
+def target_function_bounded(
+    x: np.ndarray, bound: float, kernel: Optional[Callable] = None
+) -> float:
+    """Target function which is only evaluated exactly below ``bound``.
+
+    Same as ``target_function`` if the result is at most ``bound``, otherwise
+    the evaluation may stop early and return infinity, see ``loss_bounded``.
+
+    args:
+        x (np.ndarray of float): the candidate array, should be of length
+            ``2*d - 2`` where ``d`` is the dimensionality of the Hilbert space
+        bound (float): the largest value of interest
+        kernel (Callable, optional): the function computing the bounded loss
+            of the complex vector, given the vector and the bound,
+            ``loss_bounded`` by default
+
+    returns:
+        (float): the loss, or infinity if it exceeds ``bound``
+    """
+    if kernel is None:
+        kernel = loss_bounded
+    return target_function(x, kernel=lambda a: kernel(a, bound))
+
+
+def target_function_screening(x: np.ndarray, fraction: float = 1.0) -> float:
+    """Cheap approximation of ``target_function`` for screening candidates.
+
+    Uses the single precision kernel ``loss_float32``, optionally on a random
+    subset of the terms of the loss, see ``screening_pairs``. Values are not
+    clipped, and should not be used to decide whether a solution is found.
+
+    args:
+        x (np.ndarray of float): the candidate array, should be of length
+            ``2*d - 2`` where ``d`` is the dimensionality of the Hilbert space
+        fraction (float): the fraction of the (k, l) terms to include
+
+    returns:
+        (float): the approximate loss
+    """
+    n = np.linalg.norm(x)
+    if n > 1.0:
+        return 0.1 * n**2
+    a = real_to_complex(x)
+    return loss_float32(a, screening_pairs(a.size, fraction))
+
+
+def target_function_screening_batch(
+    x: np.ndarray, fraction: float = 1.0
+) -> np.ndarray:
+    """Batched version of ``target_function_screening``.
+
+    All rows are evaluated with the same subset of terms, so that the
+    sampling noise is correlated between the candidates being compared.
+
+    args:
+        x (np.ndarray of float): the candidate arrays, of shape
+            ``(P, 2*d - 2)``
+        fraction (float): the fraction of the (k, l) terms to include
+
+    returns:
+        (np.ndarray of float): the ``P`` approximate losses
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    pairs = screening_pairs(x.shape[1]//2 + 1, fraction)
+    return _target_batch_float32(x, pairs)
+
+
+def screening_pairs(d: int, fraction: float) -> np.ndarray:
+    """Indices of the (k, l) terms used by ``loss_float32``.
+
+    The index of the pair (k, l), l <= k, is k(k + 1)/2 + l, and only the
+    pairs which represent the orbits of the symmetries of the G-matrix are
+    used, see ``_orbit_weight``. With ``fraction < 1`` the indices are drawn
+    uniformly with replacement from ``numpy.random``, which makes the
+    estimate of the loss unbiased.
+
+    args:
+        d (int): the dimensionality of the Hilbert space
+        fraction (float): the fraction of the pairs to draw, in (0, 1]
+
+    returns:
+        (np.ndarray of int): the pair indices
+    """
+    assert 0.0 < fraction <= 1.0
+    pairs = _representatives(d)
+    if fraction == 1.0:
+        return pairs
+    n_samples = max(1, int(fraction * pairs.size))
+    return pairs[np.random.randint(0, pairs.size, size=n_samples)]
+
+
+def target_function_and_gradient(
+    x: np.ndarray, kernel: Optional[Callable] = None
+) -> Tuple[float, np.ndarray]:
+    """Wrapper for G-matrix loss and its gradient to define target function.
+
+    Counterpart of ``target_function`` for minimizers which accept the
+    gradient together with the function value (``jac=True`` in
+    ``scipy.optimize.minimize``). The gradient is taken with respect to the
+    real parameters ``x``, i.e. it includes the dependence of the first
+    complex element on ``x`` through the normalization in
+    ``real_to_complex``.
+
+    args:
+        x (np.ndarray of float): the candidate array, should be of length
+            ``2*d - 2`` where ``d`` is the dimensionality of the Hilbert space
+        kernel (Callable, optional): the function computing the loss and the
+            gradient of the complex vector, ``loss_and_grad`` by default
+
+    returns:
+        (float): the loss
+        (np.ndarray of float): the gradient of the loss with respect to ``x``
+    """
+    n = np.linalg.norm(x)
+    if n > 1.0:
+        return 0.1 * n**2, 0.2 * x
+
+    if kernel is None:
+        kernel = loss_and_grad
+    a = real_to_complex(x)
+    result, grad_a = kernel(a)
+    grad = complex_to_real_gradient(a, grad_a)
+
+    if result < 1e-15:
+        logging.getLogger('weyl-heisenberg.loss').warning(
+            'Loss clipped from %f to 1e-15', result
+        )
+        return 1e-15, grad
+    return result, grad
+
+
+def target_function_and_gradient_parallel(
+    x: np.ndarray
+) -> Tuple[float, np.ndarray]:
+    """Target function and gradient using the multithreaded
+    ``loss_and_grad_parallel``, see ``target_function_and_gradient``.
+    """
+    return target_function_and_gradient(x, kernel=loss_and_grad_parallel)
+
+
+def target_function_hessp(
+    x: np.ndarray, v: np.ndarray, kernel: Optional[Callable] = None
+) -> np.ndarray:
+    """Exact product of the Hessian of the target function with a vector.
+
+    Counterpart of ``target_function_and_gradient`` for minimizers taking the
+    ``hessp`` argument of ``scipy.optimize.minimize``, e.g. 'trust-ncg' and
+    'trust-krylov'. The Hessian is taken with respect to the real parameters
+    ``x``, including the curvature of the normalization in
+    ``real_to_complex``.
+
+    args:
+        x (np.ndarray of float): the point at which the Hessian is evaluated,
+            see ``target_function``
+        v (np.ndarray of float): the vector to multiply by, same shape as
+            ``x``
+        kernel (Callable, optional): the function computing the gradient of
+            the loss and the Hessian-vector product for the complex vector,
+            given the vector and the direction, ``gradient_and_hvp`` by
+            default
+
+    returns:
+        (np.ndarray of float): the Hessian-vector product
+    """
+    n = np.linalg.norm(x)
+    if n > 1.0:
+        return 0.2 * v
+
+    if kernel is None:
+        kernel = gradient_and_hvp
+    a = real_to_complex(x)
+    # the direction in the complex vector corresponding to v
+    a_dot = real_to_complex_tangent(a, v)
+    grad_a, hvp_a = kernel(a, a_dot)
+
+    # differentiate complex_to_real_gradient along v, the terms from the
+    # normalization vanish with it on the unit sphere
+    z0 = a.real[0]
+    if z0 > 0.0:
+        scale = grad_a.real[0] / z0
+        scale_dot = hvp_a.real[0] / z0 - grad_a.real[0] * a_dot.real[0] / z0**2
+    else:
+        scale = scale_dot = 0.0
+    hvp = np.empty_like(x)
+    hvp[::2] = hvp_a.real[1:] - scale_dot * x[::2] - scale * v[::2]
+    hvp[1::2] = hvp_a.imag[1:] - scale_dot * x[1::2] - scale * v[1::2]
+    return hvp
+
+
+def gradient_and_hvp(
+    a: np.ndarray, a_dot: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The gradient of the loss of the complex vector ``a``, and its
+    derivative along ``a_dot``, see ``hessian_vector_product``.
+    """
+    return loss_and_grad(a)[1], hessian_vector_product(a, a_dot)
+
+
 def real_to_complex(a: np.ndarray) -> np.ndarray:
     """
     Cast array of 2N real parameters to array of N + 1 complex parameters.
@@ -52,7 +316,46 @@ def real_to_complex(a: np.ndarray) -> np.ndarray:
     return z
 
 
-@jit(nopython=True)
+def real_to_complex_tangent(z: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    Push a direction in the real parameters forward to the complex vector
+    ``z = real_to_complex(x)``, i.e. the derivative of ``z`` along ``v``.
+    """
+    z_dot = np.empty_like(z)
+    z_dot.real[1:] = v[::2]
+    z_dot.imag[1:] = v[1::2]
+    # z[0] = sqrt(1 - |x|^2) gives d z[0] = -x.v / z[0]
+    x_dot_v = z.real[1:].dot(v[::2]) + z.imag[1:].dot(v[1::2])
+    z_dot.real[0] = -x_dot_v / z.real[0] if z.real[0] > 0.0 else 0.0
+    z_dot.imag[0] = 0.0
+    return z_dot
+
+
+def complex_to_real_gradient(z: np.ndarray, grad_z: np.ndarray) -> np.ndarray:
+    """
+    Pull a gradient with respect to the complex vector back to the real
+    parameters of ``real_to_complex``.
+
+    args:
+        z (np.ndarray of complex numbers): the output of ``real_to_complex``
+        grad_z (np.ndarray of complex numbers): the gradient with respect to
+            ``z``, the real (imaginary) part holding the partial derivatives
+            with respect to the real (imaginary) parts of ``z``
+
+    returns:
+        (np.ndarray of float): the gradient with respect to the real
+            parameters, of length ``2*(z.size - 1)``
+    """
+    # z[0] = sqrt(1 - |x|^2) gives d z[0] / d x_i = -x_i / z[0], which is
+    # unbounded on the unit sphere, where the dependence on z[0] is dropped
+    scale = grad_z.real[0] / z.real[0] if z.real[0] > 0.0 else 0.0
+    grad = np.empty(2*z.size - 2, dtype=np.float64)
+    grad[::2] = grad_z.real[1:] - scale * z.real[1:]
+    grad[1::2] = grad_z.imag[1:] - scale * z.imag[1:]
+    return grad
+
+
+@jit(nopython=True, cache=True)
 def _loss_2(a: np.ndarray) -> float:
     """Calculate the G-matrix loss of the input vector.
 
@@ -78,10 +381,14 @@ def _loss_2(a: np.ndarray) -> float:
     return result
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def loss(a: np.ndarray):
     """Calculate the G-matrix loss of the input vector.
 
+    Only one element of each orbit of the symmetries of the G-matrix is
+    computed, see ``_orbit_weight``, which is about a quarter of the d^2
+    elements.
+
     args:
         a (np.ndarray of complex numbers):
             the candidate vector for which the loss should be calculated
@@ -96,29 +403,432 @@ def loss(a: np.ndarray):
     A_conj = A.conj()
     result = (np.abs(a)**4).sum()**2
     for k in range(1, d):
-        for l in range(k):
-            result += 2*abs((a * A_conj[k:k+d] * A_conj[l:l+d]).dot(A[(k+l) % d:(k+l) % d + d]))**2
-        result += abs((a * A_conj[k:k+d]**2).dot(A[(2*k) % d : (2*k) % d + d]))**2
+        for l in range(k + 1):
+            weight = _orbit_weight(d, k, l)
+            if weight == 0:
+                continue
+            kl = (k + l) % d
+            g = (a * A_conj[k:k+d] * A_conj[l:l+d]).dot(A[kl:kl+d])
+            result += weight*abs(g)**2
     bound = 2.0/(d + 1)
     result -= bound
     return result
 
 
-def time_loss():
-    np.random.seed(12345)
-    x = np.random.random(1000)
-    x /= np.linalg.norm(x)
-    x *= 0.9
-    a = real_to_complex(x)
-    N_trials = 20
-    start = time.perf_counter()
-    for _ in range(N_trials):
-        _loss_2(a)
-        # loss(a)
-    duration = time.perf_counter() - start
-    print(f'Total duration: {duration:.3f} s')
-    print(f'Time per evalution: {duration/N_trials:.5f} s')
-
-
-if __name__ == '__main__':
-    time_loss()
+@lru_cache(maxsize=None)
+def _dft_matrix(d: int) -> np.ndarray:
+    """The (d, d) matrix of the discrete Fourier transform, for
+    ``loss_bounded``."""
+    n = np.arange(d)
+    return np.exp(-2j*np.pi*np.outer(n, n)/d)
+
+
+def loss_bounded(a: np.ndarray, cutoff: float) -> float:
+    """Calculate the G-matrix loss of the input vector, unless it exceeds
+    ``cutoff``.
+
+    Intended for comparisons where only values below ``cutoff`` matter, e.g.
+    the selection of trial vectors in differential evolution. The loss is
+    written in terms of the overlaps x_p = |<a|D_p|a>|^2 with the d^2
+    Weyl-Heisenberg displacement operators D_p, as
+    L = 1/d sum_p x_p^2 - 2/(d + 1),
+    which equals the sum over the G-matrix by Parseval's theorem. As
+    sum_p x_p = d |a|^4 is known in advance, the Cauchy-Schwarz inequality
+    bounds the sum of x_p^2 over the remaining p from below after each block
+    of overlaps, and the evaluation stops as soon as this bound on the loss
+    exceeds ``cutoff``. The overlaps with the same shift k are the discrete
+    Fourier transform of a_m conj(a_{m+k}), and x_{-p} = x_p, so only the
+    rows k <= d/2 are needed. They are computed in blocks of doubling size,
+    each with one matrix product, so that a full evaluation is several times
+    faster than ``loss`` from d = 32 on.
+
+    args:
+        a (np.ndarray of complex numbers):
+            the candidate vector for which the loss should be calculated
+        cutoff (float): the largest loss of interest
+
+    returns:
+        (float): the loss, equal to ``loss`` up to rounding errors, or
+            infinity if it is larger than ``cutoff``
+    """
+    return _loss_bounded(a, cutoff, _dft_matrix(a.size))
+
+
+@jit(nopython=True, cache=True)
+def _loss_bounded(a: np.ndarray, cutoff: float, dft: np.ndarray) -> float:
+    """Kernel of ``loss_bounded``, with the matrix from ``_dft_matrix``."""
+    d = a.size
+    n_rows = d//2 + 1
+    norm_sq = (a.real**2 + a.imag**2).sum()
+    total = d*norm_sq**2
+    limit = d*(cutoff + 2.0/(d + 1))
+    a_conj = a.conj()
+    P = np.empty((n_rows, d), dtype=np.complex128)
+    for k in range(n_rows):
+        for m in range(d):
+            j = m + k if m + k < d else m + k - d
+            P[k, m] = a[m] * a_conj[j]
+    sum_x = 0.0
+    sum_x_sq = 0.0
+    n_done = 0
+    start = 0
+    block = 1
+    while start < n_rows:
+        stop = min(start + block, n_rows)
+        F = np.dot(P[start:stop], dft)
+        for k in range(start, stop):
+            weight = 1 if k == 0 or 2*k == d else 2
+            for f in range(d):
+                x = F[k - start, f].real**2 + F[k - start, f].imag**2
+                sum_x += weight*x
+                sum_x_sq += weight*x*x
+            n_done += weight*d
+        n_remaining = d*d - n_done
+        if n_remaining > 0:
+            remaining = total - sum_x
+            if sum_x_sq + remaining*remaining/n_remaining > limit:
+                return np.inf
+        start = stop
+        block *= 2
+    result = sum_x_sq/d - 2.0/(d + 1)
+    return np.inf if result > cutoff else result
+
+
+@jit(nopython=True, cache=True)
+def g_matrix(a: np.ndarray) -> np.ndarray:
+    """Calculate the full G-matrix of the input vector.
+
+    The elements are
+    G_kl = sum_m a_m conj(a_{m+k}) conj(a_{m+l}) a_{m+k+l},
+    with all indices taken modulo d. Only one element of each orbit of the
+    symmetries G_kl = G_lk and G_{-k,-l} = G_kl is computed, see
+    ``_orbit_weight``.
+
+    args:
+        a (np.ndarray of complex numbers): the candidate vector
+
+    returns:
+        (np.ndarray of complex numbers): the (d, d) G-matrix
+    """
+    d = a.size
+    A = np.empty(2*d, dtype=np.complex128)
+    A[:d] = a
+    A[d:] = a
+    A_conj = A.conj()
+    G = np.empty((d, d), dtype=np.complex128)
+    for k in range(d):
+        for l in range(k + 1):
+            if _orbit_weight(d, k, l) == 0:
+                continue
+            kl = (k + l) % d
+            g = (a * A_conj[k:k+d] * A_conj[l:l+d]).dot(A[kl:kl+d])
+            nk = (d - k) % d
+            nl = (d - l) % d
+            G[k, l] = G[l, k] = G[nk, nl] = G[nl, nk] = g
+    return G
+
+
+@jit(nopython=True, cache=True)
+def loss_and_grad(a: np.ndarray):
+    """Calculate the G-matrix loss of the input vector and its gradient.
+
+    The gradient is exact, and is given by
+    dL/dRe(a_j) + i dL/dIm(a_j)
+        = 8 sum_{k, l} G_kl a_{j+k} a_{j+l} conj(a_{j+k+l}),
+    which follows from the symmetries G_kl = G_lk, G_{-k,-l} = G_kl and
+    conj(G_kl) = G_{-k,l} of the G-matrix. The loss is computed from the same
+    G-matrix, so the pair costs about two evaluations of ``loss``.
+
+    args:
+        a (np.ndarray of complex numbers):
+            the candidate vector for which the loss should be calculated
+
+    returns:
+        (float): the loss
+        (np.ndarray of complex numbers): the gradient, the real (imaginary)
+            part holding the partial derivatives with respect to the real
+            (imaginary) parts of ``a``
+    """
+    d = a.size
+    A = np.empty(2*d, dtype=np.complex128)
+    A[:d] = a
+    A[d:] = a
+    A_conj = A.conj()
+    G = g_matrix(a)
+    result = (G.real**2 + G.imag**2).sum() - 2.0/(d + 1)
+
+    grad = np.zeros(d, dtype=np.complex128)
+    for k in range(d):
+        for l in range(k):
+            kl = (k + l) % d
+            grad += 2*G[k, l] * A[k:k+d] * A[l:l+d] * A_conj[kl:kl+d]
+        kk = (2*k) % d
+        grad += G[k, k] * A[k:k+d]**2 * A_conj[kk:kk+d]
+    grad *= 8
+    return result, grad
+
+
+@jit(nopython=True, cache=True)
+def hessian_vector_product(a: np.ndarray, a_dot: np.ndarray) -> np.ndarray:
+    """Calculate the derivative of the gradient of ``loss_and_grad`` along a
+    direction, i.e. the exact Hessian-vector product of the loss.
+
+    Obtained by differentiating
+    8 sum_{k, l} G_kl a_{j+k} a_{j+l} conj(a_{j+k+l})
+    with the product rule, which requires the derivative of the G-matrix along
+    ``a_dot``. The cost is about three evaluations of ``loss``.
+
+    args:
+        a (np.ndarray of complex numbers): the point of evaluation
+        a_dot (np.ndarray of complex numbers): the direction, the real
+            (imaginary) part holding the changes of the real (imaginary)
+            parts of ``a``
+
+    returns:
+        (np.ndarray of complex numbers): the Hessian-vector product, in the
+            same format as the gradient of ``loss_and_grad``
+    """
+    d = a.size
+    A = np.empty(2*d, dtype=np.complex128)
+    A[:d] = a
+    A[d:] = a
+    A_conj = A.conj()
+    B = np.empty(2*d, dtype=np.complex128)
+    B[:d] = a_dot
+    B[d:] = a_dot
+    B_conj = B.conj()
+    G = g_matrix(a)
+
+    G_dot = np.empty((d, d), dtype=np.complex128)
+    for k in range(d):
+        for l in range(k + 1):
+            kl = (k + l) % d
+            G_dot[k, l] = (
+                a_dot * A_conj[k:k+d] * A_conj[l:l+d] * A[kl:kl+d]
+                + a * B_conj[k:k+d] * A_conj[l:l+d] * A[kl:kl+d]
+                + a * A_conj[k:k+d] * B_conj[l:l+d] * A[kl:kl+d]
+                + a * A_conj[k:k+d] * A_conj[l:l+d] * B[kl:kl+d]
+            ).sum()
+            G_dot[l, k] = G_dot[k, l]
+
+    hvp = np.zeros(d, dtype=np.complex128)
+    for k in range(d):
+        for l in range(k + 1):
+            kl = (k + l) % d
+            weight = 1.0 if k == l else 2.0
+            hvp += weight * (
+                G_dot[k, l] * A[k:k+d] * A[l:l+d] * A_conj[kl:kl+d]
+                + G[k, l] * (
+                    B[k:k+d] * A[l:l+d] * A_conj[kl:kl+d]
+                    + A[k:k+d] * B[l:l+d] * A_conj[kl:kl+d]
+                    + A[k:k+d] * A[l:l+d] * B_conj[kl:kl+d]
+                )
+            )
+    hvp *= 8
+    return hvp
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def loss_batch(a: np.ndarray) -> np.ndarray:
+    """Calculate the G-matrix loss of each row of the input array.
+
+    The rows are distributed over the available numba threads.
+
+    args:
+        a (np.ndarray of complex numbers): the candidate vectors, of shape
+            ``(P, d)``
+
+    returns:
+        (np.ndarray of float): the ``P`` losses
+    """
+    result = np.empty(a.shape[0], dtype=np.float64)
+    for i in prange(a.shape[0]):
+        result[i] = loss(a[i])
+    return result
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def _target_batch(x: np.ndarray) -> np.ndarray:
+    """Unclipped target function for each row of ``x``, see
+    ``target_function_batch``.
+    """
+    n_candidates, n = x.shape
+    result = np.empty(n_candidates, dtype=np.float64)
+    for i in prange(n_candidates):
+        norm_sq = (x[i]**2).sum()
+        if norm_sq > 1.0:
+            result[i] = 0.1 * norm_sq
+        else:
+            a = np.empty(n//2 + 1, dtype=np.complex128)
+            a[0] = np.sqrt(1.0 - norm_sq)
+            a[1:] = x[i, ::2] + 1j*x[i, 1::2]
+            result[i] = loss(a)
+    return result
+
+
+@jit(nopython=True, fastmath=True, cache=True)
+def loss_float32(a: np.ndarray, pairs: np.ndarray) -> float:
+    """Estimate the G-matrix loss in single precision.
+
+    The G-matrix elements are computed in single precision and their squared
+    moduli are accumulated in double precision, weighted by the sizes of
+    their orbits, see ``_orbit_weight``. Only the pairs (k, l) listed in
+    ``pairs`` are included, and the sum is scaled by the number of orbits
+    over ``pairs.size``. With all pairs this equals ``loss`` to about single
+    precision, with pairs drawn uniformly it is an unbiased estimate.
+
+    args:
+        a (np.ndarray of complex numbers): the candidate vector
+        pairs (np.ndarray of int): indices k(k + 1)/2 + l of the pairs (k, l),
+            l <= k, which represent their orbits, see ``screening_pairs``
+
+    returns:
+        (float): the estimated loss
+    """
+    d = a.size
+    A = np.empty(2*d, dtype=np.complex64)
+    A[:d] = a
+    A[d:] = a
+    A_conj = A.conj()
+    result = 0.0
+    for p in pairs:
+        k, l = _pair_from_index(p)
+        kl = (k + l) % d
+        g = np.complex64(0.0)
+        for m in range(d):
+            g += A[m] * A_conj[m+k] * A_conj[m+l] * A[m+kl]
+        weight = _orbit_weight(d, k, l)
+        result += weight*(float(g.real)**2 + float(g.imag)**2)
+    n_orbits = _representatives(d).size
+    return result * n_orbits / pairs.size - 2.0/(d + 1)
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def loss_batch_float32(a: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Estimate the G-matrix loss of each row of the input array in single
+    precision, see ``loss_float32``.
+
+    args:
+        a (np.ndarray of complex numbers): the candidate vectors, of shape
+            ``(P, d)``
+        pairs (np.ndarray of int): the pairs (k, l) to include
+
+    returns:
+        (np.ndarray of float): the ``P`` estimated losses
+    """
+    result = np.empty(a.shape[0], dtype=np.float64)
+    for i in prange(a.shape[0]):
+        result[i] = loss_float32(a[i], pairs)
+    return result
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def _target_batch_float32(x: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Screening target function for each row of ``x``, see
+    ``target_function_screening_batch``.
+    """
+    n_candidates, n = x.shape
+    result = np.empty(n_candidates, dtype=np.float64)
+    for i in prange(n_candidates):
+        norm_sq = (x[i]**2).sum()
+        if norm_sq > 1.0:
+            result[i] = 0.1 * norm_sq
+        else:
+            a = np.empty(n//2 + 1, dtype=np.complex128)
+            a[0] = np.sqrt(1.0 - norm_sq)
+            a[1:] = x[i, ::2] + 1j*x[i, 1::2]
+            result[i] = loss_float32(a, pairs)
+    return result
+
+
+def _shifted_products(a: np.ndarray) -> np.ndarray:
+    """Matrix with elements a_m conj(a_{m+k}) in row k and column m."""
+    d = a.size
+    idx = (np.arange(d).reshape(1, -1) + np.arange(d).reshape(-1, 1)) % d
+    return a.reshape(1, -1) * a.conj()[idx]
+
+
+def g_matrix_fft(a: np.ndarray) -> np.ndarray:
+    """Calculate the full G-matrix of the input vector using FFTs.
+
+    With b_m = a_m conj(a_{m+k}), row k of the G-matrix is the circular
+    autocorrelation G_kl = sum_m b_m conj(b_{m+l}) of b, which is computed
+    for all l at once with one FFT and one inverse FFT. The total cost is
+    O(d^2 log d) instead of the O(d^3) of ``g_matrix``.
+
+    args:
+        a (np.ndarray of complex numbers): the candidate vector
+
+    returns:
+        (np.ndarray of complex numbers): the (d, d) G-matrix
+    """
+    F = np.fft.fft(_shifted_products(a), axis=1)
+    return np.fft.ifft(F.real**2 + F.imag**2, axis=1).conj()
+
+
+def loss_fft(a: np.ndarray) -> float:
+    """Calculate the G-matrix loss of the input vector using FFTs.
+
+    Equal to ``loss`` up to rounding errors. The squared moduli of the
+    G-matrix in row k sum to (1/d) sum_n |F_kn|^4 by Parseval's theorem, where
+    F_k is the FFT of the sequence a_m conj(a_{m+k}), so the inverse FFT in
+    ``g_matrix_fft`` is not needed for the loss.
+
+    args:
+        a (np.ndarray of complex numbers):
+            the candidate vector for which the loss should be calculated
+
+    returns:
+        (float): the loss
+    """
+    d = a.size
+    F = np.fft.fft(_shifted_products(a), axis=1)
+    power = F.real**2 + F.imag**2
+    return float((power**2).sum()/d - 2.0/(d + 1))
+
+
+def loss_coefficients(a: np.ndarray, p: np.ndarray) -> np.ndarray:
+    """The coefficients of the loss along a line, as a polynomial.
+
+    The G-matrix is quartic in the vector, so ``loss(a + t*p)`` is a real
+    polynomial of degree 8 in t. As in ``loss_fft``, the loss equals
+    (1/d) sum_kn |F_kn|^4 - 2/(d + 1), and along the line F_kn is a
+    quadratic polynomial in t, whose coefficients are the FFTs of the
+    coefficients of a_m conj(a_{m+k}). The cost is that of a few calls to
+    ``loss_fft``.
+
+    args:
+        a (np.ndarray of complex numbers): a point on the line, need not be
+            normalized
+        p (np.ndarray of complex numbers): the direction of the line
+
+    returns:
+        (np.ndarray of float): the nine coefficients c, such that
+            ``loss(a + t*p) = sum_i c[i] t**i``
+    """
+    d = a.size
+    idx = (np.arange(d).reshape(1, -1) + np.arange(d).reshape(-1, 1)) % d
+    F0 = np.fft.fft(a.reshape(1, -1) * a.conj()[idx], axis=1)
+    F1 = np.fft.fft(
+        a.reshape(1, -1) * p.conj()[idx] + p.reshape(1, -1) * a.conj()[idx],
+        axis=1
+    )
+    F2 = np.fft.fft(p.reshape(1, -1) * p.conj()[idx], axis=1)
+
+    # the coefficients of |F_kn|^2, of degree 4
+    power = np.stack([
+        F0.real**2 + F0.imag**2,
+        2.0*(F0 * F1.conj()).real,
+        F1.real**2 + F1.imag**2 + 2.0*(F0 * F2.conj()).real,
+        2.0*(F1 * F2.conj()).real,
+        F2.real**2 + F2.imag**2,
+    ]).reshape(5, -1)
+
+    # the coefficients of |F_kn|^4 summed over k and n
+    result = np.zeros(9, dtype=np.float64)
+    for i in range(5):
+        for j in range(5):
+            result[i + j] += power[i].dot(power[j])
+    result /= d
+    result[0] -= 2.0/(d + 1)
+    return result
@@ -0,0 +1,218 @@
+"""
+Multithreaded numba kernels for the G-matrix loss of a single vector.
+
+The elements (k, l) of the G-matrix which represent the orbits of its
+symmetries, see ``_orbit_weight``, are split into a fixed number of chunks
+with the same number of elements in each. The chunks are distributed over
+the threads, and the partial sums of the chunks are added in order afterwards.
+The number of chunks depends only on the dimension, so the results do not
+depend on the number of threads.
+
+The kernels use numba's current number of threads. Importing the module does
+not change it; the drivers set it with ``set_num_threads``, from the
+'POVM_NUM_THREADS' environment variable.
+"""
+
+import logging
+
+import numpy as np
+import numba     # type: ignore
+from numba import jit, prange    # type: ignore
+
+
+_MAX_CHUNKS = 256
+
+
+def set_num_threads(num_threads: int) -> None:
+    """Set the number of threads used by the parallel numba kernels.
+
+    Limited to the number of threads numba was started with
+    (``NUMBA_NUM_THREADS``).
+    """
+    available = numba.config.NUMBA_NUM_THREADS
+    if num_threads > available:
+        logging.getLogger('weyl-heisenberg.loss').warning(
+            'Requested %d threads, but numba only has %d available',
+            num_threads, available
+        )
+        num_threads = available
+    numba.set_num_threads(num_threads)
+
+
+@jit(nopython=True, cache=True)
+def _pair_from_index(p: int):
+    """Map the index p = k(k + 1)/2 + l to the pair (k, l), with l <= k."""
+    k = int((np.sqrt(8.0*p + 1.0) - 1.0)/2.0)
+    # guard against rounding in the square root
+    while k*(k + 1)//2 > p:
+        k -= 1
+    while (k + 1)*(k + 2)//2 <= p:
+        k += 1
+    return k, p - k*(k + 1)//2
+
+
+@jit(nopython=True, cache=True)
+def _orbit_weight(d: int, k: int, l: int) -> int:
+    """The multiplicity of the G-matrix element (k, l), l <= k, in the loss.
+
+    The elements are equal on the orbits {(k, l), (l, k), (-k, -l), (-l, -k)}
+    of the symmetries G_kl = G_lk and G_{-k,-l} = G_kl, the latter following
+    from shifting the summation index by k + l. Each orbit is represented by
+    its element (k, l), l <= k, which is largest in lexicographic order.
+
+    returns:
+        (int): the size of the orbit if (k, l) represents it, otherwise zero
+    """
+    # the negated pair, ordered such that nl <= nk
+    nk = max((d - k) % d, (d - l) % d)
+    nl = min((d - k) % d, (d - l) % d)
+    if nk > k or (nk == k and nl > l):
+        return 0
+    weight = 1 if k == l else 2
+    if nk != k or nl != l:
+        weight *= 2
+    return weight
+
+
+@jit(nopython=True, cache=True)
+def _representatives(d: int) -> np.ndarray:
+    """The indices k(k + 1)/2 + l, l <= k, of the elements (k, l) of the
+    G-matrix which represent their orbits, in increasing order.
+    """
+    n_pairs = d*(d + 1)//2
+    result = np.empty(n_pairs, dtype=np.int64)
+    n = 0
+    for k in range(d):
+        for l in range(k + 1):
+            if _orbit_weight(d, k, l) > 0:
+                result[n] = k*(k + 1)//2 + l
+                n += 1
+    return result[:n]
+
+
+@jit(nopython=True, cache=True)
+def _chunk_bounds(c: int, n_chunks: int, n_pairs: int):
+    return c*n_pairs//n_chunks, (c + 1)*n_pairs//n_chunks
+
+
+@jit(nopython=True, cache=True)
+def _doubled(a: np.ndarray):
+    d = a.size
+    A = np.empty(2*d, dtype=np.complex128)
+    A[:d] = a
+    A[d:] = a
+    return A, A.conj()
+
+
+@jit(nopython=True, cache=True)
+def _g_element(A: np.ndarray, A_conj: np.ndarray, d: int, k: int, l: int):
+    kl = (k + l) % d
+    result = 0j
+    for m in range(d):
+        result += A[m] * A_conj[m+k] * A_conj[m+l] * A[m+kl]
+    return result
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def loss_parallel(a: np.ndarray) -> float:
+    """Calculate the G-matrix loss of the input vector using several threads.
+
+    Equal to ``loss`` up to rounding errors, and independent of the number of
+    threads.
+
+    args:
+        a (np.ndarray of complex numbers):
+            the candidate vector for which the loss should be calculated
+
+    returns:
+        (float): the loss
+    """
+    d = a.size
+    A, A_conj = _doubled(a)
+    pairs = _representatives(d)
+    n_chunks = min(_MAX_CHUNKS, pairs.size)
+    partial = np.zeros(n_chunks, dtype=np.float64)
+    for c in prange(n_chunks):
+        start, end = _chunk_bounds(c, n_chunks, pairs.size)
+        s = 0.0
+        for p in pairs[start:end]:
+            k, l = _pair_from_index(p)
+            g = _g_element(A, A_conj, d, k, l)
+            s += _orbit_weight(d, k, l)*(g.real**2 + g.imag**2)
+        partial[c] = s
+    result = 0.0
+    for c in range(n_chunks):
+        result += partial[c]
+    return result - 2.0/(d + 1)
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def g_matrix_parallel(a: np.ndarray) -> np.ndarray:
+    """Calculate the full G-matrix of the input vector using several threads.
+
+    args:
+        a (np.ndarray of complex numbers): the candidate vector
+
+    returns:
+        (np.ndarray of complex numbers): the (d, d) G-matrix
+    """
+    d = a.size
+    A, A_conj = _doubled(a)
+    pairs = _representatives(d)
+    n_chunks = min(_MAX_CHUNKS, pairs.size)
+    G = np.empty((d, d), dtype=np.complex128)
+    for c in prange(n_chunks):
+        start, end = _chunk_bounds(c, n_chunks, pairs.size)
+        for p in pairs[start:end]:
+            k, l = _pair_from_index(p)
+            g = _g_element(A, A_conj, d, k, l)
+            nk = (d - k) % d
+            nl = (d - l) % d
+            G[k, l] = G[l, k] = G[nk, nl] = G[nl, nk] = g
+    return G
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def loss_and_grad_parallel(a: np.ndarray):
+    """Calculate the G-matrix loss and its gradient using several threads.
+
+    Equal to ``loss_and_grad`` up to rounding errors, and independent of the
+    number of threads.
+
+    args:
+        a (np.ndarray of complex numbers):
+            the candidate vector for which the loss should be calculated
+
+    returns:
+        (float): the loss
+        (np.ndarray of complex numbers): the gradient, see ``loss_and_grad``
+    """
+    d = a.size
+    A, A_conj = _doubled(a)
+    G = g_matrix_parallel(a)
+    result = 0.0
+    for k in range(d):
+        for l in range(d):
+            result += G[k, l].real**2 + G[k, l].imag**2
+    result -= 2.0/(d + 1)
+
+    n_pairs = d*(d + 1)//2
+    n_chunks = min(_MAX_CHUNKS, n_pairs)
+    partial = np.zeros((n_chunks, d), dtype=np.complex128)
+    for c in prange(n_chunks):
+        start, end = _chunk_bounds(c, n_chunks, n_pairs)
+        k, l = _pair_from_index(start)
+        for _ in range(start, end):
+            kl = (k + l) % d
+            g = G[k, l] if k == l else 2*G[k, l]
+            for j in range(d):
+                partial[c, j] += g * A[j+k] * A[j+l] * A_conj[j+kl]
+            l += 1
+            if l > k:
+                k += 1
+                l = 0
+    grad = np.zeros(d, dtype=np.complex128)
+    for c in range(n_chunks):
+        grad += partial[c]
+    grad *= 8
+    return result, grad
@@ -0,0 +1,125 @@
+"""
+The G-matrix loss as a nonlinear least squares problem.
+
+With F_kn the FFT of the sequence a_m conj(a_{m+k}), see ``loss_fft``, the
+squared moduli x_kn = |F_kn|^2 are the squared overlaps |<a|D_p a>|^2 of the
+vector with its Weyl-Heisenberg displacements. For a normalized vector
+x_00 = 1 and the other x_kn sum to d - 1, and expanding the square gives
+    loss = (1/d) sum_{(k, n) != (0, 0)} (x_kn - 1/(d + 1))^2,
+a sum of d^2 - 1 squared residuals, which all vanish for a SIC-POVM
+fiducial. Computing the residuals directly, the loss of a good candidate is
+not the small difference of two numbers of order one, and Gauss-Newton type
+minimizers converge quadratically close to a fiducial.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from ._loss import _shifted_products, real_to_complex
+
+
+def sic_residuals(a: np.ndarray) -> np.ndarray:
+    """The residuals of the complex vector ``a``, see the module
+    documentation.
+
+    args:
+        a (np.ndarray of complex numbers): the normalized candidate vector
+
+    returns:
+        (np.ndarray of float): the ``d**2 - 1`` residuals
+    """
+    d = a.size
+    F = np.fft.fft(_shifted_products(a), axis=1)
+    power = F.real**2 + F.imag**2
+    return (power.ravel()[1:] - 1.0/(d + 1)) / np.sqrt(d)
+
+
+def sic_residuals_and_grad(
+    a: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The residuals of the complex vector ``a`` and their gradients.
+
+    The gradients follow the convention of ``loss_and_grad``, the real
+    (imaginary) part holding the partial derivatives with respect to the
+    real (imaginary) parts of ``a``.
+
+    args:
+        a (np.ndarray of complex numbers): the normalized candidate vector
+
+    returns:
+        (np.ndarray of float): the ``d**2 - 1`` residuals
+        (np.ndarray of complex numbers): the gradients of the residuals, of
+            shape ``(d**2 - 1, d)``
+    """
+    d = a.size
+    F = np.fft.fft(_shifted_products(a), axis=1)
+    power = F.real**2 + F.imag**2
+    residuals = (power.ravel()[1:] - 1.0/(d + 1)) / np.sqrt(d)
+
+    # F_kn = sum_m a_m conj(a_{m+k}) w^{-mn} with w = exp(2 pi i/d), whose
+    # derivatives give the gradient of |F_kn|^2 with respect to a_q
+    #     2 F_kn a_{q+k} w^{qn} + 2 conj(F_kn) a_{q-k} w^{-(q-k)n}
+    m = np.arange(d)
+    plus = (m.reshape(1, -1) + m.reshape(-1, 1)) % d
+    minus = (m.reshape(1, -1) - m.reshape(-1, 1)) % d
+    W = np.exp(2j*np.pi/d * np.outer(m, m))
+    gradients = 2.0 * (
+        F[:, :, np.newaxis] * a[plus][:, np.newaxis, :] * W[np.newaxis]
+        + F.conj()[:, :, np.newaxis] * a[minus][:, np.newaxis, :]
+        * W[:, minus].conj().transpose(1, 0, 2)
+    )
+    return residuals, gradients.reshape(d*d, d)[1:] / np.sqrt(d)
+
+
+def residuals(x: np.ndarray) -> np.ndarray:
+    """The residuals of the target function.
+
+    The squares of the residuals sum to ``target_function(x)``, except that
+    the loss is not clipped at 1e-15. Outside the unit ball the residuals
+    are the elements of ``x`` scaled to give the same penalty as
+    ``target_function``.
+
+    args:
+        x (np.ndarray of float): the candidate array, should be of length
+            ``2*d - 2`` where ``d`` is the dimensionality of the Hilbert space
+
+    returns:
+        (np.ndarray of float): the ``d**2 - 1`` residuals
+    """
+    d = x.size//2 + 1
+    n = np.linalg.norm(x)
+    if n > 1.0:
+        result = np.zeros(d*d - 1, dtype=np.float64)
+        result[:x.size] = np.sqrt(0.1) * x
+        return result
+    return sic_residuals(real_to_complex(x))
+
+
+def residuals_jacobian(x: np.ndarray) -> np.ndarray:
+    """The Jacobian of ``residuals``.
+
+    args:
+        x (np.ndarray of float): the candidate array, see ``residuals``
+
+    returns:
+        (np.ndarray of float): the derivatives of the residuals with respect
+            to the elements of ``x``, of shape ``(d**2 - 1, 2*d - 2)``
+    """
+    d = x.size//2 + 1
+    n = np.linalg.norm(x)
+    if n > 1.0:
+        result = np.zeros((d*d - 1, x.size), dtype=np.float64)
+        result[np.arange(x.size), np.arange(x.size)] = np.sqrt(0.1)
+        return result
+    a = real_to_complex(x)
+    grads = sic_residuals_and_grad(a)[1]
+    # complex_to_real_gradient for every row
+    if a.real[0] > 0.0:
+        scale = grads.real[:, :1] / a.real[0]
+    else:
+        scale = np.zeros((grads.shape[0], 1))
+    result = np.empty((grads.shape[0], x.size), dtype=np.float64)
+    result[:, ::2] = grads.real[:, 1:] - scale * a.real[1:]
+    result[:, 1::2] = grads.imag[:, 1:] - scale * a.imag[1:]
+    return result
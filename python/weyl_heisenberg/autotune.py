@@ -0,0 +1,218 @@
+"""
+Selection of the fastest implementations of the target function.
+
+Which of the loss kernels is fastest depends on the dimension d and on the
+number of threads available, see ``weyl_heisenberg.benchmark``. The drivers
+call the target function in three forms, the value alone, the value with the
+gradient (the minimizers) and the value of a batch of points (vectorized
+differential evolution), and each has its own candidates in ``KERNELS``.
+The first time a dimension is requested on a host, ``select_kernel`` times
+the candidates of a form and stores the fastest one in a JSON table, keyed
+by the host name and the number of numba threads, which later processes read
+instead of timing the kernels again. The table is found from the
+'POVM_AUTOTUNE_FILE' environment variable.
+
+The float32 kernels are not candidates, as their precision is far from the
+threshold for a successful minimization.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import platform
+
+import numpy as np
+import numba     # type: ignore
+
+from environment_variables import get_autotune_file
+from ._loss import (
+    target_function,
+    target_function_fft,
+    target_function_parallel,
+    target_function_and_gradient,
+    target_function_and_gradient_parallel,
+    target_function_batch,
+)
+from .fused import LossWorkspace
+from .compiled import CompiledTarget
+
+
+# the forms of the target function, in the order of their kernels in the
+# names from ``autotuned_kernels``
+ROLES = ('value', 'gradient', 'batch')
+
+# the number of points in the batches timed by ``calibrate``
+BATCH_SIZE = 64
+
+
+def _rows(f: Callable[[np.ndarray], float]) -> Callable:
+    """Batched target function evaluating the rows one by one with ``f``.
+    """
+    return lambda x: np.array([f(row) for row in x])
+
+
+# role: {name: function creating the target function for a given dimension
+# d}, all of them equivalent to ``target_function``,
+# ``target_function_and_gradient`` and ``target_function_batch``
+# respectively
+KERNELS: Dict[str, Dict[str, Callable[[int], Callable]]] = {
+    'value': {
+        'loss': lambda d: target_function,
+        'loss_fft': lambda d: target_function_fft,
+        'loss_parallel': lambda d: target_function_parallel,
+        'loss_fused': lambda d: LossWorkspace(d).target_function,
+        'compiled': CompiledTarget,
+    },
+    'gradient': {
+        'loss_and_grad': lambda d: target_function_and_gradient,
+        'loss_and_grad_parallel':
+            lambda d: target_function_and_gradient_parallel,
+    },
+    'batch': {
+        # parallel over the rows
+        'loss_batch': lambda d: target_function_batch,
+        # parallel within each row
+        'loss_parallel_rows': lambda d: _rows(target_function_parallel),
+    },
+}
+
+# the kernels used without autotuning
+DEFAULT_KERNELS = 'loss+loss_and_grad+loss_batch'
+
+
+def kernel_names(name: str) -> Dict[str, str]:
+    """Split a name from ``autotuned_kernels`` into the name of the kernel
+    of each role.
+    """
+    names = name.split('+')
+    assert len(names) == len(ROLES), f'Expected one kernel per role: {name}'
+    for role, kernel in zip(ROLES, names):
+        assert kernel in KERNELS[role], f'Unknown {role} kernel {kernel}'
+    return dict(zip(ROLES, names))
+
+
+def host_key() -> str:
+    """The key of the current host in the table."""
+    return f'{platform.node()}/{numba.get_num_threads()}'
+
+
+def calibrate(
+    d: int, role: str = 'value', budget: float = 0.1
+) -> Dict[str, float]:
+    """Time all the kernels of a role in dimension d.
+
+    args:
+        d (int): the dimension of the complex vectors
+        role (str): one of ``ROLES``
+        budget (float): the approximate time spent timing each kernel, in
+            seconds
+
+    returns:
+        (dict): the median time per evaluation of each kernel, in seconds
+    """
+    # not at the top, as this module is imported by the package, and
+    # ``python -m weyl_heisenberg.benchmark`` warns if the package has
+    # already imported it
+    from .benchmark import time_kernel
+
+    rng = np.random.default_rng(12345)
+    n_points = BATCH_SIZE if role == 'batch' else 1
+    x = rng.normal(size=(n_points, 2*d - 2))
+    x *= 0.9 / np.linalg.norm(x, axis=1).reshape(-1, 1)
+    if role != 'batch':
+        x = x[0]
+    times = {}
+    for name, factory in KERNELS[role].items():
+        f = factory(d)
+        # compile the kernel, or load it from the numba cache, untimed
+        f(x)
+        times[name] = time_kernel(
+            lambda: f(x), n_points, budget, 25
+        )['median']
+    return times
+
+
+def _read_table(file: Path) -> Dict:
+    if not file.is_file():
+        return {}
+    with file.open('r', encoding='UTF-8') as f:
+        return json.load(f)
+
+
+def _write_table(file: Path, table: Dict) -> None:
+    # write to a temporary file first, so that other processes never read a
+    # partially written table
+    file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = file.with_name(f'{file.name}.{os.getpid()}.tmp')
+    with tmp.open('w', encoding='UTF-8') as f:
+        json.dump(table, f, indent=2)
+    os.replace(tmp, file)
+
+
+def select_kernel(
+    d: int,
+    role: str = 'value',
+    table_file: Optional[Path] = None,
+    budget: float = 0.1
+) -> str:
+    """The name of the fastest kernel of a role in dimension d on this host.
+
+    Read from the table if present, otherwise the kernels are timed with
+    ``calibrate`` and the result is added to the table.
+
+    args:
+        d (int): the dimension of the complex vectors
+        role (str): one of ``ROLES``
+        table_file (Path, optional): the table, ``get_autotune_file()`` by
+            default
+        budget (float): the time spent timing each kernel if it is not
+            found in the table, in seconds
+
+    returns:
+        (str): the name of the kernel, a key of ``KERNELS[role]``
+    """
+    assert d >= 2, 'The dimension must be at least 2'
+    assert role in ROLES
+    if table_file is None:
+        table_file = get_autotune_file()
+    entry = _read_table(table_file).get(host_key(), {}).get(str(d), {})
+    if role in entry and entry[role]['kernel'] in KERNELS[role]:
+        return entry[role]['kernel']
+
+    times = calibrate(d, role, budget)
+    kernel = min(times, key=lambda name: times[name])
+    logging.getLogger('weyl-heisenberg.autotune').info(
+        'Selected %s kernel %s in d = %d: %s', role, kernel, d,
+        ', '.join(f'{name} {t:.2e} s' for name, t in times.items())
+    )
+    # read again, the table may have been updated by another process
+    table = _read_table(table_file)
+    entry = table.setdefault(host_key(), {}).setdefault(str(d), {})
+    entry[role] = {'kernel': kernel, 'times': times}
+    _write_table(table_file, table)
+    return kernel
+
+
+def autotuned_kernels(
+    d: int, table_file: Optional[Path] = None
+) -> Tuple[str, Dict[str, Callable]]:
+    """The fastest implementations of ``target_function``,
+    ``target_function_and_gradient`` and ``target_function_batch`` in
+    dimension d.
+
+    args:
+        d (int): the dimension of the complex vectors
+        table_file (Path, optional): the table, see ``select_kernel``
+
+    returns:
+        (str): the names of the kernels joined by '+' in the order of
+            ``ROLES``, to be recorded with the results, see ``kernel_names``
+        (dict): the function of each role
+    """
+    names = [select_kernel(d, role, table_file) for role in ROLES]
+    functions = {
+        role: KERNELS[role][name](d) for role, name in zip(ROLES, names)
+    }
+    return '+'.join(names), functions
@@ -0,0 +1,334 @@
+"""
+Microbenchmarks of the loss and gradient kernels.
+
+Each kernel is timed for a range of dimensions d. For every combination the
+median and interquartile range of the time per evaluation, the number of
+evaluations per second and the peak memory allocated by one call are
+reported. The first call of each kernel, which compiles it or loads it from
+the numba cache, is timed separately.
+
+Run with
+    python -m weyl_heisenberg.benchmark --output benchmark.json
+and compare two result files, e.g. from different commits, with
+    python -m weyl_heisenberg.benchmark --compare old.json new.json
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+import numba     # type: ignore
+
+from ._loss import (
+    target_function,
+    real_to_complex,
+    loss,
+    _loss_2,
+    loss_fft,
+    loss_and_grad,
+    loss_bounded,
+    loss_batch,
+    loss_float32,
+    screening_pairs,
+    hessian_vector_product,
+)
+from ._parallel import loss_parallel, loss_and_grad_parallel
+from .incremental import IncrementalTarget, _updated_g_matrix
+from .fused import LossWorkspace
+
+
+DEFAULT_DIMENSIONS = [
+    2, 3, 4, 6, 8, 11, 16, 23, 32, 45, 64, 91, 128, 181, 256, 362, 512, 724,
+    1024
+]
+
+BATCH_SIZE = 32
+
+# the population size and crossover probability of the 'de_generation'
+# benchmarks, the latter as in ``modified_devo.devo_BFGS``
+DE_POPULATION = 32
+DE_RECOMBINATION = 0.1
+
+
+def _batch(a: np.ndarray) -> Tuple[Callable, int]:
+    A = np.tile(a, (BATCH_SIZE, 1))
+    return lambda: loss_batch(A), BATCH_SIZE
+
+
+def _float32(a: np.ndarray) -> Tuple[Callable, int]:
+    a32 = a.astype(np.complex64)
+    pairs = screening_pairs(a.size, 1.0)
+    return lambda: loss_float32(a32, pairs), 1
+
+
+def _incremental(a: np.ndarray) -> Tuple[Callable, int]:
+    # a typical DE trial, changing a_0 and one other element
+    b = a.copy()
+    b[0] *= 0.9
+    b[-1] *= 1.1
+    changed = np.array([0, a.size - 1], dtype=np.int64)
+    G = np.zeros((a.size, a.size), dtype=np.complex128)
+    return lambda: _updated_g_matrix(a, b, G, changed), 1
+
+
+def _de_generation(
+    a: np.ndarray, incremental: Optional[IncrementalTarget] = None
+) -> Tuple[Callable, int]:
+    """One generation of differential evolution with the 'best1exp'
+    strategy and immediate updating, as in ``modified_devo``. The population
+    evolves from one call to the next, so that the references of
+    ``incremental`` are replaced as the trials are accepted.
+    """
+    n = 2*a.size - 2
+    rng = np.random.default_rng(0)
+    population = rng.uniform(-1.0, 1.0, size=(DE_POPULATION, n))/np.sqrt(n)
+    energies = np.array([target_function(x) for x in population])
+    function = target_function if incremental is None else incremental
+
+    def generation():
+        for i in range(DE_POPULATION):
+            r1, r2 = rng.choice(DE_POPULATION, 2, replace=False)
+            mutant = population[np.argmin(energies)] \
+                + rng.uniform(0.1, 1.0)*(population[r1] - population[r2])
+            trial = population[i].copy()
+            # exponential crossover, at least one parameter
+            j = rng.integers(n)
+            for _ in range(n):
+                trial[j] = mutant[j]
+                j = (j + 1) % n
+                if rng.uniform() >= DE_RECOMBINATION:
+                    break
+            if incremental is not None:
+                incremental.set_reference(population[i])
+            energy = function(trial)
+            if energy < energies[i]:
+                if incremental is not None:
+                    incremental.accept()
+                population[i] = trial
+                energies[i] = energy
+
+    return generation, DE_POPULATION
+
+
+def _fused(a: np.ndarray) -> Tuple[Callable, int]:
+    workspace = LossWorkspace(a.size)
+    return lambda: workspace.loss(a), 1
+
+
+# name: function creating the zero argument callable to time for a given
+# complex vector, and the number of evaluations of the loss per call
+KERNELS: Dict[str, Callable[[np.ndarray], Tuple[Callable, int]]] = {
+    'loss': lambda a: (lambda: loss(a), 1),
+    'loss_2': lambda a: (lambda: _loss_2(a), 1),
+    'loss_fft': lambda a: (lambda: loss_fft(a), 1),
+    'loss_parallel': lambda a: (lambda: loss_parallel(a), 1),
+    'loss_fused': _fused,
+    # without a cutoff, the cost of a trial which is not rejected
+    'loss_bounded': lambda a: (lambda: loss_bounded(a, np.inf), 1),
+    'loss_and_grad': lambda a: (lambda: loss_and_grad(a), 1),
+    'loss_and_grad_parallel': lambda a: (lambda: loss_and_grad_parallel(a), 1),
+    'hessian_vector_product':
+        lambda a: (lambda: hessian_vector_product(a, a), 1),
+    'loss_batch': _batch,
+    'loss_float32': _float32,
+    'incremental': _incremental,
+    # the time per trial of differential evolution, with and without
+    # ``IncrementalTarget``
+    'de_generation': _de_generation,
+    'de_generation_incremental':
+        lambda a: _de_generation(a, IncrementalTarget()),
+}
+
+
+def random_vector(d: int, seed: int = 12345) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=2*d - 2)
+    return real_to_complex(0.9 * x / np.linalg.norm(x))
+
+
+def peak_memory(f: Callable) -> int:
+    """The peak memory in bytes allocated during one call to ``f``, including
+    the arrays allocated by numba.
+    """
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def time_kernel(
+    f: Callable, n_evaluations: int, budget: float, n_samples: int
+) -> Dict[str, float]:
+    """Time the calls to ``f``.
+
+    Each sample times enough calls to take about 10 ms, and the number of
+    samples is reduced if they would not fit in ``budget`` seconds.
+
+    returns:
+        (dict): statistics of the time per evaluation, in seconds
+    """
+    timer = timeit.Timer(f)
+    start = time.perf_counter()
+    f()
+    single = time.perf_counter() - start
+    number = max(1, int(0.01 / max(single, 1e-9)))
+    n_samples = int(max(3, min(n_samples, budget / (number * single + 1e-9))))
+    samples = np.array(timer.repeat(repeat=n_samples, number=number))
+    samples /= number * n_evaluations
+    q25, median, q75 = np.percentile(samples, [25, 50, 75])
+    return {
+        'median': float(median),
+        'iqr': float(q75 - q25),
+        'evaluations_per_second': float(1.0/median),
+        'samples': n_samples,
+        'calls_per_sample': number,
+    }
+
+
+def run_benchmarks(
+    kernels: List[str],
+    dimensions: List[int],
+    budget: float = 0.5,
+    n_samples: int = 25,
+    max_seconds: float = 2.0,
+    verbose: bool = True
+) -> Dict:
+    """Benchmark the kernels for the given dimensions.
+
+    args:
+        kernels (list of str): names of the kernels, keys of ``KERNELS``
+        dimensions (list of int): the dimensions d of the complex vectors
+        budget (float): the approximate time spent timing each combination
+            of kernel and dimension, in seconds
+        n_samples (int): the maximum number of samples per combination
+        max_seconds (float): larger dimensions are skipped for a kernel once
+            a single call takes longer than this, in seconds
+        verbose (bool): print the results as they are obtained
+
+    returns:
+        (dict): the metadata of the run, the time of the first call of each
+            kernel (``first_call``), and a list of the timing results
+    """
+    first_call: Dict[str, float] = {}
+    results = []
+    for name in kernels:
+        for d in sorted(dimensions):
+            f, n_evaluations = KERNELS[name](random_vector(d))
+            if name not in first_call:
+                start = time.perf_counter()
+                f()
+                first_call[name] = time.perf_counter() - start
+                if verbose:
+                    print(f'{name:<24} first call {first_call[name]:9.3f} s')
+            result = {'kernel': name, 'd': d}
+            result.update(time_kernel(f, n_evaluations, budget, n_samples))
+            result['peak_memory_bytes'] = peak_memory(f)
+            results.append(result)
+            if verbose:
+                print(
+                    f'{name:<24} d = {d:>4}  '
+                    + f'median {result["median"]:.3e} s  '
+                    + f'iqr {result["iqr"]:.1e} s  '
+                    + f'{result["evaluations_per_second"]:.3e} evals/s  '
+                    + f'{result["peak_memory_bytes"]:>10_d} B'
+                )
+            if result['median'] * n_evaluations > max_seconds:
+                break
+    return {
+        'metadata': metadata(),
+        'first_call': first_call,
+        'results': results,
+    }
+
+
+def metadata() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'processor': platform.processor(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': numba.__version__,
+        'threads': numba.get_num_threads(),
+    }
+
+
+def compare(old: Dict, new: Dict) -> str:
+    """Table of the median times per evaluation of two benchmark runs.
+
+    Only the combinations of kernel and dimension present in both are
+    included. A ratio below one means that ``new`` is faster.
+    """
+    old_medians = {(r['kernel'], r['d']): r['median'] for r in old['results']}
+    lines = [
+        f'old: {old["metadata"]["commit"]}',
+        f'new: {new["metadata"]["commit"]}',
+        f'{"kernel":<24} {"d":>4} {"old (s)":>10} {"new (s)":>10} '
+        + f'{"new/old":>8}',
+    ]
+    for r in new['results']:
+        key = (r['kernel'], r['d'])
+        if key not in old_medians:
+            continue
+        lines.append(
+            f'{r["kernel"]:<24} {r["d"]:>4} {old_medians[key]:10.3e} '
+            + f'{r["median"]:10.3e} {r["median"]/old_medians[key]:8.3f}'
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the loss and gradient kernels.'
+    )
+    parser.add_argument(
+        '--kernels', nargs='+', default=list(KERNELS), choices=list(KERNELS)
+    )
+    parser.add_argument(
+        '--dims', nargs='+', type=int, default=DEFAULT_DIMENSIONS
+    )
+    parser.add_argument(
+        '--budget', type=float, default=0.5,
+        help='approximate seconds spent on each kernel and dimension'
+    )
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument(
+        '--compare', nargs=2, metavar=('OLD', 'NEW'),
+        help='compare two JSON result files instead of running'
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        old_file, new_file = args.compare
+        with open(old_file, encoding='UTF-8') as f:
+            old = json.load(f)
+        with open(new_file, encoding='UTF-8') as f:
+            new = json.load(f)
+        print(compare(old, new))
+        return
+
+    result = run_benchmarks(args.kernels, args.dims, budget=args.budget)
+    if args.output:
+        with open(args.output, 'w', encoding='UTF-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
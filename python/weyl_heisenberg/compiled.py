@@ -0,0 +1,106 @@
+"""
+Target function without Python overhead per call.
+
+``target_function`` computes the norm, allocates the complex vector in
+``real_to_complex``, checks its arguments and possibly logs a warning before
+and after the loss kernel. For the dimensions d of about 10 to 30 swept by
+the minimizers, this costs as much as the loss itself. ``CompiledTarget``
+instead does the whole evaluation in one numba function, writing the complex
+vector into a preallocated buffer, and counts the clipped losses instead of
+logging each of them.
+"""
+
+import numpy as np
+from numba import jit   # type: ignore
+
+from ._parallel import _orbit_weight
+
+
+class CompiledTarget:
+    """Drop-in replacement for ``weyl_heisenberg.target_function`` in a fixed
+    dimension.
+
+    The losses clipped to 1e-15 are counted in ``number_of_clips``, to be
+    reported once by the caller.
+    """
+    def __init__(self, d: int) -> None:
+        """
+        args:
+            d (int): the dimension of the complex vectors, the target function
+                takes ``2*d - 2`` real parameters
+        """
+        assert d >= 2, 'The dimension must be at least 2'
+        self._d = d
+        # the complex vector and the products a_m conj(a_{m+k}), both doubled
+        # so that the cyclic shifts are contiguous
+        self._buffer = np.empty(2*d, dtype=np.complex128)
+        self._row = np.empty(2*d, dtype=np.complex128)
+        self._clips = np.zeros(1, dtype=np.int64)
+
+    @property
+    def d(self) -> int:
+        return self._d
+
+    @property
+    def number_of_clips(self) -> int:
+        """The number of losses clipped to 1e-15."""
+        return int(self._clips[0])
+
+    def __call__(self, x: np.ndarray) -> float:
+        # the kernel takes d from x and writes into the buffers of size 2d
+        assert x.size == 2*self._d - 2, \
+            f'Expected {2*self._d - 2} parameters, got {x.size}'
+        return target_compiled(x, self._buffer, self._row, self._clips)
+
+
+@jit(nopython=True, cache=True)
+def target_compiled(
+    x: np.ndarray, buffer: np.ndarray, row: np.ndarray, clips: np.ndarray
+) -> float:
+    """The target function, see ``weyl_heisenberg.target_function``.
+
+    With P_k[m] = a_m conj(a_{m+k}), the elements of the G-matrix are
+    G_kl = sum_m P_k[m] conj(P_k[m+l]), see ``weyl_heisenberg.fused``, and
+    only one element of each orbit of its symmetries is computed.
+
+    args:
+        x (np.ndarray of float): the candidate array, of length ``2*d - 2``
+        buffer (np.ndarray of complex numbers): workspace of size 2d
+        row (np.ndarray of complex numbers): workspace of size 2d
+        clips (np.ndarray of int): counter of the clipped losses, of size 1
+
+    returns:
+        (float): the loss
+    """
+    d = x.size//2 + 1
+    norm_sq = 0.0
+    for i in range(x.size):
+        norm_sq += x[i]*x[i]
+    if norm_sq > 1.0:
+        return 0.1*norm_sq
+
+    buffer[0] = np.sqrt(1.0 - norm_sq)
+    for i in range(1, d):
+        buffer[i] = complex(x[2*i - 2], x[2*i - 1])
+    for i in range(d):
+        buffer[i + d] = buffer[i]
+
+    result = 0.0
+    for k in range(d):
+        for m in range(d):
+            row[m] = buffer[m] * np.conj(buffer[m + k])
+            row[m + d] = row[m]
+        for l in range(k + 1):
+            weight = _orbit_weight(d, k, l)
+            if weight == 0:
+                continue
+            g = 0j
+            for m in range(d):
+                g += row[m] * np.conj(row[m + l])
+            result += weight*(g.real*g.real + g.imag*g.imag)
+    result -= 2.0/(d + 1)
+
+    if result < 1e-15:
+        clips[0] += 1
+        return 1e-15
+    return result
@@ -0,0 +1,272 @@
+"""
+Unconstrained parameterization of the complex unit sphere.
+
+``real_to_complex`` maps the real parameters inside the unit ball to the
+sphere, and the target functions penalize everything outside it. Within the
+box [-1, 1]^n used by the minimizers, most points lie outside the ball once
+n is larger than a few dimensions, and every evaluation there is wasted.
+
+Here the real parameters x are instead mapped to the normalized vector
+    a = z / |z|,    z = (1, x_0 + i x_1, x_2 + i x_3, ...),
+which is defined for all x, so no penalty or constraint is needed. Every
+unit vector with a_0 != 0 is reached, with the phase of a_0 fixed to zero as
+in ``real_to_complex``. The Weyl-Heisenberg shifts of a fiducial are also
+fiducials, and the shift which moves the element of largest modulus to a_0
+has all |x_i| <= 1, so the box [-1, 1]^n still contains solutions.
+"""
+
+from typing import Callable, Optional, Tuple
+import logging
+
+import numpy as np
+
+from ._loss import (
+    loss,
+    loss_and_grad,
+    loss_bounded,
+    loss_coefficients,
+    loss_batch,
+    loss_batch_float32,
+    gradient_and_hvp,
+    screening_pairs,
+    clip_batch,
+)
+from ._residuals import sic_residuals, sic_residuals_and_grad
+
+
+PARAMETERIZATIONS = ['ball', 'sphere']
+
+
+def sphere_to_complex(x: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Map real parameters to a normalized complex vector.
+
+    returns:
+        (np.ndarray of complex numbers): the normalized vector a = z/|z|
+        (float): the norm |z| of the unnormalized vector
+    """
+    assert x.size % 2 == 0
+    z = np.empty(x.size//2 + 1, dtype=np.complex128)
+    z[0] = 1.0
+    z.real[1:] = x[::2]
+    z.imag[1:] = x[1::2]
+    norm = np.sqrt(1.0 + x.dot(x))
+    return z / norm, norm
+
+
+def sphere_to_complex_batch(x: np.ndarray) -> np.ndarray:
+    """``sphere_to_complex`` for every row of ``x``, without the norms."""
+    x = np.asarray(x, dtype=np.float64)
+    z = np.empty((x.shape[0], x.shape[1]//2 + 1), dtype=np.complex128)
+    z[:, 0] = 1.0
+    z.real[:, 1:] = x[:, ::2]
+    z.imag[:, 1:] = x[:, 1::2]
+    z /= np.sqrt(1.0 + (x**2).sum(axis=1)).reshape(-1, 1)
+    return z
+
+
+def complex_to_sphere(a: np.ndarray) -> np.ndarray:
+    """Inverse of ``sphere_to_complex``, up to the global phase of ``a``.
+
+    args:
+        a (np.ndarray of complex numbers): vector with a nonzero first
+            element, need not be normalized
+
+    returns:
+        (np.ndarray of float): the real parameters, of length
+            ``2*(a.size - 1)``
+    """
+    assert a[0] != 0.0, 'The first element must be nonzero'
+    z = a[1:] / a[0]
+    x = np.empty(2*z.size, dtype=np.float64)
+    x[::2] = z.real
+    x[1::2] = z.imag
+    return x
+
+
+def _sphere_gradient(
+    a: np.ndarray, norm: float, grad_a: np.ndarray
+) -> np.ndarray:
+    """Pull a gradient with respect to the normalized vector ``a`` back to
+    the unnormalized vector z = norm * a.
+    """
+    # d a = (d z - a Re<a, d z>)/|z|, and the projection is self-adjoint
+    return (grad_a - np.vdot(a, grad_a).real * a) / norm
+
+
+def _clipped(result: float) -> float:
+    if result < 1e-15:
+        logging.getLogger('weyl-heisenberg.loss').warning(
+            'Loss clipped from %f to 1e-15', result
+        )
+        return 1e-15
+    return result
+
+
+def target_function_sphere(
+    x: np.ndarray, kernel: Optional[Callable] = None
+) -> float:
+    """Target function of the unconstrained parameterization.
+
+    Counterpart of ``target_function``, defined for all real ``x`` without
+    a penalty, see the module documentation.
+
+    args:
+        x (np.ndarray of float): the real parameters, of length ``2*d - 2``
+            where ``d`` is the dimensionality of the Hilbert space
+        kernel (Callable, optional): the function computing the loss of the
+            complex vector, ``loss`` by default
+
+    returns:
+        (float): the loss
+    """
+    if kernel is None:
+        kernel = loss
+    return _clipped(kernel(sphere_to_complex(x)[0]))
+
+
+def target_function_bounded_sphere(
+    x: np.ndarray, bound: float, kernel: Optional[Callable] = None
+) -> float:
+    """Unconstrained counterpart of ``target_function_bounded``."""
+    if kernel is None:
+        kernel = loss_bounded
+    return target_function_sphere(x, kernel=lambda a: kernel(a, bound))
+
+
+def target_function_and_gradient_sphere(
+    x: np.ndarray, kernel: Optional[Callable] = None
+) -> Tuple[float, np.ndarray]:
+    """Target function of the unconstrained parameterization and its
+    gradient, see ``target_function_and_gradient``.
+
+    args:
+        x (np.ndarray of float): the real parameters
+        kernel (Callable, optional): the function computing the loss and the
+            gradient of the complex vector, ``loss_and_grad`` by default
+
+    returns:
+        (float): the loss
+        (np.ndarray of float): the gradient of the loss with respect to ``x``
+    """
+    if kernel is None:
+        kernel = loss_and_grad
+    a, norm = sphere_to_complex(x)
+    result, grad_a = kernel(a)
+    grad_z = _sphere_gradient(a, norm, grad_a)
+    grad = np.empty_like(x, dtype=np.float64)
+    grad[::2] = grad_z.real[1:]
+    grad[1::2] = grad_z.imag[1:]
+    return _clipped(result), grad
+
+
+def target_function_hessp_sphere(
+    x: np.ndarray, v: np.ndarray, kernel: Optional[Callable] = None
+) -> np.ndarray:
+    """Exact product of the Hessian of ``target_function_sphere`` with a
+    vector, see ``target_function_hessp``.
+
+    args:
+        x (np.ndarray of float): the point at which the Hessian is evaluated
+        v (np.ndarray of float): the vector to multiply by
+        kernel (Callable, optional): the function computing the gradient of
+            the loss and the Hessian-vector product for the complex vector,
+            ``gradient_and_hvp`` by default
+
+    returns:
+        (np.ndarray of float): the Hessian-vector product
+    """
+    if kernel is None:
+        kernel = gradient_and_hvp
+    a, norm = sphere_to_complex(x)
+    z_dot = np.zeros_like(a)
+    z_dot.real[1:] = v[::2]
+    z_dot.imag[1:] = v[1::2]
+    norm_dot = np.vdot(a, z_dot).real
+    a_dot = (z_dot - norm_dot * a) / norm
+    grad_a, hvp_a = kernel(a, a_dot)
+
+    # differentiate _sphere_gradient along z_dot
+    s = np.vdot(a, grad_a).real
+    s_dot = np.vdot(a_dot, grad_a).real + np.vdot(a, hvp_a).real
+    grad_z = (grad_a - s * a) / norm
+    hvp_z = (hvp_a - s_dot * a - s * a_dot) / norm - grad_z * norm_dot / norm
+    hvp = np.empty_like(x, dtype=np.float64)
+    hvp[::2] = hvp_z.real[1:]
+    hvp[1::2] = hvp_z.imag[1:]
+    return hvp
+
+
+def exact_line_search_sphere(x: np.ndarray, v: np.ndarray) -> float:
+    """The step minimizing ``target_function_sphere`` along a line.
+
+    Along the line, z = z(x) + t*p(v) is linear in t, so the loss of the
+    normalized vector is N(t)/q(t)^4 - 2/(d + 1), where N is the polynomial
+    of degree 8 from ``loss_coefficients`` and q(t) = |z|^2. The minimum is
+    found among the real roots of the numerator of the derivative, without
+    evaluating the target function.
+
+    args:
+        x (np.ndarray of float): the starting point
+        v (np.ndarray of float): the search direction
+
+    returns:
+        (float): the step t minimizing ``target_function_sphere(x + t*v)``,
+            zero if no step decreases it
+    """
+    if not np.any(v):
+        return 0.0
+    d = x.size//2 + 1
+    z = np.empty(d, dtype=np.complex128)
+    z[0] = 1.0
+    z.real[1:] = x[::2]
+    z.imag[1:] = x[1::2]
+    p = np.zeros(d, dtype=np.complex128)
+    p.real[1:] = v[::2]
+    p.imag[1:] = v[1::2]
+
+    N = np.polynomial.Polynomial(loss_coefficients(z, p))
+    N.coef[0] += 2.0/(d + 1)
+    q = np.polynomial.Polynomial([x.dot(x) + 1.0, 2.0*x.dot(v), v.dot(v)])
+
+    def f(t):
+        return N(t) / q(t)**4
+
+    roots = (N.deriv()*q - 4*N*q.deriv()).roots()
+    candidates = roots.real[np.abs(roots.imag) <= 1e-8*(1.0 + np.abs(roots))]
+    best = 0.0
+    for t in candidates:
+        if f(t) < f(best):
+            best = float(t)
+    return best
+
+
+def target_function_batch_sphere(x: np.ndarray) -> np.ndarray:
+    """Batched version of ``target_function_sphere``, for the rows of ``x``.
+    """
+    return clip_batch(loss_batch(sphere_to_complex_batch(x)))
+
+
+def target_function_screening_batch_sphere(
+    x: np.ndarray, fraction: float = 1.0
+) -> np.ndarray:
+    """Unconstrained counterpart of ``target_function_screening_batch``."""
+    a = sphere_to_complex_batch(x)
+    return loss_batch_float32(a, screening_pairs(a.shape[1], fraction))
+
+
+def residuals_sphere(x: np.ndarray) -> np.ndarray:
+    """Residuals of ``target_function_sphere``, see ``residuals``."""
+    return sic_residuals(sphere_to_complex(x)[0])
+
+
+def residuals_jacobian_sphere(x: np.ndarray) -> np.ndarray:
+    """The Jacobian of ``residuals_sphere``, see ``residuals_jacobian``."""
+    a, norm = sphere_to_complex(x)
+    grads = sic_residuals_and_grad(a)[1]
+    # _sphere_gradient for every row
+    s = (a.conj() * grads).real.sum(axis=1).reshape(-1, 1)
+    grads_z = (grads - s * a) / norm
+    result = np.empty((grads.shape[0], x.size), dtype=np.float64)
+    result[:, ::2] = grads_z.real[:, 1:]
+    result[:, 1::2] = grads_z.imag[:, 1:]
+    return result
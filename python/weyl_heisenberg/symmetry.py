@@ -0,0 +1,225 @@
+"""
+Symmetry reduced parameterizations of the fiducial vector.
+
+Almost all known Weyl-Heisenberg fiducials are eigenvectors of the Zauner
+unitary, an element of order 3 of the Clifford group. Searching only one of
+its eigenspaces, of dimension about (d + 1)/3, reduces the number of real
+parameters from 2d - 2 to about 2(d - 2)/3.
+
+The Zauner unitary is taken from
+D. M. Appleby, SIC-POVMs and the extended Clifford group,
+J. Math. Phys. 46, 052107 (2005).
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ._loss import (
+    loss,
+    loss_and_grad,
+    loss_bounded,
+    loss_batch,
+    loss_batch_float32,
+    hessian_vector_product,
+    screening_pairs,
+    real_to_complex,
+    clip_batch,
+    target_function,
+    target_function_bounded,
+    target_function_and_gradient,
+    target_function_hessp,
+)
+from .sphere import (
+    PARAMETERIZATIONS,
+    sphere_to_complex,
+    sphere_to_complex_batch,
+    target_function_sphere,
+    target_function_bounded_sphere,
+    target_function_and_gradient_sphere,
+    target_function_hessp_sphere,
+)
+
+
+SYMMETRIES = ['none', 'zauner']
+
+
+def zauner_unitary(d: int) -> np.ndarray:
+    r"""The Zauner unitary of dimension d.
+
+    It is defined as
+    U_Z = e^{i \pi (d - 1)/12} / \sqrt{d}
+        \sum_{r, s} \tau^{2rs + (d + 1)s^2} \ket{r}\bra{s},
+    where \tau = -e^{i \pi / d}, and multiplied by a phase such that
+    U_Z^3 = 1.
+    """
+    tau = -np.exp(1j*np.pi/d)
+    j = np.arange(d)
+    # tau has order 2d, reduce the exponents to keep the powers accurate
+    exponents = (2*np.outer(j, j) + (d + 1)*j**2) % (2*d)
+    U = np.exp(1j*np.pi*(d - 1)/12) / np.sqrt(d) * tau**exponents
+    # U^3 is a phase times the identity
+    phase = np.linalg.matrix_power(U, 3)[0, 0]
+    return U * np.exp(-1j*np.angle(phase)/3)
+
+
+def zauner_eigenspaces(d: int) -> List[np.ndarray]:
+    """Orthonormal bases of the eigenspaces of the Zauner unitary.
+
+    returns:
+        (list of np.ndarray of complex numbers): the bases, of shape
+            ``(d, r)``, of the eigenspaces with eigenvalues 1, w and w^2,
+            where w = exp(2 pi i/3)
+    """
+    U = zauner_unitary(d)
+    U2 = U @ U
+    omega = np.exp(2j*np.pi/3)
+    result = []
+    for k in range(3):
+        projector = (np.eye(d) + omega**(-k)*U + omega**(-2*k)*U2)/3
+        eigenvalues, eigenvectors = np.linalg.eigh(projector)
+        result.append(eigenvectors[:, eigenvalues > 0.5])
+    return result
+
+
+def zauner_basis(d: int) -> np.ndarray:
+    """Orthonormal basis of the largest eigenspace of the Zauner unitary,
+    which contains the known fiducials.
+    """
+    return max(zauner_eigenspaces(d), key=lambda basis: basis.shape[1])
+
+
+class SubspaceTarget:
+    """Target functions for fiducial vectors restricted to a subspace.
+
+    The real parameters ``y`` are mapped to the coefficients
+    ``c = real_to_complex(y)``, or ``sphere_to_complex(y)`` with the 'sphere'
+    parameterization, in an orthonormal basis B of the subspace, and
+    the candidate vector is a = B c. The methods correspond to the target
+    functions of the same name in ``weyl_heisenberg``, with the gradients and
+    Hessian-vector products taken with respect to ``y``.
+    """
+    def __init__(self, basis: np.ndarray, parameterization: str = 'ball'):
+        """
+        args:
+            basis (np.ndarray of complex numbers): orthonormal basis of the
+                subspace, of shape ``(d, r)`` with ``r >= 2``
+            parameterization (str): 'ball' for ``real_to_complex`` or
+                'sphere' for ``sphere_to_complex``
+        """
+        assert basis.shape[1] >= 2, 'The subspace must be at least 2D'
+        assert parameterization in PARAMETERIZATIONS
+        self._sphere = parameterization == 'sphere'
+        self._basis = np.ascontiguousarray(basis, dtype=np.complex128)
+        self._basis_h = np.ascontiguousarray(basis.conj().T)
+
+    @classmethod
+    def for_symmetry(
+        cls, d: int, symmetry: str, parameterization: str = 'ball'
+    ) -> Optional['SubspaceTarget']:
+        """The target for the given symmetry, None if ``symmetry`` is 'none'.
+        """
+        assert symmetry in SYMMETRIES
+        if symmetry == 'zauner':
+            return cls(zauner_basis(d), parameterization)
+        return None
+
+    @property
+    def n_dims(self) -> int:
+        """The number of real parameters."""
+        return 2*self._basis.shape[1] - 2
+
+    def to_complex(self, y: np.ndarray) -> np.ndarray:
+        """The normalized candidate vector for the real parameters ``y``."""
+        if self._sphere:
+            return self._basis @ sphere_to_complex(y)[0]
+        return self._basis @ real_to_complex(y)
+
+    def _loss(self, c: np.ndarray) -> float:
+        return loss(self._basis @ c)
+
+    def _loss_bounded(self, c: np.ndarray, cutoff: float) -> float:
+        return loss_bounded(self._basis @ c, cutoff)
+
+    def _loss_and_grad(self, c: np.ndarray) -> Tuple[float, np.ndarray]:
+        result, grad_a = loss_and_grad(self._basis @ c)
+        return result, self._basis_h @ grad_a
+
+    def _gradient_and_hvp(
+        self, c: np.ndarray, c_dot: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        a = self._basis @ c
+        grad_a = loss_and_grad(a)[1]
+        hvp_a = hessian_vector_product(a, self._basis @ c_dot)
+        return self._basis_h @ grad_a, self._basis_h @ hvp_a
+
+    def target_function(self, y: np.ndarray) -> float:
+        if self._sphere:
+            return target_function_sphere(y, kernel=self._loss)
+        return target_function(y, kernel=self._loss)
+
+    def target_function_bounded(self, y: np.ndarray, bound: float) -> float:
+        if self._sphere:
+            return target_function_bounded_sphere(
+                y, bound, kernel=self._loss_bounded
+            )
+        return target_function_bounded(y, bound, kernel=self._loss_bounded)
+
+    def target_function_and_gradient(
+        self, y: np.ndarray
+    ) -> Tuple[float, np.ndarray]:
+        if self._sphere:
+            return target_function_and_gradient_sphere(
+                y, kernel=self._loss_and_grad
+            )
+        return target_function_and_gradient(y, kernel=self._loss_and_grad)
+
+    def target_function_hessp(
+        self, y: np.ndarray, v: np.ndarray
+    ) -> np.ndarray:
+        if self._sphere:
+            return target_function_hessp_sphere(
+                y, v, kernel=self._gradient_and_hvp
+            )
+        return target_function_hessp(y, v, kernel=self._gradient_and_hvp)
+
+    def _complex_batch(self, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate vectors for the rows of ``y`` inside the unit ball, and
+        the squared norms of all rows, which are set to zero with the
+        'sphere' parameterization where all rows are valid.
+        """
+        y = np.asarray(y, dtype=np.float64)
+        if self._sphere:
+            c = sphere_to_complex_batch(y)
+            return np.ascontiguousarray(c @ self._basis.T), np.zeros(len(y))
+        norm_sq = (y**2).sum(axis=1)
+        inside = y[norm_sq <= 1.0]
+        c = np.empty(
+            (inside.shape[0], self._basis.shape[1]), dtype=np.complex128
+        )
+        c[:, 0] = np.sqrt(1.0 - norm_sq[norm_sq <= 1.0])
+        c[:, 1:] = inside[:, ::2] + 1j*inside[:, 1::2]
+        return np.ascontiguousarray(c @ self._basis.T), norm_sq
+
+    def target_function_batch(self, y: np.ndarray) -> np.ndarray:
+        a, norm_sq = self._complex_batch(y)
+        result = 0.1 * norm_sq
+        result[norm_sq <= 1.0] = loss_batch(a)
+        return clip_batch(result)
+
+    def target_function_screening_batch(
+        self, y: np.ndarray, fraction: float = 1.0
+    ) -> np.ndarray:
+        a, norm_sq = self._complex_batch(y)
+        result = 0.1 * norm_sq
+        pairs = screening_pairs(self._basis.shape[0], fraction)
+        result[norm_sq <= 1.0] = loss_batch_float32(a, pairs)
+        return result
+
+
+def reduced_dimension(d: int, symmetry: str) -> int:
+    """The number of real parameters of the search space with the given
+    symmetry, in dimension d.
+    """
+    target = SubspaceTarget.for_symmetry(d, symmetry)
+    return 2*d - 2 if target is None else target.n_dims